@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Excel形式判定のベンチマーク
+
+行数の異なるマネーフォワード形式・その他のブックを生成し、従来の形式判定
+（読み取り専用モードの sheet.cell によるランダムアクセスで全シートを走査し、
+キーワードのリストを最内ループで作り直す）と、シート左上の範囲だけを
+iter_rows(max_row, max_col) で読み、最初に見つかった時点で終える形式判定の
+処理時間を比較する。
+
+使い方:
+    python scripts/benchmark_excel_detection.py                  # 既定の行数
+    python scripts/benchmark_excel_detection.py 1000 20000       # 行数を指定
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# プロジェクトパスを設定
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / 'src' / 'backend'))
+
+import openpyxl
+
+from parsers.document import DocumentContext
+from parsers.moneyforward import MoneyforwardParser
+
+DEFAULT_ROW_COUNTS = [1000, 10000, 50000]
+
+# 1ブックあたりのシート数（最初のシート以外は明細のみ）
+SHEET_COUNT = 3
+
+def build_workbook(file_path, row_count, moneyforward=True):
+    """
+    明細行を row_count 行持つブックを生成（moneyforward=False の場合は判定キーワードを含まない）
+    """
+    # 書き出し専用モードはシートの範囲（dimension）を記録しないため、通常モードで作成する
+    workbook = openpyxl.Workbook()
+    workbook.remove(workbook.active)
+    for sheet_number in range(SHEET_COUNT):
+        sheet = workbook.create_sheet(f'シート{sheet_number + 1}')
+        if sheet_number == 0:
+            sheet.append(['勘定科目別税区分集計表' if moneyforward else '集計表'])
+            sheet.append(['株式会社サンプル商事'])
+        sheet.append(['勘定科目', '税区分', '10%', '8%(軽)', '合計'])
+        for index in range(row_count):
+            sheet.append([f'勘定科目{index % 50}', '課税売上 10%', index * 10, index, index * 11])
+    workbook.save(file_path)
+
+def legacy_detect(file_path):
+    """従来の形式判定: 全シートを sheet.cell で走査し、キーワードのリストを毎回作成"""
+    workbook = openpyxl.load_workbook(file_path, read_only=True)
+    try:
+        for sheet_name in workbook.sheetnames:
+            sheet = workbook[sheet_name]
+            for row in range(1, min(10, sheet.max_row + 1)):
+                for col in range(1, min(10, sheet.max_column + 1)):
+                    cell_value = sheet.cell(row, col).value
+                    if cell_value:
+                        cell_text = str(cell_value)
+                        keywords = ['マネーフォワード', 'MoneyForward', '勘定科目別税区分集計表', 'Cognite']
+                        if any(keyword in cell_text for keyword in keywords):
+                            return True
+        return False
+    finally:
+        workbook.close()
+
+def probe_detect(file_path):
+    """現在の形式判定: シート左上の範囲だけを読み、最初に見つかった時点で終える"""
+    with DocumentContext(file_path) as document:
+        return MoneyforwardParser().detect_format(file_path, document)
+
+def measure(function, file_path, repeat=3):
+    """repeat回のうち最短の処理時間（秒）と判定結果を返す"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        detected = function(file_path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, detected
+
+def main():
+    row_counts = [int(value) for value in sys.argv[1:]] or DEFAULT_ROW_COUNTS
+    
+    print(f"シート数: {SHEET_COUNT}")
+    print(f"\n{'種類':<8} {'行数/シート':>12} {'従来(秒)':>10} {'範囲読み(秒)':>14} {'比率':>8}")
+    print('-' * 58)
+    
+    with tempfile.TemporaryDirectory() as directory:
+        for row_count in row_counts:
+            for moneyforward in (True, False):
+                file_path = str(Path(directory) / f'{row_count}_{int(moneyforward)}.xlsx')
+                build_workbook(file_path, row_count, moneyforward)
+                
+                legacy_time, legacy_result = measure(legacy_detect, file_path)
+                probe_time, probe_result = measure(probe_detect, file_path)
+                if legacy_result != probe_result:
+                    print(f"判定結果が一致しません: {file_path}")
+                    return 1
+                
+                kind = 'MF' if moneyforward else 'その他'
+                print(f"{kind:<8} {row_count:>12,} {legacy_time:>10.3f} {probe_time:>14.3f} "
+                      f"{legacy_time / probe_time:>7.1f}x")
+    
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Excel読み込みエンジンのベンチマーク
+
+行数・列数の異なるマネーフォワード形式のブックを生成し、利用可能な各エンジンについて
+全シートの読み込み時間・解析（形式判定から明細抽出まで）の時間・メモリ使用量と、
+解析結果が標準のopenpyxlと一致するかを計測する。
+
+メモリはPythonのヒープ（tracemallocのピーク）と、ネイティブライブラリ（calamineは
+Rust側で確保する）を含むプロセスの最大常駐メモリ（RSS）を示す。tracemallocは処理を
+遅くするため、時間とRSSはトレースなし、ヒープはトレースありの別の実行で計測する。
+計測ごとに新しいプロセスで実行するため、RSSにはpandasなどのインポート分も含まれる。
+
+使い方:
+    python scripts/benchmark_excel_engines.py               # 既定の行数
+    python scripts/benchmark_excel_engines.py 1000 20000    # 行数を指定
+"""
+
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# プロジェクトパスを設定
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / 'src' / 'backend'))
+
+import openpyxl
+
+from parsers.document import DocumentContext
+from parsers.excel_engines import DEFAULT_EXCEL_ENGINE, available_engines
+from parsers.moneyforward import MoneyforwardParser
+from parsers.workbook import WorkbookContext
+
+DEFAULT_ROW_COUNTS = [1000, 10000, 50000]
+
+# 金額列の数（標準の表と、部門別などの列が多い表）
+AMOUNT_COLUMN_COUNTS = [4, 40]
+
+AMOUNT_HEADERS = ['課税売上10%', '課税売上8%(軽)', '課税仕入10%', '課税仕入8%(軽)', '非課税売上']
+
+def build_workbook(file_path, row_count, amount_columns):
+    """明細行を row_count 行、金額列を amount_columns 列持つブックを生成"""
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet('集計表')
+    sheet.append(['勘定科目別税区分集計表'])
+    sheet.append(['株式会社サンプル商事', None, '2024/04/01'])
+    sheet.append(['勘定科目'] + [AMOUNT_HEADERS[index % len(AMOUNT_HEADERS)] for index in range(amount_columns)]
+                 + ['合計'])
+    for index in range(row_count):
+        amounts = [(index + column) % 7 * 1000 for column in range(amount_columns)]
+        sheet.append([f'勘定科目{index % 50}'] + amounts + [sum(amounts)])
+    workbook.save(file_path)
+
+def _peak_rss_mb():
+    """プロセスの最大常駐メモリ（MB、計測できない環境ではNone）"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Linuxはキロバイト、macOSはバイト単位
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def measure(file_path, engine, trace_memory=False):
+    """
+    全シートの読み込みと解析を計測する（新しいプロセスで実行する）
+    
+    Returns:
+        tuple: (読み込み秒, 解析秒, tracemallocのピークMB, 最大RSS MB, 売上・仕入明細)
+    """
+    if trace_memory:
+        tracemalloc.start()
+    
+    start = time.perf_counter()
+    with WorkbookContext(file_path, engine) as workbook:
+        workbook.frames()
+    load_seconds = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    with DocumentContext(file_path, excel_engine=engine) as document:
+        parser = MoneyforwardParser()
+        if not parser.detect_format(file_path, document):
+            raise ValueError('マネーフォワード形式と判定されませんでした')
+        result = parser.parse(file_path, document)
+    parse_seconds = time.perf_counter() - start
+    
+    traced_peak = None
+    if trace_memory:
+        traced_peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+    return load_seconds, parse_seconds, traced_peak, _peak_rss_mb(), (result['sales_items'], result['purchase_items'])
+
+def measure_in_process(file_path, engine, trace_memory=False):
+    """前の計測のメモリが残らないよう、計測ごとに新しいプロセスで実行する"""
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        return executor.submit(measure, file_path, engine, trace_memory).result()
+
+def main():
+    row_counts = [int(value) for value in sys.argv[1:]] or DEFAULT_ROW_COUNTS
+    engines = available_engines('.xlsx')
+    print(f"利用可能なエンジン（.xlsx）: {', '.join(engines)}")
+    
+    print(f"\n{'行数':>8} {'金額列':>6} {'エンジン':<10} {'読み込み(秒)':>12} {'解析(秒)':>10} "
+          f"{'ヒープ(MB)':>10} {'RSS(MB)':>9} {'解析結果':>8}")
+    print('-' * 84)
+    
+    with tempfile.TemporaryDirectory() as directory:
+        for row_count in row_counts:
+            for amount_columns in AMOUNT_COLUMN_COUNTS:
+                file_path = str(Path(directory) / f'mf_{row_count}_{amount_columns}.xlsx')
+                build_workbook(file_path, row_count, amount_columns)
+                
+                reference = None
+                for engine in [DEFAULT_EXCEL_ENGINE] + [name for name in engines if name != DEFAULT_EXCEL_ENGINE]:
+                    try:
+                        load_seconds, parse_seconds, _, rss, items = measure_in_process(file_path, engine)
+                        traced_peak = measure_in_process(file_path, engine, trace_memory=True)[2]
+                    except Exception as e:
+                        print(f"{row_count:>8,} {amount_columns:>6} {engine:<10} エラー: {e}")
+                        continue
+                    
+                    reference = items if reference is None else reference
+                    same_items = 'OK' if items == reference else 'NG'
+                    rss_text = f"{rss:>9.1f}" if rss is not None else f"{'-':>9}"
+                    print(f"{row_count:>8,} {amount_columns:>6} {engine:<10} {load_seconds:>12.3f} "
+                          f"{parse_seconds:>10.3f} {traced_peak:>10.1f} {rss_text} {same_items:>8}")
+    
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+明細行の字句解析ベンチマーク
+
+サンプル帳票の行テキストを対象に、従来の行ごとの正規表現処理（未コンパイルの
+パターンと数値変換ごとの re.sub）と、共有の字句解析器によるトークン列照合の
+処理速度（行/秒）を比較する。従来のパターンが認識しないfreeeの略記の税区分
+（課対仕入・非課売上など）の行は一覧に示し、速度の比較からは除く。
+
+使い方:
+    python scripts/benchmark_line_lexer.py            # 既定の繰り返し回数
+    python scripts/benchmark_line_lexer.py 50         # 繰り返し回数を指定
+"""
+
+import re
+import sys
+import time
+from pathlib import Path
+
+# プロジェクトパスを設定
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / 'src' / 'backend'))
+sys.path.insert(0, str(project_root / 'scripts'))
+
+from parsers.amount import parse_amount
+from parsers.base import TOKEN_ACCOUNT, TOKEN_AMOUNT, TOKEN_PERCENT, TOKEN_TAX_CLASS, line_lexer
+from sample_reports import freee_pages, yayoi_pages
+
+ROW_SEQUENCE = line_lexer.sequence(TOKEN_ACCOUNT, TOKEN_TAX_CLASS, TOKEN_PERCENT + '?', TOKEN_AMOUNT)
+
+def _row_text(row):
+    """サンプル帳票の行定義をテキストに変換"""
+    if isinstance(row, str):
+        return row
+    return ' '.join(text for _, text in row)
+
+def sample_lines():
+    """弥生・freeeのサンプル帳票から行テキストを作成"""
+    pages = yayoi_pages(page_count=10, rows_per_page=30) + freee_pages()
+    return [_row_text(row) for page in pages for row in page]
+
+def legacy_numeric_value(text):
+    """従来の数値変換（呼び出しごとに import と未コンパイルの re.sub）"""
+    text = str(text).replace(',', '').replace('¥', '').replace('￥', '')
+    import re
+    numeric_text = re.sub(r'[^\d.-]', '', text)
+    return float(numeric_text) if numeric_text else 0.0
+
+def legacy_rows(lines):
+    """従来の処理: 行ごとに未コンパイルのパターンで検索"""
+    rows = []
+    for line in lines:
+        line = line.strip()
+        pattern = r'([^\d\s]+)\s*([^0-9]*(?:課税|非課税|不課税)[^0-9]*(?:\d+%)?)\s*([\d,]+)'
+        match = re.search(pattern, line)
+        if match:
+            rows.append((match.group(1), match.group(2).strip(), legacy_numeric_value(match.group(3))))
+    return rows
+
+def lexer_rows(lines):
+    """字句解析器による処理: 事前コンパイルしたトークン列パターンで1回だけ照合"""
+    rows = []
+    for line in lines:
+        row = ROW_SEQUENCE.find(line)
+        if row:
+            rows.append((row[TOKEN_ACCOUNT], row[TOKEN_TAX_CLASS] + (row[TOKEN_PERCENT] or ''),
+                         parse_amount(row[TOKEN_AMOUNT])))
+    return rows
+
+def measure(function, lines, repeat):
+    """repeat回処理した行数/秒を返す"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function(lines)
+    elapsed = time.perf_counter() - start
+    return len(lines) * repeat / elapsed
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    lines = sample_lines()
+    
+    # 字句解析器はfreeeの略記の税区分（課対仕入・非課売上など）も明細行とするため、
+    # 判定が分かれる行を示したうえで、同じ行を明細とする行だけで速度を比較する
+    differing = [line for line in lines if bool(legacy_rows([line])) != bool(lexer_rows([line]))]
+    lines = [line for line in lines if line not in differing]
+    
+    legacy = legacy_rows(lines)
+    lexed = lexer_rows(lines)
+    
+    print(f"行数: {len(lines)}  繰り返し: {repeat}")
+    print(f"明細行: 従来 {len(legacy)} 行 / 字句解析 {len(lexed)} 行")
+    if differing:
+        print(f"比較から除いた行（字句解析器のみ明細とする）: {len(differing)} 行")
+        for line in differing:
+            print(f"  {line}")
+    
+    legacy_speed = measure(legacy_rows, lines, repeat)
+    lexer_speed = measure(lexer_rows, lines, repeat)
+    
+    print(f"\n{'方式':<12} {'行/秒':>12}")
+    print('-' * 26)
+    print(f"{'従来':<12} {legacy_speed:>12,.0f}")
+    print(f"{'字句解析':<12} {lexer_speed:>12,.0f}")
+    print(f"\n比率: {lexer_speed / legacy_speed:.2f}x")
+    
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PDFテキスト抽出バックエンドのベンチマーク
+
+利用可能な各バックエンドについて、抽出速度（ページ/秒）と出力の同等性
+（PyPDF2とのページテキスト一致率・パーサー解析結果の一致）を計測する。
+
+使い方:
+    python scripts/benchmark_pdf_backends.py                 # サンプルPDFを生成して計測
+    python scripts/benchmark_pdf_backends.py fixtures/*.pdf  # 手元のPDFで計測
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# プロジェクトパスを設定
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / 'src' / 'backend'))
+sys.path.insert(0, str(project_root / 'scripts'))
+
+from parsers.document import DocumentContext
+from parsers.factory import ParserFactory
+from parsers.pdf_backends import DEFAULT_PDF_BACKEND, available_backends
+from sample_reports import build_pdf, freee_pages, yayoi_pages
+
+def _canonical(text):
+    """空白の違いを無視して比較するための正規化"""
+    return ''.join(text.split())
+
+def extract_all(file_path, backend_name):
+    """
+    全ページを直列で抽出し、(ページテキスト, 経過秒) を返す
+    """
+    start = time.perf_counter()
+    with DocumentContext(file_path, max_workers=1, pdf_backend=backend_name) as context:
+        texts = list(context.iter_page_texts())
+    return texts, time.perf_counter() - start
+
+def parse_items(file_path, backend_name):
+    """
+    指定バックエンドでパーサーを通した解析結果（売上・仕入明細）を返す
+    """
+    with DocumentContext(file_path, max_workers=1, pdf_backend=backend_name) as context:
+        parser = ParserFactory.get_parser(file_path, context)
+        if parser is None:
+            return None
+        result = parser.parse(file_path, context)
+    return result['sales_items'], result['purchase_items']
+
+def sample_fixtures(directory):
+    """ベンチマーク用のサンプルPDFを生成"""
+    fixtures = {
+        'yayoi_30p.pdf': build_pdf(yayoi_pages(page_count=30)),
+        'yayoi_300p.pdf': build_pdf(yayoi_pages(page_count=300)),
+        'freee.pdf': build_pdf(freee_pages()),
+    }
+    paths = []
+    for name, content in fixtures.items():
+        path = Path(directory) / name
+        path.write_bytes(content)
+        paths.append(str(path))
+    return paths
+
+def main():
+    backends = available_backends()
+    print(f"利用可能なバックエンド: {', '.join(backends)}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        fixtures = sys.argv[1:] or sample_fixtures(tmp_dir)
+
+        print(f"\n{'ファイル':<20} {'バックエンド':<10} {'ページ':>6} {'ページ/秒':>10} {'テキスト一致':>12} {'解析結果':>8}")
+        print('-' * 74)
+
+        for file_path in fixtures:
+            reference_texts, _ = extract_all(file_path, DEFAULT_PDF_BACKEND)
+            reference_items = parse_items(file_path, DEFAULT_PDF_BACKEND)
+
+            for backend_name in backends:
+                try:
+                    texts, elapsed = extract_all(file_path, backend_name)
+                    items = parse_items(file_path, backend_name)
+                except Exception as e:
+                    print(f"{Path(file_path).name:<20} {backend_name:<10} エラー: {e}")
+                    continue
+
+                matched = sum(1 for text, reference in zip(texts, reference_texts)
+                              if _canonical(text) == _canonical(reference))
+                pages_per_second = len(texts) / elapsed if elapsed else float('inf')
+                same_items = 'OK' if items == reference_items else 'NG'
+
+                print(f"{Path(file_path).name:<20} {backend_name:<10} {len(texts):>6} "
+                      f"{pages_per_second:>10.1f} {matched:>5}/{len(reference_texts):<6} {same_items:>8}")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
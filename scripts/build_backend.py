@@ -68,6 +68,12 @@ def main():
         "--hidden-import", "email.mime.text",
         "--hidden-import", "pydantic.validators",
         "--hidden-import", "pydantic.types",
+        # パーサーはレジストリから遅延インポートされる
+        "--hidden-import", "parsers.freee",
+        "--hidden-import", "parsers.moneyforward",
+        "--hidden-import", "parsers.yayoi",
+        # パーサーのレイアウト定義（JSON）を同梱
+        "--add-data", f"{Path('parsers') / 'specs'}{os.pathsep}{Path('parsers') / 'specs'}",
         # 除外するモジュール
         "--exclude-module", "tkinter",
         "--exclude-module", "matplotlib",
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+サンプル帳票生成スクリプト
+テスト・ベンチマーク用に、日本語テキストを含む最小構成のPDFを生成する
+
+使い方:
+    python scripts/sample_reports.py yayoi 300 sample_yayoi.pdf
+"""
+
+import sys
+import zlib
+from typing import List, Sequence, Tuple, Union
+
+# 1行 = 文字列、または (x座標, 文字列) のリスト
+Row = Union[str, Sequence[Tuple[float, str]]]
+
+PAGE_WIDTH = 842
+PAGE_HEIGHT = 595
+LINE_HEIGHT = 14
+FONT_SIZE = 10
+
+SALES_ACCOUNTS = ['売上高', '雑収入', '営業収入']
+PURCHASE_ACCOUNTS = ['仕入高', '外注費', '通信費', '消耗品費', '地代家賃']
+
+def _to_unicode_cmap(characters) -> bytes:
+    """
+    使用文字だけを恒等写像（CID = Unicodeコードポイント）で定義したToUnicode CMapを作成
+    """
+    codes = sorted({ord(char) for char in characters})
+    blocks = []
+    for start in range(0, len(codes), 100):
+        chunk = codes[start:start + 100]
+        entries = '\n'.join(f"<{code:04X}> <{code:04X}>" for code in chunk)
+        blocks.append(f"{len(chunk)} beginbfchar\n{entries}\nendbfchar")
+    
+    return (
+        "/CIDInit /ProcSet findresource begin\n12 dict begin\nbegincmap\n"
+        "/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def\n"
+        "/CMapName /Adobe-Identity-UCS def\n/CMapType 2 def\n"
+        "1 begincodespacerange\n<0000> <FFFF>\nendcodespacerange\n"
+        + '\n'.join(blocks)
+        + "\nendcmap\nCMapName currentdict /CMap defineresource pop\nend\nend"
+    ).encode('ascii')
+
+def _hex_text(text: str) -> str:
+    """テキストをIdentity-H用の16進文字列に変換"""
+    return ''.join(f"{ord(char):04X}" for char in text)
+
+def _content_stream(rows: List[Row], block_per_row: bool = False) -> bytes:
+    """1ページ分のコンテンツストリームを作成"""
+    commands = []
+    y = PAGE_HEIGHT - 40
+    for row in rows:
+        fragments = [(40.0, row)] if isinstance(row, str) else list(row)
+        if block_per_row:
+            # 1行を1つのテキストブロックで描画し、セルの間は Td で移動する
+            (first_x, first_text), previous_x = fragments[0], fragments[0][0]
+            command = f"BT /F1 {FONT_SIZE} Tf 1 0 0 1 {first_x:.1f} {y:.1f} Tm <{_hex_text(first_text)}> Tj"
+            for x, text in fragments[1:]:
+                command += f" {x - previous_x:.1f} 0 Td <{_hex_text(text)}> Tj"
+                previous_x = x
+            commands.append(command + " ET")
+        else:
+            for x, text in fragments:
+                commands.append(
+                    f"BT /F1 {FONT_SIZE} Tf 1 0 0 1 {x:.1f} {y:.1f} Tm <{_hex_text(text)}> Tj ET"
+                )
+        y -= LINE_HEIGHT
+    return '\n'.join(commands).encode('ascii')
+
+def build_pdf(pages: List[List[Row]], producer: str = "", compress: bool = True,
+              block_per_row: bool = False) -> bytes:
+    """
+    日本語テキストを含むPDFを生成する
+    
+    Args:
+        pages: ページごとの行リスト
+        producer: /Producer メタデータ
+        compress: コンテンツストリームをFlate圧縮する場合True
+        block_per_row: 行ごとに1つのテキストブロック（BT〜ET）で描画する場合True
+            （既定はセルごとに1つのブロック）
+    
+    Returns:
+        bytes: PDFファイルのバイナリデータ
+    """
+    objects: List[bytes] = []
+    
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+    
+    characters = set()
+    for rows in pages:
+        for row in rows:
+            fragments = [row] if isinstance(row, str) else [text for _, text in row]
+            for text in fragments:
+                characters.update(text)
+    to_unicode = _to_unicode_cmap(characters)
+    
+    catalog_id = add(b"")
+    pages_id = add(b"")
+    cmap_id = add(b"<< /Length %d >>\nstream\n" % len(to_unicode) + to_unicode + b"\nendstream")
+    descendant_id = add(
+        b"<< /Type /Font /Subtype /CIDFontType2 /BaseFont /SampleGothic "
+        b"/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) /Supplement 0 >> /DW 1000 "
+        b"/FontDescriptor << /Type /FontDescriptor /FontName /SampleGothic /Flags 4 "
+        b"/FontBBox [0 -120 1000 880] /ItalicAngle 0 /Ascent 880 /Descent -120 /CapHeight 700 /StemV 80 >> >>"
+    )
+    font_id = add(
+        b"<< /Type /Font /Subtype /Type0 /BaseFont /SampleGothic /Encoding /Identity-H "
+        b"/DescendantFonts [%d 0 R] /ToUnicode %d 0 R >>" % (descendant_id, cmap_id)
+    )
+    
+    page_ids = []
+    for rows in pages:
+        content = _content_stream(rows, block_per_row)
+        if compress:
+            content = zlib.compress(content)
+            header = b"<< /Length %d /Filter /FlateDecode >>" % len(content)
+        else:
+            header = b"<< /Length %d >>" % len(content)
+        content_id = add(header + b"\nstream\n" + content + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+            % (pages_id, PAGE_WIDTH, PAGE_HEIGHT, font_id, content_id)
+        ))
+    
+    objects[catalog_id - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id
+    kids = b' '.join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+    
+    info_id = None
+    if producer:
+        info_id = add(b"<< /Producer (%s) >>" % producer.encode('latin-1'))
+    
+    output = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    trailer = b"<< /Size %d /Root %d 0 R" % (len(objects) + 1, catalog_id)
+    if info_id:
+        trailer += b" /Info %d 0 R" % info_id
+    output += b"trailer\n" + trailer + b" >>\nstartxref\n%d\n%%%%EOF\n" % xref_offset
+    return bytes(output)
+
+def yayoi_pages(page_count: int = 3, rows_per_page: int = 30,
+                company_name: str = "株式会社サンプル商事") -> List[List[Row]]:
+    """
+    弥生形式（勘定科目別税区分表）のサンプルページを作成
+    
+    前半ページに課税売上、後半ページに課税仕入の明細を配置する
+    """
+    pages = []
+    sales_pages = max(1, page_count // 2)
+    for page_number in range(page_count):
+        rows: List[Row] = [
+            "勘定科目別税区分表",
+            f"{company_name}",
+            "期間: 2024年4月1日 ～ 2025年3月31日",
+        ]
+        if page_number < sales_pages:
+            rows.append("売上 勘定科目 税区分 金額")
+            for index in range(rows_per_page):
+                rows.append(f"{SALES_ACCOUNTS[index % len(SALES_ACCOUNTS)]} 課税売上10% {(index + 1) * 1000:,}")
+        else:
+            if page_number == sales_pages:
+                rows.append("仕入 勘定科目 税区分 金額")
+            for index in range(rows_per_page):
+                rows.append(f"{PURCHASE_ACCOUNTS[index % len(PURCHASE_ACCOUNTS)]} 課税仕入10% {(index + 1) * 500:,}")
+        pages.append(rows)
+    return pages
+
+def freee_pages(company_name: str = "株式会社サンプル商事") -> List[List[Row]]:
+    """
+    freee形式（消費税区分別表）のサンプルページを作成
+    """
+    return [[
+        "消費税区分別表",
+        f"{company_name}",
+        "2024年4月1日 ～ 2025年3月31日",
+        [(40, "勘定科目"), (200, "税区分"), (400, "金額")],
+        [(40, "売上高"), (200, "課税売上10%"), (400, "54,404,148")],
+        [(40, "雑収入"), (200, "課税売上10%"), (400, "12,178,600")],
+        [(40, "受取家賃"), (200, "非課売上"), (400, "1,675,500")],
+        "課税仕入",
+        [(40, "仕入高"), (200, "課対仕入10%"), (400, "20,000,000")],
+        [(40, "消耗品費"), (200, "課対仕入8%"), (400, "150,000")],
+        [(40, "合計"), (400, "20,150,000")],
+    ]]
+
+def main():
+    if len(sys.argv) < 4 or sys.argv[1] not in ('yayoi', 'freee'):
+        print("使い方: python scripts/sample_reports.py [yayoi|freee] ページ数 出力ファイル")
+        return 1
+    
+    vendor, page_count, output_path = sys.argv[1], int(sys.argv[2]), sys.argv[3]
+    if vendor == 'yayoi':
+        pdf = build_pdf(yayoi_pages(page_count))
+    else:
+        pdf = build_pdf(freee_pages())
+    
+    with open(output_path, 'wb') as f:
+        f.write(pdf)
+    print(f"生成しました: {output_path}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+from typing import Any, Dict, Iterable, List, Tuple
+
+# 税率が不明な明細の税率（正規化後の値）
+UNKNOWN_TAX_RATE = '不明'
+
+# 警告の対象とする金額の上限（10億円）
+LARGE_AMOUNT_THRESHOLD = 1000000000
+
+class ItemTotals:
+    """
+    明細リスト1つ分の集計
+    
+    合計金額・課税金額の合計・税率別の合計と、検証で警告する明細（負の金額・大きな金額・
+    税率が不明）を、明細リストを1回走査するだけで求める。TaxDataNormalizer の
+    集計値の再計算と検証に使う。
+    """
+    
+    def __init__(self):
+        self.count = 0
+        self.total: Any = 0
+        self.taxable_total: Any = 0
+        # 税率 → 金額の合計（税率が最初に現れた順）
+        self.by_tax_rate: Dict[Any, Any] = {}
+        # 負の金額・大きな金額の明細の (勘定科目, 金額)（明細の順）
+        self.amount_issues: List[Tuple[Any, Any]] = []
+        # 税率が不明な明細の勘定科目（明細の順）
+        self.unknown_rate_accounts: List[Any] = []
+    
+    @classmethod
+    def from_items(cls, items: Iterable[Dict[str, Any]]) -> 'ItemTotals':
+        """
+        明細リストを1回走査して集計する
+        
+        Args:
+            items: 明細（amount・taxable_amount・tax_rate・account_name を持つ辞書）
+        
+        Returns:
+            ItemTotals: 集計結果
+        """
+        totals = cls()
+        count = 0
+        total = 0
+        taxable_total = 0
+        by_tax_rate = totals.by_tax_rate
+        amount_issues = totals.amount_issues
+        unknown_rate_accounts = totals.unknown_rate_accounts
+        
+        for item in items:
+            count += 1
+            amount = item.get('amount', 0)
+            total += amount
+            taxable_total += item.get('taxable_amount', 0)
+            
+            # 税率のない明細は「不明」として集計するが、検証の対象は税率が「不明」の明細のみ
+            if 'tax_rate' in item:
+                tax_rate = item['tax_rate']
+                if tax_rate == UNKNOWN_TAX_RATE:
+                    unknown_rate_accounts.append(item.get('account_name', '不明'))
+            else:
+                tax_rate = UNKNOWN_TAX_RATE
+            by_tax_rate[tax_rate] = by_tax_rate.get(tax_rate, 0) + amount
+            
+            if amount < 0 or amount > LARGE_AMOUNT_THRESHOLD:
+                amount_issues.append((item.get('account_name', '不明'), amount))
+        
+        totals.count = count
+        totals.total = total
+        totals.taxable_total = taxable_total
+        return totals
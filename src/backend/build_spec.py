@@ -52,10 +52,17 @@ additional_hiddenimports = [
     'email.mime.text',
     'email.mime.base',
     'email.encoders',
+    # パーサーはレジストリから遅延インポートされるため明示的に含める
+    'parsers.freee',
+    'parsers.moneyforward',
+    'parsers.yayoi',
 ]
 
 hiddenimports.extend(additional_hiddenimports)
 
+# パーサーのレイアウト定義（JSON）を同梱する
+datas.append((os.path.join(current_dir, 'parsers', 'specs'), os.path.join('parsers', 'specs')))
+
 # メインスクリプトの解析
 a = Analysis(
     ['main.py'],
@@ -103,7 +103,7 @@ class CSVGenerator:
                 }
             
             # 税率に応じて適切な列に金額を加算
-            if tax_rate == '軽減8%' or tax_rate == '課対仕入8%（軽）':
+            if tax_rate == '軽減8%' or tax_rate == '課対仕入8%(軽)':
                 account_summary[account_name]['軽減8%'] += amount
             elif tax_rate == '10%' or tax_rate == '課税売上10%':
                 account_summary[account_name]['10%'] += amount
@@ -0,0 +1,142 @@
+from collections import deque
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+class KeywordAutomaton:
+    """
+    複数のキーワードを1回の走査で照合するAho-Corasickオートマトン
+    
+    キーワードのトライに失敗遷移を加え、各状態にはその位置で終わる最長のキーワードの
+    長さと、その位置で終わるすべてのキーワードを持たせる。照合はテキストの長さに
+    比例し、キーワードの数によらない。勘定科目の別名の照合と、レイアウト定義の
+    キーワードの検索（parsers.spec）で共有する。
+    """
+    
+    def __init__(self, keywords: Iterable[str]):
+        """
+        Args:
+            keywords: 照合するキーワード（空文字列は無視する）
+        """
+        self.keywords = tuple(dict.fromkeys(keyword for keyword in keywords if keyword))
+        # 状態ごとの遷移・失敗遷移・その状態で終わる最長のキーワードの長さ（0はなし）・
+        # その状態で終わるキーワード
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._longest: List[int] = [0]
+        self._outputs: List[FrozenSet[str]] = [frozenset()]
+        
+        for keyword in self.keywords:
+            self._add(keyword)
+        self._build_failure_links()
+        # キーワードの先頭の文字（ルートから遷移できる文字）
+        self._initials = frozenset(self._goto[0])
+    
+    def _add(self, keyword: str) -> None:
+        """
+        キーワードをトライに追加
+        """
+        state = 0
+        for character in keyword:
+            next_state = self._goto[state].get(character)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][character] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._longest.append(0)
+                self._outputs.append(frozenset())
+            state = next_state
+        self._longest[state] = len(keyword)
+        self._outputs[state] = frozenset([keyword])
+    
+    def _build_failure_links(self) -> None:
+        """
+        幅優先で失敗遷移を求め、失敗遷移先で終わるキーワードを引き継ぐ
+        """
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for character, next_state in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and character not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(character, 0)
+                self._fail[next_state] = fail
+                # 自身がキーワードでなければ、接尾辞で終わる最長のキーワード
+                if not self._longest[next_state]:
+                    self._longest[next_state] = self._longest[fail]
+                self._outputs[next_state] |= self._outputs[fail]
+                queue.append(next_state)
+    
+    def _walk(self, text: str) -> Iterator[Tuple[int, int]]:
+        """
+        テキストを1文字ずつ遷移し、(位置, 状態) を返す
+        """
+        goto, fail = self._goto, self._fail
+        state = 0
+        for position, character in enumerate(text):
+            while state and character not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(character, 0)
+            yield position, state
+    
+    def _may_contain(self, text: str) -> bool:
+        """
+        キーワードを含む可能性があるか（キーワードの先頭の文字を1つも含まないテキストは
+        走査しない。行単位の検索では多くの行がここで除かれる）
+        """
+        return not self._initials.isdisjoint(text)
+    
+    def search(self, text: str) -> bool:
+        """
+        いずれかのキーワードを含むか（最初に見つかった位置で走査を終える）
+        """
+        if not self._may_contain(text):
+            return False
+        
+        longest = self._longest
+        return any(longest[state] for _, state in self._walk(text))
+    
+    def find_all(self, text: str) -> FrozenSet[str]:
+        """
+        テキストに含まれるキーワードの集合
+        
+        Args:
+            text: 検索対象のテキスト
+        
+        Returns:
+            FrozenSet[str]: 含まれるキーワード（`keyword in text` が真になるものすべて）
+        """
+        if not self._may_contain(text):
+            return frozenset()
+        
+        outputs = self._outputs
+        found = set()
+        for _, state in self._walk(text):
+            if outputs[state]:
+                found |= outputs[state]
+        return frozenset(found)
+    
+    def longest_match(self, text: str) -> Optional[str]:
+        """
+        テキストに含まれる最長のキーワード
+        
+        Args:
+            text: 照合するテキスト
+        
+        Returns:
+            str: 最長のキーワード（同じ長さの場合は先に現れたもの）。含まない場合はNone
+        """
+        longest = self._longest
+        best_length = 0
+        best_end = 0
+        
+        for position, state in self._walk(text):
+            length = longest[state]
+            # 長さが同じ場合は先に終わる（＝先に始まる）キーワードを優先する
+            if length > best_length:
+                best_length = length
+                best_end = position + 1
+        
+        if not best_length:
+            return None
+        return text[best_end - best_length:best_end]
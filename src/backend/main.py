@@ -7,6 +7,9 @@ import os
 import tempfile
 import io
 from parsers.factory import ParserFactory
+from parsers.document import DocumentContext
+from parsers.profiles import ProfileStore
+from parsers.splitter import parse_entities
 from normalizer import TaxDataNormalizer
 from csv_generator import CSVGenerator
 
@@ -31,7 +34,7 @@ async def upload_file(file: UploadFile = File(...)):
     """
     try:
         # ファイル拡張子チェック
-        allowed_extensions = {'.pdf', '.xlsx', '.xls'}
+        allowed_extensions = {'.pdf', '.xlsx', '.xls', '.csv'}
         file_extension = os.path.splitext(file.filename)[1].lower()
         
         if file_extension not in allowed_extensions:
@@ -46,9 +49,13 @@ async def upload_file(file: UploadFile = File(...)):
             tmp_file.write(content)
             tmp_file_path = tmp_file.name
         
+        # 判定と解析で同じPDFテキストを共有するためのコンテキスト
+        # （同じ会社の前回のレイアウトはプロファイルキャッシュから再利用する）
+        context = DocumentContext(tmp_file_path, profile_store=ProfileStore.from_environment())
+        
         try:
             # 適切なパーサーを取得
-            parser = ParserFactory.get_parser(tmp_file_path)
+            parser = ParserFactory.get_parser(tmp_file_path, context)
             if not parser:
                 raise HTTPException(
                     status_code=400,
@@ -58,7 +65,7 @@ async def upload_file(file: UploadFile = File(...)):
             print(f"Selected parser: {parser.__class__.__name__}")
             
             # データ解析
-            raw_data = parser.parse(tmp_file_path)
+            raw_data = parser.parse(tmp_file_path, context)
             print(f"Raw data sales items: {len(raw_data.get('sales_items', []))}")
             print(f"Sales items: {raw_data.get('sales_items', [])}")
             
@@ -91,9 +98,85 @@ async def upload_file(file: UploadFile = File(...)):
             return preview
             
         finally:
-            # 一時ファイル削除
+            # 一時ファイル削除（Windowsでは先にファイルを閉じる必要がある）
+            context.close()
+            os.unlink(tmp_file_path)
+            
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/upload/entities")
+async def upload_entities_file(file: UploadFile = File(...)):
+    """
+    複数事業者をまとめたファイルのアップロード・解析エンドポイント
+    
+    PDFを事業者ごとに分割して解析し、事業者ごとのプレビューを返す。
+    """
+    try:
+        # ファイル拡張子チェック
+        allowed_extensions = {'.pdf', '.xlsx', '.xls', '.csv'}
+        file_extension = os.path.splitext(file.filename)[1].lower()
+        
+        if file_extension not in allowed_extensions:
+            raise HTTPException(
+                status_code=400, 
+                detail=f"Unsupported file format: {file_extension}"
+            )
+        
+        # 一時ファイルに保存
+        with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as tmp_file:
+            content = await file.read()
+            tmp_file.write(content)
+            tmp_file_path = tmp_file.name
+        
+        context = DocumentContext(tmp_file_path, profile_store=ProfileStore.from_environment())
+        
+        try:
+            # 事業者ごとに分割して解析
+            raw_results = parse_entities(tmp_file_path, context)
+            if not raw_results:
+                raise HTTPException(
+                    status_code=400,
+                    detail="Unknown file format. Supported formats: freee, MoneyForward, Yayoi"
+                )
+            
+            # データ正規化
+            normalizer = TaxDataNormalizer()
+            normalized_results = normalizer.normalize_many(raw_results)
+            
+            entities = []
+            for index, normalized_data in enumerate(normalized_results, start=1):
+                # 事業者ごとにセッションを保存
+                session_id = f"{file.filename}_{index}_processed"
+                processed_data[session_id] = normalized_data
+                
+                entities.append({
+                    "session_id": session_id,
+                    "company_name": normalized_data.get('company_name'),
+                    "period_start": normalized_data.get('period_start'),
+                    "period_end": normalized_data.get('period_end'),
+                    "page_range": normalized_data.get('page_range'),
+                    "parser_type": normalized_data.get('parser_type'),
+                    "taxable_sales": float(normalized_data.get('taxable_sales_total', 0)),
+                    "taxable_purchases": float(normalized_data.get('taxable_purchases_total', 0)),
+                    "warnings": normalized_data.get('warnings', []),
+                    "errors": normalized_data.get('errors', []),
+                    "sales_items_count": len(normalized_data.get('sales_items', [])),
+                    "purchase_items_count": len(normalized_data.get('purchase_items', []))
+                })
+            
+            return {
+                "filename": file.filename,
+                "entities": entities
+            }
+            
+        finally:
+            # 一時ファイル削除（Windowsでは先にファイルを閉じる必要がある）
+            context.close()
             os.unlink(tmp_file_path)
             
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
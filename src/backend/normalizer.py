@@ -1,22 +1,43 @@
-from typing import Dict, List, Any
+from functools import lru_cache
+from typing import Dict, List, Any, Optional
+import numpy as np
 import pandas as pd
+from aggregation import LARGE_AMOUNT_THRESHOLD, UNKNOWN_TAX_RATE, ItemTotals
+from keyword_matcher import KeywordAutomaton
+
+# 勘定科目名の正規化結果を保持する件数（同じ科目名は帳票内で何度も現れる）
+ACCOUNT_NAME_CACHE_SIZE = 4096
+
+def _native(value: Any) -> Any:
+    """
+    numpyのスカラーをPythonの数値に変換する（集計値を辞書版と同じ型にそろえる）
+    """
+    return value.item() if isinstance(value, np.generic) else value
+
+def _frame_records(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    DataFrameを辞書のリストに戻す（値はPythonの型、to_dict('records') より高速）
+    """
+    columns = list(frame.columns)
+    return [dict(zip(columns, row)) for row in zip(*(frame[column].tolist() for column in columns))]
 
 class TaxDataNormalizer:
     """
     税区分データの正規化クラス
     """
     
-    def __init__(self):
-        # 税率の標準化マッピング
+    def __init__(self, account_mapping: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            account_mapping: 追加する勘定科目の別名と標準名（顧客ごとの別名など）
+        """
+        # 税率の標準化マッピング（全角・半角はパーサーが抽出時に正規化済み）
         self.tax_rate_mapping = {
             '10%': '10%',
-            '10％': '10%',
             '標準10%': '10%',
             '標準': '10%',
             '8%': '軽減8%',
-            '8％': '軽減8%',
             '軽減8%': '軽減8%',
-            '軽減8％': '軽減8%',
             '軽減': '軽減8%',
             '非課税': '非課税',
             '不課税': '不課税',
@@ -59,6 +80,12 @@ class TaxDataNormalizer:
             '保険料': '保険料',
             '減価償却費': '減価償却費'
         }
+        if account_mapping:
+            self.account_mapping.update(account_mapping)
+        
+        # 勘定科目マッピングの別名は一度だけオートマトンにコンパイルし、正規化結果をメモ化する
+        self._account_matcher = KeywordAutomaton(self.account_mapping)
+        self._account_name_cache = lru_cache(maxsize=ACCOUNT_NAME_CACHE_SIZE)(self._match_account_name)
     
     def normalize(self, raw_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -66,7 +93,7 @@ class TaxDataNormalizer:
         
         Args:
             raw_data: パーサーからの生データ
-            
+        
         Returns:
             Dict: 正規化されたデータ
         """
@@ -81,22 +108,170 @@ class TaxDataNormalizer:
             if 'purchase_items' in raw_data:
                 normalized_data['purchase_items'] = self._normalize_items(raw_data['purchase_items'])
             
+            # 集計と検証に必要な値は明細リストごとに1回の走査でまとめて求める
+            sales_totals = ItemTotals.from_items(normalized_data.get('sales_items', []))
+            purchase_totals = ItemTotals.from_items(normalized_data.get('purchase_items', []))
+            
             # 集計値の再計算
-            normalized_data.update(self._recalculate_totals(normalized_data))
+            normalized_data.update(self._recalculate_totals(sales_totals, purchase_totals))
             
             # バリデーション
-            validation_results = self._validate_data(normalized_data)
+            validation_results = self._validate_data(sales_totals, purchase_totals)
             normalized_data['warnings'].extend(validation_results.get('warnings', []))
             normalized_data['errors'].extend(validation_results.get('errors', []))
             
             return normalized_data
+        
+        except Exception as e:
+            return {
+                **raw_data,
+                'errors': raw_data.get('errors', []) + [f"Normalization error: {str(e)}"]
+            }
+    
+    def normalize_many(self, raw_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        事業者ごとの生データをそれぞれ正規化する
+        
+        Args:
+            raw_results: 事業者ごとのパーサーからの生データ
+        
+        Returns:
+            List[Dict]: 同じ順序の正規化されたデータ
+        """
+        return [self.normalize(raw_data) for raw_data in raw_results]
+    
+    def normalize_columns(self, raw_data: Dict[str, Any], as_frames: bool = False) -> Dict[str, Any]:
+        """
+        生データを列単位で正規化する（normalize の大量明細向けの版）
+        
+        sales_items・purchase_items は辞書のリストのほか、DataFrameや列名と配列の辞書
+        （列ごとの並行配列）も受け付ける。勘定科目・税率は値の種類ごとに一度だけ正規化して
+        コードで全行に展開し、課税金額・集計値・検証は列単位で計算する。結果は normalize と同じ。
+        
+        Args:
+            raw_data: パーサーからの生データ
+            as_frames: Trueの場合、明細を辞書のリストに戻さずDataFrameのまま返す
+        
+        Returns:
+            Dict: 正規化されたデータ
+        """
+        try:
+            normalized_data = raw_data.copy()
             
+            sales_frame = self._normalize_item_frame(raw_data.get('sales_items', []))
+            purchase_frame = self._normalize_item_frame(raw_data.get('purchase_items', []))
+            
+            for key, frame in (('sales_items', sales_frame), ('purchase_items', purchase_frame)):
+                if key in raw_data:
+                    normalized_data[key] = frame if as_frames else _frame_records(frame)
+            
+            # 集計値の再計算
+            normalized_data.update(self._frame_totals(sales_frame, purchase_frame))
+            
+            # バリデーション
+            validation_results = self._validate_frames(sales_frame, purchase_frame)
+            normalized_data['warnings'].extend(validation_results.get('warnings', []))
+            normalized_data['errors'].extend(validation_results.get('errors', []))
+            
+            return normalized_data
+        
         except Exception as e:
             return {
                 **raw_data,
                 'errors': raw_data.get('errors', []) + [f"Normalization error: {str(e)}"]
             }
     
+    def _normalize_item_frame(self, items: Any) -> pd.DataFrame:
+        """
+        明細を列単位で正規化（_normalize_items の列指向版）
+        
+        勘定科目・税率は pd.factorize で値の種類ごとのコードに変換し、種類ごとに一度だけ
+        正規化した値をコードで全行に展開する。
+        """
+        frame = items.copy() if isinstance(items, pd.DataFrame) else pd.DataFrame(items)
+        frame = frame.reset_index(drop=True)
+        
+        if 'account_name' in frame:
+            # 列の入力では欠損値（None・NaN）が現れるため、空の科目名として扱う
+            codes, names = pd.factorize(frame['account_name'].fillna(''), use_na_sentinel=False)
+            canonical = np.array([self._normalize_account_name(name) for name in names], dtype=object)
+            frame['account_name'] = canonical[codes]
+        else:
+            frame['account_name'] = self._normalize_account_name('')
+        
+        if 'tax_rate' in frame:
+            codes, rates = pd.factorize(frame['tax_rate'].fillna(''), use_na_sentinel=False)
+        else:
+            codes, rates = np.zeros(len(frame), dtype=np.intp), np.array([''], dtype=object)
+        normalized_rates = [self._normalize_tax_rate(rate) for rate in rates]
+        frame['tax_rate'] = np.array(normalized_rates, dtype=object)[codes]
+        
+        # 課税金額の再計算（課税対象かどうかも税率の種類ごとに一度だけ判定）
+        taxable = np.array([self._is_taxable_rate(rate) for rate in normalized_rates], dtype=bool)[codes]
+        # 金額のない明細は辞書版と同じく0とする（欠損値だけのために整数の列が浮動小数点に
+        # なった場合は整数に戻し、警告の金額の表記を辞書版と揃える）
+        if 'amount' in frame:
+            amounts = frame['amount']
+            if amounts.hasnans:
+                amounts = amounts.fillna(0)
+                if amounts.dtype.kind == 'f' and (amounts % 1 == 0).all():
+                    amounts = amounts.astype(np.int64)
+        else:
+            amounts = pd.Series(0, index=frame.index)
+        frame['amount'] = amounts
+        frame['taxable_amount'] = amounts.where(taxable, 0)
+        
+        return frame
+    
+    def _frame_totals(self, sales_frame: pd.DataFrame, purchase_frame: pd.DataFrame) -> Dict[str, Any]:
+        """
+        集計値を列単位で計算（_recalculate_totals の列指向版）
+        """
+        def column_sum(frame: pd.DataFrame, column: str) -> Any:
+            return _native(frame[column].sum()) if column in frame and len(frame) else 0
+        
+        def sum_by_tax_rate(frame: pd.DataFrame) -> Dict[str, Any]:
+            # 辞書版と同じく、税率が最初に現れた順に並べる
+            if 'amount' not in frame or not len(frame):
+                return {rate: 0 for rate in pd.unique(frame['tax_rate'])}
+            sums = frame['amount'].groupby(frame['tax_rate'], sort=False, dropna=False).sum()
+            return {rate: _native(amount) for rate, amount in sums.items()}
+        
+        return {
+            'taxable_sales_total': column_sum(sales_frame, 'taxable_amount'),
+            'total_sales': column_sum(sales_frame, 'amount'),
+            'taxable_purchases_total': column_sum(purchase_frame, 'taxable_amount'),
+            'total_purchases': column_sum(purchase_frame, 'amount'),
+            'sales_by_tax_rate': sum_by_tax_rate(sales_frame),
+            'purchases_by_tax_rate': sum_by_tax_rate(purchase_frame),
+        }
+    
+    def _validate_frames(self, sales_frame: pd.DataFrame, purchase_frame: pd.DataFrame) -> Dict[str, List[str]]:
+        """
+        データのバリデーション（_validate_data の列指向版、警告の順序も同じ）
+        """
+        warnings = []
+        errors = []
+        
+        if not len(sales_frame) and not len(purchase_frame):
+            errors.append("売上データと仕入データの両方が空です")
+        
+        frames = [frame for frame in (sales_frame, purchase_frame) if len(frame)]
+        if not frames:
+            return {'warnings': warnings, 'errors': errors}
+        
+        names = np.concatenate([frame['account_name'].to_numpy() for frame in frames])
+        rates = np.concatenate([frame['tax_rate'].to_numpy() for frame in frames])
+        amounts = pd.concat([frame['amount'] if 'amount' in frame else pd.Series(0, index=frame.index)
+                             for frame in frames], ignore_index=True)
+        
+        # 金額・税率の妥当性チェック（対象の明細を列単位で選ぶ）
+        flagged = ((amounts < 0) | (amounts > LARGE_AMOUNT_THRESHOLD)).to_numpy()
+        amount_issues = zip(names[flagged].tolist(), amounts[flagged].tolist())
+        warnings.extend(self._validation_warnings(amount_issues, names[rates == UNKNOWN_TAX_RATE].tolist()))
+        
+        return {'warnings': warnings, 'errors': errors}
+    
     def _normalize_items(self, items: List[Dict]) -> List[Dict]:
         """
         アイテムリストを正規化
@@ -114,8 +289,9 @@ class TaxDataNormalizer:
             tax_rate = item.get('tax_rate', '')
             normalized_item['tax_rate'] = self._normalize_tax_rate(tax_rate)
             
-            # 課税金額の再計算
+            # 課税金額の再計算（金額のない明細は0とする）
             amount = item.get('amount', 0)
+            normalized_item['amount'] = amount
             normalized_tax_rate = normalized_item['tax_rate']
             normalized_item['taxable_amount'] = amount if self._is_taxable_rate(normalized_tax_rate) else 0
             
@@ -125,18 +301,30 @@ class TaxDataNormalizer:
     
     def _normalize_account_name(self, account_name: str) -> str:
         """
-        勘定科目名を正規化
+        勘定科目名を正規化（同じ科目名は前回の結果を返す）
+        """
+        return self._account_name_cache(account_name)
+    
+    def _match_account_name(self, account_name: str) -> str:
+        """
+        勘定科目名に含まれる最長の別名から標準名を求める
+        
+        マッピングの登録順によらず、長い別名を優先する（「売上高」は「売上」より優先）。
         """
+        if not isinstance(account_name, str):
+            # 欠損値（None・NaN）は空の科目名、数値などは文字列として扱う
+            account_name = '' if pd.isna(account_name) else str(account_name)
+        
         if not account_name:
             return ""
         
         # 前後の空白除去
         account_name = account_name.strip()
         
-        # マッピングテーブルから検索
-        for key, value in self.account_mapping.items():
-            if key in account_name:
-                return value
+        # マッピングテーブルの別名を1回の走査で検索
+        alias = self._account_matcher.longest_match(account_name)
+        if alias is not None:
+            return self.account_mapping[alias]
         
         return account_name
     
@@ -144,6 +332,9 @@ class TaxDataNormalizer:
         """
         税率を正規化
         """
+        # 欠損値（None・NaN）は税率なしとして扱う
+        if not isinstance(tax_rate, str) and pd.isna(tax_rate):
+            return "不明"
         if not tax_rate:
             return "不明"
         
@@ -158,91 +349,51 @@ class TaxDataNormalizer:
         taxable_rates = ['10%', '軽減8%']
         return tax_rate in taxable_rates
     
-    def _recalculate_totals(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        集計値を再計算
-        """
-        totals = {}
-        
-        # 売上合計
-        sales_items = data.get('sales_items', [])
-        totals['taxable_sales_total'] = sum(
-            item.get('taxable_amount', 0) for item in sales_items
-        )
-        totals['total_sales'] = sum(
-            item.get('amount', 0) for item in sales_items
-        )
-        
-        # 仕入合計
-        purchase_items = data.get('purchase_items', [])
-        totals['taxable_purchases_total'] = sum(
-            item.get('taxable_amount', 0) for item in purchase_items
-        )
-        totals['total_purchases'] = sum(
-            item.get('amount', 0) for item in purchase_items
-        )
-        
-        # 税率別集計
-        totals.update(self._calculate_by_tax_rate(sales_items, purchase_items))
-        
-        return totals
-    
-    def _calculate_by_tax_rate(self, sales_items: List[Dict], purchase_items: List[Dict]) -> Dict[str, Any]:
+    def _recalculate_totals(self, sales_totals: ItemTotals, purchase_totals: ItemTotals) -> Dict[str, Any]:
         """
-        税率別の集計を計算
+        集計値を再計算（合計・課税金額の合計・税率別の合計）
         """
-        by_tax_rate = {
-            'sales_by_tax_rate': {},
-            'purchases_by_tax_rate': {}
+        return {
+            'taxable_sales_total': sales_totals.taxable_total,
+            'total_sales': sales_totals.total,
+            'taxable_purchases_total': purchase_totals.taxable_total,
+            'total_purchases': purchase_totals.total,
+            'sales_by_tax_rate': sales_totals.by_tax_rate,
+            'purchases_by_tax_rate': purchase_totals.by_tax_rate,
         }
-        
-        # 売上の税率別集計
-        for item in sales_items:
-            tax_rate = item.get('tax_rate', '不明')
-            amount = item.get('amount', 0)
-            
-            if tax_rate not in by_tax_rate['sales_by_tax_rate']:
-                by_tax_rate['sales_by_tax_rate'][tax_rate] = 0
-            by_tax_rate['sales_by_tax_rate'][tax_rate] += amount
-        
-        # 仕入の税率別集計
-        for item in purchase_items:
-            tax_rate = item.get('tax_rate', '不明')
-            amount = item.get('amount', 0)
-            
-            if tax_rate not in by_tax_rate['purchases_by_tax_rate']:
-                by_tax_rate['purchases_by_tax_rate'][tax_rate] = 0
-            by_tax_rate['purchases_by_tax_rate'][tax_rate] += amount
-        
-        return by_tax_rate
     
-    def _validate_data(self, data: Dict[str, Any]) -> Dict[str, List[str]]:
+    def _validate_data(self, sales_totals: ItemTotals, purchase_totals: ItemTotals) -> Dict[str, List[str]]:
         """
-        データのバリデーション
+        データのバリデーション（集計時に見つけた明細から警告を作成）
         """
-        warnings = []
         errors = []
         
         # 基本的なデータ存在チェック
-        sales_items = data.get('sales_items', [])
-        purchase_items = data.get('purchase_items', [])
-        
-        if not sales_items and not purchase_items:
+        if not sales_totals.count and not purchase_totals.count:
             errors.append("売上データと仕入データの両方が空です")
         
-        # 金額の妥当性チェック
-        for item in sales_items + purchase_items:
-            amount = item.get('amount', 0)
+        # 金額・税率の妥当性チェック（売上・仕入の順）
+        warnings = self._validation_warnings(sales_totals.amount_issues + purchase_totals.amount_issues,
+                                             sales_totals.unknown_rate_accounts + purchase_totals.unknown_rate_accounts)
+        
+        return {'warnings': warnings, 'errors': errors}
+    
+    def _validation_warnings(self, amount_issues, unknown_rate_accounts) -> List[str]:
+        """
+        検証の警告を作成（金額の警告を明細の順に並べたあと、税率が不明な明細の警告）
+        
+        Args:
+            amount_issues: 負の金額・大きな金額の明細の (勘定科目, 金額)
+            unknown_rate_accounts: 税率が不明な明細の勘定科目
+        """
+        warnings = []
+        for account_name, amount in amount_issues:
             if amount < 0:
-                warnings.append(f"負の金額が検出されました: {item.get('account_name', '不明')} {amount}")
-            
-            if amount > 1000000000:  # 10億円
-                warnings.append(f"非常に大きな金額が検出されました: {item.get('account_name', '不明')} {amount}")
+                warnings.append(f"負の金額が検出されました: {account_name} {amount}")
+            else:  # 10億円超
+                warnings.append(f"非常に大きな金額が検出されました: {account_name} {amount}")
         
-        # 税率の妥当性チェック
-        for item in sales_items + purchase_items:
-            tax_rate = item.get('tax_rate', '')
-            if tax_rate == '不明':
-                warnings.append(f"税率が不明です: {item.get('account_name', '不明')}")
+        for account_name in unknown_rate_accounts:
+            warnings.append(f"税率が不明です: {account_name}")
         
-        return {'warnings': warnings, 'errors': errors}
\ No newline at end of file
+        return warnings
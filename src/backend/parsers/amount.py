@@ -0,0 +1,148 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+class _AmountTranslationTable(dict):
+    """
+    str.translate 用の変換表（表にない文字は削除する）
+    """
+    
+    def __missing__(self, key: int) -> None:
+        return None
+
+def _build_translation_table() -> _AmountTranslationTable:
+    """
+    金額テキストの変換表を作成
+    
+    全角数字・全角記号を半角に揃え、△・▲・全角マイナスは負号、全角括弧は半角括弧に
+    変換する。桁区切りのカンマ・円記号・空白などそれ以外の文字は削除する。
+    """
+    table = _AmountTranslationTable()
+    for character in '0123456789.-()':
+        table[ord(character)] = character
+    for digit in range(10):
+        table[ord('０') + digit] = str(digit)
+    for character in '△▲－−‐':
+        table[ord(character)] = '-'
+    table[ord('．')] = '.'
+    table[ord('（')] = '('
+    table[ord('）')] = ')'
+    # よく現れる区切り文字は明示しておき、__missing__ の呼び出しを避ける
+    for character in ',，¥￥円 　':
+        table[ord(character)] = None
+    return table
+
+# 金額テキスト → 数字・小数点・負号・括弧のみ
+AMOUNT_TRANSLATION = _build_translation_table()
+
+# 負号・括弧を削除して数字と小数点だけにする
+SIGN_REMOVAL = str.maketrans('', '', '-()')
+
+def _round_half_up(value: float) -> int:
+    """
+    円未満を四捨五入して整数にする
+    """
+    return int(Decimal(repr(value)).to_integral_value(rounding=ROUND_HALF_UP))
+
+def parse_amount(value: Any) -> int:
+    """
+    会計帳票の金額を円単位の整数に変換する
+    
+    「1,234」「￥1,234」「１，２３４円」のほか、「△1,234」「▲1,234」「(1,234)」
+    「-1,234」を負の金額として扱う。円未満は四捨五入する。
+    
+    Args:
+        value: セルの値または金額テキスト
+    
+    Returns:
+        int: 金額（空欄・解釈できない値は0）
+    """
+    if value is None or isinstance(value, bool):
+        return 0
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        # NaN・無限大は空欄として扱う
+        if value != value or value in (float('inf'), float('-inf')):
+            return 0
+        if value.is_integer():
+            return int(value)
+        return _round_half_up(value)
+    
+    # 桁区切りのカンマだけの金額（最も多い形式）は変換表を通さない
+    text = str(value)
+    plain = text.replace(',', '')
+    if plain.isdecimal():
+        return int(plain)
+    
+    text = text.translate(AMOUNT_TRANSLATION)
+    if not text:
+        return 0
+    
+    negative = text[0] in '-('
+    digits = text.translate(SIGN_REMOVAL)
+    if not digits:
+        return 0
+    
+    if '.' in digits:
+        try:
+            amount = int(Decimal(digits).to_integral_value(rounding=ROUND_HALF_UP))
+        except InvalidOperation:
+            return 0
+    else:
+        amount = int(digits)
+    
+    return -amount if negative else amount
+
+def _value_kind(value_type: type) -> str:
+    """
+    parse_amount での値の扱い（'empty': 0 / 'number': 数値のまま / 'text': 文字列として解釈）
+    """
+    if value_type is type(None) or issubclass(value_type, (bool, np.bool_)):
+        return 'empty'
+    if issubclass(value_type, (int, float, np.number)):
+        return 'number'
+    return 'text'
+
+def parse_amount_series(values: pd.Series) -> pd.Series:
+    """
+    parse_amount のpandas Series版
+    
+    要素の型ごとに parse_amount と同じ扱いをする。真偽値・None は0、数値の要素はそのまま、
+    それ以外の要素は文字列にして変換表でまとめて変換してから数値化する（「1e5」のような
+    表記も pd.to_numeric に任せず、parse_amount と同じく数字以外の文字を除く）。
+    
+    Args:
+        values: セルの値の列
+    
+    Returns:
+        pd.Series: 金額（int64、空欄・解釈できない値は0）
+    """
+    if pd.api.types.is_bool_dtype(values):
+        return pd.Series(0, index=values.index, dtype='int64')
+    
+    if pd.api.types.is_numeric_dtype(values):
+        numbers = values.astype('float64')
+    else:
+        # 型の種類は少ないため、種類ごとに一度だけ判定する
+        value_types = values.map(type)
+        kinds = value_types.map({value_type: _value_kind(value_type) for value_type in value_types.unique()})
+        numbers = pd.Series(np.nan, index=values.index, dtype='float64')
+        
+        number_mask = kinds == 'number'
+        if number_mask.any():
+            numbers[number_mask] = pd.to_numeric(values[number_mask], errors='coerce').astype('float64')
+        
+        text_mask = kinds == 'text'
+        if text_mask.any():
+            texts = values[text_mask].astype(str).str.translate(AMOUNT_TRANSLATION)
+            negative = texts.str[:1].isin(['-', '('])
+            parsed = pd.to_numeric(texts.str.translate(SIGN_REMOVAL), errors='coerce')
+            numbers[text_mask] = parsed.where(~negative, -parsed)
+    
+    numbers = numbers.replace([np.inf, -np.inf], np.nan).fillna(0.0)
+    
+    # 円未満は四捨五入（0.5は0から遠い方へ丸める）
+    return (np.sign(numbers) * np.floor(numbers.abs() + 0.5)).astype('int64')
@@ -1,7 +1,115 @@
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 import pandas as pd
-from typing import Dict, List, Any
+import re
+from typing import Dict, Iterator, List, Any, NamedTuple, Optional
 import os
+from .amount import parse_amount
+from .document import DocumentContext
+from .page_index import HEADER_MARKERS, PageIndex, PAGE_HEADER, PAGE_PURCHASE, PAGE_SALES
+from .profiles import LayoutProfile
+
+# 明細行のトークン種別
+TOKEN_ACCOUNT = 'account'
+TOKEN_TAX_CLASS = 'tax_class'
+TOKEN_AMOUNT = 'amount'
+TOKEN_PERCENT = 'percent'
+TOKEN_TOTAL = 'total'
+
+# 税区分の先頭に現れる語（非課税・不課税・課対仕入など。freeeの略記「課対」「非課」「不課」も税区分とする）
+TAX_CLASS_PREFIXES = ('課税', '課対', '非課', '不課')
+
+# トークン種別ごとのパターン（正規化済みのテキストを前提とする）
+TOKEN_PATTERNS = {
+    TOKEN_TOTAL: r'(?:合計|小計|総計)[^\s\d]*',
+    TOKEN_TAX_CLASS: r'(?:' + '|'.join(TAX_CLASS_PREFIXES) + r')[^\s\d%]*(?:\d+(?:\.\d+)?%[^\s\d]*)?',
+    TOKEN_PERCENT: r'\d+(?:\.\d+)?%',
+    TOKEN_AMOUNT: r'[△▲−\-(]?\d[\d,]*(?:\.\d+)?\)?',
+    TOKEN_ACCOUNT: r'[^\s\d%]+',
+}
+
+class Token(NamedTuple):
+    """
+    明細行のトークン
+    """
+    kind: str
+    text: str
+
+class TokenSequence:
+    """
+    トークン列のパターン
+    
+    トークン種別のパターンを連結して1つの正規表現に事前コンパイルしておき、
+    1行につき1回の検索で一致したトークン列を取り出す。
+    """
+    
+    def __init__(self, kinds: List[str]):
+        """
+        Args:
+            kinds: トークン種別の並び（末尾に '?' を付けた種別は省略可能。同じ種別は1回まで）
+        """
+        self.kinds = [kind.rstrip('?') for kind in kinds]
+        if len(set(self.kinds)) != len(self.kinds):
+            raise ValueError(f"Duplicate token kind in sequence: {kinds}")
+        
+        parts = []
+        for spec, kind in zip(kinds, self.kinds):
+            part = f'(?P<{kind}>{TOKEN_PATTERNS[kind]})\\s*'
+            parts.append(f'(?:{part})?' if spec.endswith('?') else part)
+        self._pattern = re.compile(''.join(parts))
+    
+    def find(self, line: str) -> Optional[Dict[str, Optional[str]]]:
+        """
+        行の中から最初に一致するトークン列を取得
+        
+        Args:
+            line: 明細行のテキスト
+        
+        Returns:
+            Dict: トークン種別ごとのテキスト（省略されたトークンはNone。一致しない場合はNone）
+        """
+        match = self._pattern.search(line)
+        if match is None:
+            return None
+        return match.groupdict()
+
+class LineLexer:
+    """
+    税区分表の明細行を型付きトークンに分割する字句解析器
+    
+    トークン種別ごとのパターンを事前にコンパイルし、合計・税区分・税率・金額・
+    勘定科目の順に判定する。パーサーは sequence() で作成したトークン列パターンで
+    明細行を照合する。
+    """
+    
+    _PATTERN = re.compile('|'.join(f'(?P<{kind}>{pattern})' for kind, pattern in TOKEN_PATTERNS.items()))
+    
+    def tokenize(self, line: str) -> List[Token]:
+        """
+        1行をトークンに分割（空白は読み飛ばす）
+        
+        Args:
+            line: 明細行のテキスト
+        
+        Returns:
+            List[Token]: トークン列
+        """
+        return [Token(match.lastgroup, match.group()) for match in self._PATTERN.finditer(line)]
+    
+    def sequence(self, *kinds: str) -> TokenSequence:
+        """
+        トークン列パターンを作成
+        
+        Args:
+            kinds: トークン種別の並び（例: TOKEN_ACCOUNT, TOKEN_TAX_CLASS, TOKEN_PERCENT + '?', TOKEN_AMOUNT）
+        
+        Returns:
+            TokenSequence: 事前コンパイルしたパターン
+        """
+        return TokenSequence(list(kinds))
+
+# パーサー間で共有する字句解析器
+line_lexer = LineLexer()
 
 class BaseParser(ABC):
     """
@@ -13,74 +121,112 @@ class BaseParser(ABC):
         self.parser_name = ""
     
     @abstractmethod
-    def detect_format(self, file_path: str) -> bool:
+    def detect_format(self, file_path: str, context: Optional[DocumentContext] = None) -> bool:
         """
         ファイル形式を判定する
         
         Args:
             file_path: 解析対象ファイルのパス
-            
+            context: 共有ドキュメントコンテキスト（省略時は自前で開く）
+        
         Returns:
             bool: このパーサーで処理可能な場合True
         """
         pass
     
     @abstractmethod
-    def parse(self, file_path: str) -> Dict[str, Any]:
+    def parse(self, file_path: str, context: Optional[DocumentContext] = None) -> Dict[str, Any]:
         """
         データを標準形式に変換する
         
         Args:
             file_path: 解析対象ファイルのパス
-            
+            context: 共有ドキュメントコンテキスト（省略時は自前で開く）
+        
         Returns:
             Dict: 正規化されたデータ
         """
         pass
     
-    def _validate_file(self, file_path: str) -> bool:
+    def _validate_file(self, file_path: str, file_kind: Optional[str] = None) -> bool:
         """
         ファイルの基本的な検証
         
         Args:
             file_path: ファイルパス
-            
+            file_kind: マジックバイトで判定したファイル種別（省略時は拡張子で判定）
+        
         Returns:
             bool: ファイルが有効な場合True
         """
         if not os.path.exists(file_path):
             return False
         
-        file_extension = os.path.splitext(file_path)[1].lower()
-        return file_extension in self.supported_extensions
+        if file_kind is None:
+            file_kind = os.path.splitext(file_path)[1].lower()
+        return file_kind in self.supported_extensions
     
-    def _extract_numeric_value(self, text: str) -> float:
+    @contextmanager
+    def _open_document(self, file_path: str,
+                       context: Optional[DocumentContext] = None) -> Iterator[DocumentContext]:
         """
-        テキストから数値を抽出する共通処理
+        ドキュメントコンテキストを取得する
         
-        Args:
-            text: 数値を含むテキスト
-            
-        Returns:
-            float: 抽出された数値
+        呼び出し元から渡されたコンテキストはそのまま使い、閉じない。
+        渡されていない場合は一時的に開き、処理後に閉じる。
+        """
+        if context is not None:
+            yield context
+            return
+        
+        with DocumentContext(file_path) as owned_context:
+            yield owned_context
+    
+    def _build_page_index(self, document: DocumentContext, sales_markers: List[str],
+                          purchase_markers: List[str]) -> PageIndex:
         """
-        if pd.isna(text) or text is None:
-            return 0.0
+        ページ分類インデックスを取得
         
-        # 文字列に変換
-        text = str(text)
+        同じ会社の前回の解析でページ範囲を記録していれば、ページ数が同じで各範囲の
+        先頭ページに目印があることを確認して再利用する。それ以外は全ページを走査する。
+        """
+        profile = document.profile
+        if profile is not None and profile.parser == self.parser_name and profile.page_ranges \
+                and profile.page_count == document.page_count:
+            page_index = PageIndex.from_ranges(document.page_count, profile.page_ranges)
+            markers = {PAGE_HEADER: HEADER_MARKERS, PAGE_SALES: sales_markers, PAGE_PURCHASE: purchase_markers}
+            if page_index is not None and page_index.validate(document.page_text, markers):
+                return page_index
         
-        # カンマと円マークを除去
-        text = text.replace(',', '').replace('¥', '').replace('￥', '')
+        return PageIndex.build(document.iter_page_texts(), sales_markers, purchase_markers)
+    
+    def _remember_profile(self, document: DocumentContext, result: Dict[str, Any], **layout: Any) -> None:
+        """
+        明細を抽出できた場合に、判定したパーサーとレイアウトを会社ごとに記録する
         
-        # 数値以外の文字を除去（負号は保持）
-        import re
-        numeric_text = re.sub(r'[^\d.-]', '', text)
+        Args:
+            document: 解析したドキュメントコンテキスト
+            result: 解析結果
+            layout: LayoutProfile の項目（page_count・page_ranges・header_rows・columns）
+        """
+        if not result['sales_items'] and not result['purchase_items']:
+            return
         
-        try:
-            return float(numeric_text) if numeric_text else 0.0
-        except ValueError:
-            return 0.0
+        profile = LayoutProfile(self.parser_name, **layout)
+        if profile != document.profile:
+            document.remember_profile(profile)
+    
+    def _extract_numeric_value(self, text: Any) -> int:
+        """
+        テキストから数値を抽出する共通処理
+        
+        Args:
+            text: 数値を含むテキスト（△・▲・括弧付きは負の金額、全角数字も可）
+        
+        Returns:
+            int: 抽出された金額（円）
+        """
+        return parse_amount(text)
     
     def _standardize_account_name(self, account_name: str) -> str:
         """
@@ -88,20 +234,15 @@ class BaseParser(ABC):
         
         Args:
             account_name: 勘定科目名
-            
+        
         Returns:
             str: 標準化された勘定科目名
         """
         if pd.isna(account_name) or account_name is None:
             return ""
         
-        # 前後の空白を除去
-        account_name = str(account_name).strip()
-        
-        # 全角・半角の統一
-        account_name = account_name.replace('（', '(').replace('）', ')')
-        
-        return account_name
+        # 前後の空白を除去（全角・半角は抽出時に正規化済み）
+        return str(account_name).strip()
     
     def _create_standard_output(self, sales_data: List[Dict], purchase_data: List[Dict], 
                               metadata: Dict = None) -> Dict[str, Any]:
@@ -112,7 +253,7 @@ class BaseParser(ABC):
             sales_data: 売上データリスト
             purchase_data: 仕入データリスト
             metadata: メタデータ
-            
+        
         Returns:
             Dict: 標準化されたデータ
         """
@@ -0,0 +1,128 @@
+import codecs
+import csv
+from typing import Iterator, List, Optional, TextIO
+
+import pandas as pd
+from pandas.errors import EmptyDataError
+
+# 文字コードの判定に使う先頭のバイト数
+ENCODING_SAMPLE_BYTES = 64 * 1024
+
+# 明細を読み込む1回あたりの行数（メモリ使用量はこの行数分で頭打ちになる）
+CSV_CHUNK_ROWS = 10000
+
+def detect_encoding(file_path: str, sample_bytes: int = ENCODING_SAMPLE_BYTES) -> str:
+    """
+    CSVの文字コードを判定する
+    
+    BOM付きUTF-8、UTF-8（先頭を UTF-8 として復号できる場合）、Shift_JIS（cp932）の順に判定する。
+    
+    Args:
+        file_path: CSVファイルのパス
+        sample_bytes: 判定に使う先頭のバイト数
+    
+    Returns:
+        str: Pythonの文字コード名（'utf-8-sig' / 'utf-8' / 'cp932'）
+    """
+    with open(file_path, 'rb') as file:
+        sample = file.read(sample_bytes)
+    
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    
+    try:
+        # 末尾で途切れたマルチバイト文字は誤りとしない
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'cp932'
+
+class CsvContext:
+    """
+    CSVファイル1件分の共有コンテキスト
+    
+    文字コードは一度だけ判定する。形式判定・メタデータ抽出・見出し行の探索に使う
+    冒頭の行はキャッシュし、明細は pd.read_csv の chunksize で一定行数ずつ読み込んで
+    ファイル全体をメモリに載せない。
+    """
+    
+    def __init__(self, file_path: str, chunk_rows: Optional[int] = None):
+        """
+        Args:
+            file_path: CSVファイルのパス
+            chunk_rows: 明細を読み込む1回あたりの行数（Noneの場合は CSV_CHUNK_ROWS）
+        """
+        self.file_path = file_path
+        self.chunk_rows = chunk_rows or CSV_CHUNK_ROWS
+        self._encoding: Optional[str] = None
+        # 読み込み済みの冒頭の行と、ファイル末尾まで読んだかどうか
+        self._head: List[List[str]] = []
+        self._complete = False
+    
+    @property
+    def encoding(self) -> str:
+        """
+        ファイルの文字コード（初回アクセス時に一度だけ判定する）
+        """
+        if self._encoding is None:
+            self._encoding = detect_encoding(self.file_path)
+        return self._encoding
+    
+    def _open(self) -> TextIO:
+        # 判定範囲の外に不正なバイトがあっても解析は続ける
+        return open(self.file_path, encoding=self.encoding, errors='replace', newline='')
+    
+    def head(self, max_row: int) -> List[List[str]]:
+        """
+        冒頭の行（キャッシュ済みの行で足りない場合だけファイルを読む）
+        
+        Args:
+            max_row: 返す最大行数
+        
+        Returns:
+            List[List[str]]: セルの文字列のリスト（行末の空欄は含まない）
+        """
+        if len(self._head) < max_row and not self._complete:
+            with self._open() as file:
+                rows = []
+                for row in csv.reader(file):
+                    while row and row[-1] == '':
+                        row.pop()
+                    rows.append(row)
+                    if len(rows) >= max_row:
+                        break
+                else:
+                    self._complete = True
+            self._head = rows
+        return self._head[:max_row]
+    
+    def chunks(self, skip_rows: int, width: int) -> Iterator[pd.DataFrame]:
+        """
+        skip_rows 行目以降を chunk_rows 行ずつDataFrameとして読み込む
+        
+        列は先頭から width 列に揃え（多い列は捨て、足りない列は空文字列）、値は
+        文字列のまま返す。
+        
+        Args:
+            skip_rows: 読み飛ばす先頭の行数（見出し行まで）
+            width: 列数
+        
+        Returns:
+            Iterator[pd.DataFrame]: 列名が 0..width-1 のDataFrame
+        """
+        with self._open() as file:
+            # 引用符内の改行を含む行も1行として数える
+            reader = csv.reader(file)
+            for _ in range(skip_rows):
+                if next(reader, None) is None:
+                    return
+            
+            try:
+                chunk_reader = pd.read_csv(file, header=None, names=range(width), usecols=range(width), dtype=str,
+                                     keep_default_na=False, skip_blank_lines=False, chunksize=self.chunk_rows)
+            except EmptyDataError:
+                # 見出し行以降に行がない
+                return
+            
+            with chunk_reader:
+                yield from chunk_reader
@@ -0,0 +1,362 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+from .delimited import CsvContext
+from .excel_engines import get_engine
+from .header import HEADER_PAGE_LIMIT
+from .pdf_backends import PdfTextBackend, TextFragment, get_backend_class
+from .profiles import LayoutProfile, ProfileStore, find_company_name, profile_key
+from .signature import FileSignature, sniff_file
+from .text import normalize_text
+from .workbook import WorkbookContext
+
+# 並列抽出に切り替える最小ページ数（これ未満は直列で抽出する）
+DEFAULT_PARALLEL_THRESHOLD = 64
+
+# Excelで会社名を探す範囲（先頭シートの行数・列数）
+WORKBOOK_HEADER_ROWS = 20
+WORKBOOK_HEADER_COLUMNS = 10
+
+def _extract_pages(file_path: str, page_numbers: List[int], backend_name: str) -> List[str]:
+    """
+    ワーカープロセスで指定ページのテキストを抽出する
+    
+    Args:
+        file_path: PDFファイルのパス
+        page_numbers: 抽出するページ番号（0始まり）
+        backend_name: テキスト抽出バックエンド名
+    
+    Returns:
+        List[str]: page_numbersと同じ順序のテキスト（正規化済み）
+    """
+    backend = get_backend_class(backend_name)(file_path)
+    try:
+        return [normalize_text(backend.extract_page(page_number)) for page_number in page_numbers]
+    finally:
+        backend.close()
+
+class DocumentContext:
+    """
+    解析対象ファイル1件分の共有コンテキスト
+    
+    PDFは一度だけ開き、各ページのテキストは初回アクセス時に抽出し、正規化して
+    （parsers.text.normalize_text）キャッシュする。
+    ParserFactoryの形式判定と各パーサーの解析処理で同じインスタンスを共有することで、
+    同じページを何度も抽出しないようにする。
+    
+    ページ数の多いPDFは prefetch_pages() でページ範囲を複数プロセスに分割して
+    並列に抽出できる。page_numbers を指定すると、PDFの一部のページだけを
+    1つの文書として扱う（ページ番号は指定したページの並びでの0始まりになる）。
+    
+    profile_store を指定すると、会社名とベンダー指紋をキーに前回の解析で記録した
+    レイアウト（LayoutProfile）を参照・記録できる。
+    
+    cache_pages=False の場合はページのテキスト・断片をキャッシュせず、必要になるたびに
+    抽出する。判定・ページ分類・明細の抽出で同じページを抽出し直す代わりに、保持する
+    テキストは iter_lines() などで読んでいる1ページ分になる（ページ数の多いPDFで
+    メモリ使用量を抑える場合に使う）。
+    """
+    
+    def __init__(self, file_path: str, max_workers: Optional[int] = None,
+                 parallel_threshold: int = DEFAULT_PARALLEL_THRESHOLD,
+                 pdf_backend: Optional[str] = None,
+                 page_numbers: Optional[Sequence[int]] = None,
+                 profile_store: Optional[ProfileStore] = None,
+                 excel_engine: Optional[str] = None,
+                 cache_pages: bool = True):
+        """
+        Args:
+            file_path: 解析対象ファイルのパス
+            max_workers: 並列抽出のワーカー数（Noneの場合はCPUコア数、1以下で並列抽出しない）
+            parallel_threshold: 並列抽出に切り替える未抽出ページ数の下限
+            pdf_backend: テキスト抽出バックエンド名（省略時は環境変数 TAX_CONVERTER_PDF_BACKEND、未設定ならPyPDF2）
+            page_numbers: 対象とするPDFのページ番号（0始まり、Noneの場合は全ページ）
+            profile_store: レイアウトプロファイルの保存先（Noneの場合は参照・記録しない）
+            excel_engine: Excel読み込みエンジン名（省略時は環境変数 TAX_CONVERTER_EXCEL_ENGINE、未設定ならopenpyxl）
+            cache_pages: 抽出したページのテキスト・断片をキャッシュする場合True
+        """
+        self.file_path = file_path
+        self.max_workers = max_workers
+        self.parallel_threshold = parallel_threshold
+        self.pdf_backend = pdf_backend
+        self.excel_engine = excel_engine
+        self.cache_pages = cache_pages
+        self.page_numbers = list(page_numbers) if page_numbers is not None else None
+        self.extension = os.path.splitext(file_path)[1].lower()
+        self._backend: Optional[PdfTextBackend] = None
+        self._page_texts: Dict[int, str] = {}
+        self._page_fragments: Dict[int, List[TextFragment]] = {}
+        self._workbook: Optional[WorkbookContext] = None
+        self._csv: Optional[CsvContext] = None
+        # ParserFactoryがバイト列の判定結果を設定する（未設定の場合は種別のみ判定）
+        self.signature: Optional[FileSignature] = None
+        self.profile_store = profile_store
+        self._profile_key: Optional[str] = None
+        self._profile_loaded = False
+        self._profile: Optional[LayoutProfile] = None
+    
+    def __enter__(self) -> 'DocumentContext':
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+    
+    @property
+    def file_kind(self) -> Optional[str]:
+        """
+        マジックバイトで判定したファイル種別（'.pdf' / '.xlsx' など）
+        """
+        if self.signature is None:
+            self.signature = sniff_file(self.file_path)
+        return self.signature.kind
+    
+    @property
+    def backend(self) -> PdfTextBackend:
+        """
+        PDFテキスト抽出バックエンド（初回アクセス時に一度だけファイルを開く）
+        
+        抽出ライブラリはPDFを扱う場合にのみ必要なため、ここで初めてインポートされる。
+        """
+        if self._backend is None:
+            self._backend = get_backend_class(self.pdf_backend)(self.file_path, self.cache_pages)
+        return self._backend
+    
+    @property
+    def workbook(self) -> WorkbookContext:
+        """
+        Excelブックの共有コンテキスト（初回アクセス時に、種別を読めるエンジンで一度だけ開く）
+        """
+        if self._workbook is None:
+            self._workbook = WorkbookContext(self.file_path, get_engine(self.excel_engine, self.file_kind))
+        return self._workbook
+    
+    @property
+    def csv(self) -> CsvContext:
+        """
+        CSVファイルの共有コンテキスト（文字コードの判定と冒頭の行を共有する）
+        """
+        if self._csv is None:
+            self._csv = CsvContext(self.file_path)
+        return self._csv
+    
+    @property
+    def page_count(self) -> int:
+        """
+        PDFのページ数（page_numbers を指定した場合はその数）
+        """
+        if self.page_numbers is not None:
+            return len(self.page_numbers)
+        return self.backend.page_count
+    
+    def source_page(self, page_number: int) -> int:
+        """
+        文書内のページ番号をPDFのページ番号に変換する
+        """
+        if self.page_numbers is not None:
+            return self.page_numbers[page_number]
+        return page_number
+    
+    def add_page_texts(self, page_texts: Dict[int, str]) -> None:
+        """
+        抽出・正規化済みのページテキストをキャッシュに登録する
+        
+        別のコンテキストで抽出済みのテキストを引き継ぎ、同じページを抽出し直さないようにする。
+        
+        Args:
+            page_texts: 文書内のページ番号とテキスト
+        """
+        if not self.cache_pages:
+            return
+        for page_number, text in page_texts.items():
+            self._page_texts.setdefault(page_number, text)
+    
+    def page_text(self, page_number: int) -> str:
+        """
+        指定ページのテキストを取得（抽出結果は正規化してキャッシュする）
+        
+        Args:
+            page_number: 0始まりのページ番号
+        
+        Returns:
+            str: ページのテキスト
+        """
+        text = self._page_texts.get(page_number)
+        if text is None:
+            text = normalize_text(self.backend.extract_page(self.source_page(page_number)))
+            if self.cache_pages:
+                self._page_texts[page_number] = text
+        return text
+    
+    @property
+    def supports_layout(self) -> bool:
+        """
+        バックエンドが位置付きテキストの抽出に対応しているか
+        """
+        return self.backend.supports_layout
+    
+    def page_fragments(self, page_number: int) -> List[TextFragment]:
+        """
+        指定ページの位置付きテキスト断片を取得（抽出結果はキャッシュする）
+        
+        断片と同じ走査で得たページテキストもキャッシュするため、その後の
+        page_text() で同じページを抽出し直すことはない。
+        
+        Args:
+            page_number: 0始まりのページ番号
+        
+        Returns:
+            List[TextFragment]: テキスト断片
+        """
+        fragments = self._page_fragments.get(page_number)
+        if fragments is None:
+            text, fragments = self.backend.extract_page_layout(self.source_page(page_number))
+            fragments = [fragment._replace(text=normalize_text(fragment.text)) for fragment in fragments]
+            if self.cache_pages:
+                self._page_texts.setdefault(page_number, normalize_text(text))
+                self._page_fragments[page_number] = fragments
+        return fragments
+    
+    def has_page_layout(self, page_number: int) -> bool:
+        """
+        ページの位置付きテキストを使えるか
+        
+        抽出済みの場合と、まだテキストも取得していない場合（断片と同じ走査でテキストも
+        得られる）はTrue。別のコンテキストから引き継いだテキストだけがあるページは、
+        断片のために抽出し直さないようFalseを返す。
+        """
+        if not self.supports_layout:
+            return False
+        return page_number in self._page_fragments or page_number not in self._page_texts
+    
+    def iter_page_texts(self, max_pages: Optional[int] = None) -> Iterator[str]:
+        """
+        先頭からページのテキストを順に返す
+        
+        Args:
+            max_pages: 読み込む最大ページ数（Noneの場合は全ページ）
+        """
+        page_count = self.page_count
+        if max_pages is not None:
+            page_count = min(page_count, max_pages)
+        
+        for page_number in range(page_count):
+            yield self.page_text(page_number)
+    
+    def iter_lines(self, page_numbers: Optional[Iterable[int]] = None) -> Iterator[str]:
+        """
+        ページ順に前後の空白を除いた行を返す
+        
+        文書全体を連結・分割せず、1ページずつ行に分割して返す。ページは読み進めた時点で
+        取得するため、cache_pages=False の場合に保持するのは読んでいるページだけになる。
+        
+        Args:
+            page_numbers: 対象ページ番号（Noneの場合は全ページ）
+        """
+        if page_numbers is None:
+            page_numbers = range(self.page_count)
+        
+        for page_number in page_numbers:
+            for line in self.page_text(page_number).splitlines():
+                yield line.strip()
+    
+    def prefetch_pages(self) -> None:
+        """
+        未抽出のページをまとめて抽出してキャッシュする
+        
+        未抽出ページ数が閾値以上でワーカーが2つ以上使える場合は、ページを
+        ワーカー数の連続した範囲に分割してProcessPoolExecutorで並列に抽出し、
+        ページ順に格納する。それ以外は直列で抽出する。キャッシュしない場合は何もしない。
+        """
+        if not self.cache_pages:
+            return
+        
+        missing = [page_number for page_number in range(self.page_count)
+                   if page_number not in self._page_texts]
+        
+        workers = min(self.max_workers or os.cpu_count() or 1, len(missing))
+        if workers > 1 and len(missing) >= self.parallel_threshold:
+            chunk_size = -(-len(missing) // workers)
+            shards = [missing[start:start + chunk_size] for start in range(0, len(missing), chunk_size)]
+            try:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    source_shards = [[self.source_page(page_number) for page_number in shard] for shard in shards]
+                    results = executor.map(_extract_pages, [self.file_path] * len(shards), source_shards,
+                                           [self.backend.name] * len(shards))
+                    for shard, texts in zip(shards, results):
+                        self._page_texts.update(zip(shard, texts))
+                return
+            except Exception:
+                # プロセスを起動できない環境では直列抽出に切り替える
+                pass
+        
+        for page_number in missing:
+            self.page_text(page_number)
+    
+    def _header_texts(self) -> Iterable[str]:
+        """
+        会社名を探すヘッダー部分のテキスト（PDFは先頭ページ、Excel・CSVは冒頭のセル）
+        """
+        if self.file_kind == '.pdf':
+            return self.iter_page_texts(max_pages=HEADER_PAGE_LIMIT)
+        
+        if self.file_kind in ('.xlsx', '.xls', '.csv'):
+            if self.file_kind != '.csv':
+                workbook = self.workbook
+                rows = workbook.iter_rows(workbook.sheet_names[0], max_row=WORKBOOK_HEADER_ROWS)
+            else:
+                rows = self.csv.head(WORKBOOK_HEADER_ROWS)
+            cells = [normalize_text(str(value)) for row in rows
+                     for value in row[:WORKBOOK_HEADER_COLUMNS] if value]
+            return ['\n'.join(cells)]
+        
+        return []
+    
+    @property
+    def profile_key(self) -> Optional[str]:
+        """
+        レイアウトプロファイルのキー（会社名・ベンダー指紋・ファイル種別）
+        
+        保存先がない場合と会社名が見つからない場合はNone。
+        """
+        if self.profile_store is None or self.page_numbers is not None:
+            return None
+        
+        if self._profile_key is None:
+            try:
+                company_name = find_company_name(self._header_texts())
+            except Exception:
+                company_name = None
+            if company_name is None:
+                return None
+            vendors = self.signature.vendors if self.signature is not None else set()
+            self._profile_key = profile_key(company_name, vendors, self.file_kind)
+        return self._profile_key
+    
+    @property
+    def profile(self) -> Optional[LayoutProfile]:
+        """
+        前回の解析で記録したレイアウト（記録がない場合はNone）
+        """
+        if not self._profile_loaded:
+            key = self.profile_key
+            self._profile = self.profile_store.get(key) if key is not None else None
+            self._profile_loaded = True
+        return self._profile
+    
+    def remember_profile(self, profile: LayoutProfile) -> None:
+        """
+        解析で判定・探索したレイアウトを記録する（保存先・会社名がない場合は何もしない）
+        """
+        key = self.profile_key
+        if key is not None:
+            self.profile_store.put(key, profile)
+    
+    def close(self) -> None:
+        """
+        開いているファイルを閉じる（抽出済みテキスト・読み込み済みの行のキャッシュは保持する）
+        """
+        if self._backend is not None:
+            self._backend.close()
+            self._backend = None
+        if self._workbook is not None:
+            self._workbook.close()
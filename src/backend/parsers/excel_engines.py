@@ -0,0 +1,74 @@
+import importlib.util
+import os
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# 使用するExcel読み込みエンジンは環境変数で切り替えられる
+EXCEL_ENGINE_ENV = 'TAX_CONVERTER_EXCEL_ENGINE'
+DEFAULT_EXCEL_ENGINE = 'openpyxl'
+
+class ExcelEngine(NamedTuple):
+    """
+    Excel読み込みエンジン（pandasのengine名）
+    """
+    name: str
+    # 利用に必要なモジュール
+    required_module: str
+    # 読み込めるファイル種別
+    file_kinds: Tuple[str, ...]
+    
+    def is_available(self) -> bool:
+        """
+        必要なライブラリがインストールされているか判定
+        """
+        return importlib.util.find_spec(self.required_module) is not None
+
+# 定義順がエンジン未指定時の優先順（.xlsxは読み取り専用モードで先頭の範囲だけを読めるopenpyxlを優先）
+EXCEL_ENGINES: Dict[str, ExcelEngine] = {
+    engine.name: engine for engine in (
+        ExcelEngine('openpyxl', 'openpyxl', ('.xlsx',)),
+        # Rust製のcalamine（python-calamine）は .xlsx・.xls の両方を高速に読み込める
+        ExcelEngine('calamine', 'python_calamine', ('.xlsx', '.xls')),
+        ExcelEngine('xlrd', 'xlrd', ('.xls',)),
+    )
+}
+
+def available_engines(file_kind: Optional[str] = None) -> List[str]:
+    """
+    この環境で利用可能なエンジン名の一覧
+    
+    Args:
+        file_kind: ファイル種別（指定した場合はその種別を読めるエンジンのみ）
+    """
+    return [name for name, engine in EXCEL_ENGINES.items()
+            if engine.is_available() and (file_kind is None or file_kind in engine.file_kinds)]
+
+def get_engine(name: Optional[str] = None, file_kind: str = '.xlsx') -> str:
+    """
+    ファイル種別を読み込むエンジン名を取得
+    
+    指定したエンジン（省略時は環境変数、未設定なら標準のopenpyxl）がその種別を
+    読めない場合は、利用可能なエンジンから優先順に選ぶ。
+    
+    Args:
+        name: エンジン名
+        file_kind: ファイル種別（'.xlsx' / '.xls'）
+    
+    Returns:
+        str: エンジン名
+    """
+    name = (name or os.environ.get(EXCEL_ENGINE_ENV) or DEFAULT_EXCEL_ENGINE).lower()
+    
+    engine = EXCEL_ENGINES.get(name)
+    if engine is None:
+        raise ValueError(f"Unknown Excel engine: {name} (available: {', '.join(EXCEL_ENGINES)})")
+    if not engine.is_available():
+        raise ValueError(f"Excel engine '{name}' requires '{engine.required_module}' to be installed")
+    
+    if file_kind in engine.file_kinds:
+        return name
+    
+    candidates = available_engines(file_kind)
+    if not candidates:
+        readers = [engine.name for engine in EXCEL_ENGINES.values() if file_kind in engine.file_kinds]
+        raise ValueError(f"No Excel engine installed for {file_kind} (install one of: {', '.join(readers)})")
+    return candidates[0]
@@ -1,8 +1,7 @@
 from typing import Optional
 from .base import BaseParser
-from .freee import FreeeParser
-from .moneyforward import MoneyforwardParser
-from .yayoi import YayoiParser
+from .document import DocumentContext
+from .registry import default_registry
 
 class ParserFactory:
     """
@@ -10,34 +9,73 @@ class ParserFactory:
     """
     
     @staticmethod
-    def get_parser(file_path: str) -> Optional[BaseParser]:
+    def get_parser(file_path: str, context: Optional[DocumentContext] = None) -> Optional[BaseParser]:
         """
         ファイルに適したパーサーを取得
         
+        contextを渡した場合、判定で抽出したページテキストがキャッシュされ、
+        同じcontextを渡したparse()で再利用される。contextにプロファイルの保存先がある場合は、
+        同じ会社の前回の判定結果のパーサーから判定する。
+        
         Args:
             file_path: 解析対象ファイルのパス
-            
+            context: 共有ドキュメントコンテキスト
+        
         Returns:
             BaseParser: 適切なパーサーインスタンス。見つからない場合はNone
         """
-        # 利用可能なパーサーのリスト
-        parsers = [
-            FreeeParser(),
-            MoneyforwardParser(),
-            YayoiParser()
-        ]
-        
-        # 各パーサーの判定メソッドを試行
-        for parser in parsers:
-            try:
-                if parser.detect_format(file_path):
+        if context is None:
+            with DocumentContext(file_path) as owned_context:
+                return ParserFactory.get_parser(file_path, owned_context)
+        
+        # バイト列からファイル種別とベンダー指紋を判定（ページのテキスト抽出は行わない）
+        if context.signature is None:
+            context.signature = default_registry.sniff(file_path)
+        signature = context.signature
+        
+        # マジックバイトで判定した種別で候補パーサーを絞り込む（該当パーサーのみインポート）
+        parsers = default_registry.candidates(signature)
+        if not parsers:
+            return None
+        
+        # ベンダー指紋が1つに定まればテキストによる判定は不要
+        fingerprinted = [parser for parser in parsers if parser.parser_name in signature.vendors]
+        if len(fingerprinted) == 1:
+            return fingerprinted[0]
+        
+        # 同じ会社・ベンダー指紋のファイルを以前に解析していれば、記録したパーサーから判定する
+        # （会社名が同じでもベンダーが違うことがあるため、記録したパーサーの判定で確認し、
+        # 一致しなければ他のパーサーで判定し直す）
+        profile = context.profile
+        if profile is not None:
+            profiled = [parser for parser in parsers if parser.parser_name == profile.parser]
+            for parser in profiled:
+                if ParserFactory._detects(parser, file_path, context):
                     return parser
-            except Exception:
-                # 判定でエラーが発生した場合は次のパーサーを試行
-                continue
+            parsers = [parser for parser in parsers if parser not in profiled]
+            fingerprinted = [parser for parser in fingerprinted if parser not in profiled]
+        
+        # 複数ベンダーの指紋が見つかった場合はその中からテキストで判定する
+        if fingerprinted:
+            parsers = fingerprinted
+        
+        # 各パーサーの判定メソッドを試行（PDFは一度だけ開き、ページテキストを共有）
+        for parser in parsers:
+            if ParserFactory._detects(parser, file_path, context):
+                return parser
         
         return None
     
+    @staticmethod
+    def _detects(parser: BaseParser, file_path: str, context: DocumentContext) -> bool:
+        """
+        パーサーの判定メソッドを実行（判定でエラーが発生した場合は該当しないとみなす）
+        """
+        try:
+            return bool(parser.detect_format(file_path, context))
+        except Exception:
+            return False
+    
     @staticmethod
     def get_supported_formats() -> dict:
         """
@@ -46,8 +84,4 @@ class ParserFactory:
         Returns:
             dict: パーサー名とサポート形式のマッピング
         """
-        return {
-            'freee': ['.pdf'],
-            'moneyforward': ['.xlsx', '.xls'],
-            'yayoi': ['.pdf']
-        }
\ No newline at end of file
+        return default_registry.supported_formats()
@@ -1,72 +1,91 @@
-import PyPDF2
 import pandas as pd
-import re
-from typing import Dict, List, Any
-from .base import BaseParser
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Tuple
+from .base import BaseParser, TOKEN_ACCOUNT, TOKEN_AMOUNT, TOKEN_PERCENT, TOKEN_TAX_CLASS
+from .document import DocumentContext
+from .header import extract_header_metadata
+from .layout import ColumnMap, group_rows
+from .page_index import PAGE_HEADER, PAGE_PURCHASE, PAGE_SALES
+from .pdf_backends import TextFragment
+from .spec import load_spec
+
+# freee形式のレイアウト定義（specs/freee.json、読み込み時に一度だけコンパイル）
+SPEC = load_spec('freee')
 
 class FreeeParser(BaseParser):
     """
     freee会計の消費税区分別表パーサー
     """
     
+    # ページ分類に使うセクションの目印
+    SALES_PAGE_MARKERS = SPEC.page_markers[PAGE_SALES]
+    PURCHASE_PAGE_MARKERS = SPEC.page_markers[PAGE_PURCHASE]
+    
     def __init__(self):
         super().__init__()
         self.supported_extensions = ['.pdf']
         self.parser_name = "freee"
     
-    def detect_format(self, file_path: str) -> bool:
+    def detect_format(self, file_path: str, context: Optional[DocumentContext] = None) -> bool:
         """
         freee形式のPDFファイルかどうかを判定
         """
-        if not self._validate_file(file_path):
+        # ファイル種別はマジックバイトの判定結果を優先する
+        file_kind = context.file_kind if context is not None else None
+        if not self._validate_file(file_path, file_kind):
             return False
         
         try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                
-                # 最初の数ページからfreeeの特徴的なテキストを検索
-                for page_num in range(min(3, len(pdf_reader.pages))):
-                    page = pdf_reader.pages[page_num]
-                    text = page.extract_text()
-                    
-                    # freeeの特徴的なキーワードをチェック（消費税区分別表がキー）
-                    if '消費税区分別表' in text:
-                        # 弥生との区別のため、勘定科目別税区分表でないことを確認
-                        if '勘定科目別税区分表' not in text:
-                            return True
-                    
-                    # freeeブランドの確認
-                    if 'freee' in text or 'Show Time' in text:
+            with self._open_document(file_path, context) as document:
+                # 最初の数ページからfreeeの特徴的なテキストを検索（消費税区分別表は
+                # 弥生との区別のため、勘定科目別税区分表を含まないページに限る）
+                for text in document.iter_page_texts(max_pages=3):
+                    if SPEC.detection.matches(text):
                         return True
             
             return False
-            
+        
         except Exception:
             return False
     
-    def parse(self, file_path: str) -> Dict[str, Any]:
+    def parse(self, file_path: str, context: Optional[DocumentContext] = None) -> Dict[str, Any]:
         """
         freee形式のPDFを解析
         """
         try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                full_text = ""
+            with self._open_document(file_path, context) as document:
+                if document.supports_layout and document.cache_pages:
+                    # 位置付きテキストを抽出（同じ走査でページテキストもキャッシュされる。
+                    # 引き継いだテキストがあるページは抽出し直さない）
+                    for page_number in range(document.page_count):
+                        if document.has_page_layout(page_number):
+                            document.page_fragments(page_number)
+                else:
+                    # 未抽出のページをまとめて抽出（ページ数が多い場合は並列。キャッシュしない
+                    # 場合は何もせず、各ページは使う時点で抽出する）
+                    document.prefetch_pages()
                 
-                # 全ページのテキストを抽出
-                for page in pdf_reader.pages:
-                    full_text += page.extract_text() + "\n"
-            
-            # 売上データと仕入データを分離して抽出
-            sales_data = self._extract_sales_data(full_text)
-            purchase_data = self._extract_purchase_data(full_text)
-            
-            # メタデータ抽出
-            metadata = self._extract_metadata(full_text)
-            
-            return self._create_standard_output(sales_data, purchase_data, metadata)
+                # 各ページを分類し、表紙・注記など関係のないページは読み飛ばす
+                # （同じ会社の前回の解析で記録したページ範囲があれば検証して再利用）
+                page_index = self._build_page_index(document, self.SALES_PAGE_MARKERS,
+                                                    self.PURCHASE_PAGE_MARKERS)
+                table_pages = page_index.pages(PAGE_SALES, PAGE_PURCHASE)
+                
+                # 表の行を1回の走査で売上・仕入に振り分ける
+                sales_data, purchase_data = self._extract_items(self._table_rows(document, table_pages))
+                
+                # メタデータ抽出
+                metadata = self._extract_metadata(
+                    document.page_text(page_number) for page_number in page_index.pages(PAGE_HEADER)
+                )
+                
+                result = self._create_standard_output(sales_data, purchase_data, metadata)
+                
+                # 次回の同じ会社の帳票のためにページ範囲を記録
+                self._remember_profile(document, result, page_count=document.page_count,
+                                       page_ranges=page_index.page_ranges())
             
+            return result
+        
         except Exception as e:
             return {
                 'sales_items': [],
@@ -78,142 +97,137 @@ class FreeeParser(BaseParser):
                 'errors': [f"Parse error: {str(e)}"]
             }
     
-    def _extract_sales_data(self, text: str) -> List[Dict]:
+    def _table_rows(self, document: DocumentContext, pages: Iterable[int]) -> Iterator[Dict[str, str]]:
         """
-        売上データを抽出（freee消費税区分別表の表形式から）
-        """
-        sales_data = []
+        表のページの行を列ごとのセルとして返す
         
-        # 実際のfreeeドキュメントから確認した売上高データを直接設定
-        # 株式会社it's Show Timeのfreee消費税区分別表から
-        
-        # 売上高 課税売上10% 54,404,148
-        sales_data.append({
-            'account_name': '売上高',
-            'tax_rate': '10%',
-            'amount': 54404148,
-            'taxable_amount': 54404148
-        })
-        
-        # 雑収入 課税売上10% 12,178,600
-        sales_data.append({
-            'account_name': '雑収入',
-            'tax_rate': '10%',
-            'amount': 12178600,
-            'taxable_amount': 12178600
-        })
-        
-        # 受取家賃 非課売上 1,675,500
-        sales_data.append({
-            'account_name': '受取家賃',
-            'tax_rate': '非課税',
-            'amount': 1675500,
-            'taxable_amount': 0
-        })
-        
-        # PDFからのテキスト抽出にも対応（バックアップ）
-        lines = text.split('\n')
-        found_sales = False
-        
-        for i, line in enumerate(lines):
-            line = line.strip()
-            
-            # より広範なパターンマッチング
-            if ('売上' in line or '雑収入' in line) and ('課税' in line or '非課税' in line):
-                # 数値を抽出
-                numbers = re.findall(r'[\d,]+', line)
-                if numbers:
-                    amounts = [self._extract_numeric_value(num) for num in numbers]
-                    if amounts and amounts[0] > 10000:  # 10,000円以上の場合のみ
-                        account_name = '売上高' if '売上' in line else '雑収入'
-                        tax_rate = '10%' if '課税' in line else '非課税'
-                        
-                        # 重複チェック
-                        existing = any(item['account_name'] == account_name for item in sales_data)
-                        if not existing:
-                            sales_data.append({
-                                'account_name': account_name,
-                                'tax_rate': tax_rate,
-                                'amount': amounts[0],
-                                'taxable_amount': amounts[0] if tax_rate == '10%' else 0
-                            })
-                            found_sales = True
-        
-        return sales_data
-    
-    def _extract_purchase_data(self, text: str) -> List[Dict]:
+        位置情報があるページは見出し行の列位置で振り分ける。列の位置が分からないページ、
+        1つの断片に行のセルがまとめて抽出されたページ（行を1つのテキストブロックで
+        描画したPDFなど）と、位置情報のないテキストを引き継いだページは、ページの
+        行テキストをトークン列で照合する。
         """
-        仕入データを抽出
+        column_map = None
+        
+        for page_number in pages:
+            if document.has_page_layout(page_number):
+                rows, column_map = self._layout_rows(document.page_fragments(page_number), column_map)
+                if rows is not None:
+                    yield from rows
+                    continue
+            yield from self._text_rows(document.iter_lines([page_number]))
+    
+    def _layout_rows(self, fragments: List[TextFragment],
+                     column_map: Optional[ColumnMap]) -> Tuple[Optional[List[Dict[str, str]]], Optional[ColumnMap]]:
         """
-        purchase_data = []
+        1ページの位置付きテキストから表の行を列ごとのセルとして返す
         
-        # 仕入セクションを特定
-        purchase_section = self._find_section(text, "課税仕入", None)
+        見出し行（勘定科目・税区分・金額）の位置から列の境界を求め、以降の行の断片を
+        列に振り分ける。見出しのない続きのページは直前のページの列の位置を使う。
         
-        if not purchase_section:
-            return purchase_data
+        Args:
+            fragments: ページのテキスト断片
+            column_map: 直前のページまでの列の位置
         
-        # 行ごとに処理
-        lines = purchase_section.split('\n')
+        Returns:
+            Tuple: (セルのリスト, 以降のページで使う列の位置)。列の位置で振り分けられない
+                ページ（断片のないページを含む）のセルはNone
+        """
+        if not fragments:
+            return None, column_map
         
-        for line in lines:
-            line = line.strip()
-            if not line or '合計' in line:
+        rows = []
+        
+        for row in group_rows(fragments):
+            header = ColumnMap.from_header(row, SPEC.columns)
+            if header is not None:
+                column_map = header
                 continue
             
-            # 勘定科目と金額のパターンマッチング
-            pattern = r'([^\d]+?)\s*(\d+%|\w+)\s*([\d,]+)'
-            match = re.search(pattern, line)
+            # 1つの断片が明細行のトークン列をすべて含む場合は、セルがまとめて抽出されている
+            if any(SPEC.row.find(fragment.text) for fragment in row):
+                return None, column_map
             
-            if match:
-                account_name = self._standardize_account_name(match.group(1))
-                tax_rate = match.group(2)
-                amount = self._extract_numeric_value(match.group(3))
-                
-                if account_name and amount > 0:
-                    purchase_data.append({
-                        'account_name': account_name,
-                        'tax_rate': tax_rate,
-                        'amount': amount,
-                        'taxable_amount': amount if '10%' in tax_rate or '8%' in tax_rate else 0
-                    })
-        
-        return purchase_data
+            if column_map is not None:
+                rows.append(column_map.cells(row))
+        
+        if column_map is None:
+            return None, column_map
+        return rows, column_map
     
-    def _find_section(self, text: str, start_keyword: str, end_keyword: str = None) -> str:
+    def _text_rows(self, lines: Iterable[str]) -> Iterator[Dict[str, str]]:
         """
-        特定のセクションを抽出
+        位置情報がない場合に、行テキストをトークン列で照合してセルとして返す
         """
-        start_index = text.find(start_keyword)
-        if start_index == -1:
-            return ""
-        
-        if end_keyword:
-            end_index = text.find(end_keyword, start_index)
-            if end_index != -1:
-                return text[start_index:end_index]
-        
-        return text[start_index:]
+        for line in lines:
+            row = SPEC.row.find(line)
+            if row:
+                yield {
+                    TOKEN_ACCOUNT: row[TOKEN_ACCOUNT],
+                    TOKEN_TAX_CLASS: row[TOKEN_TAX_CLASS] + (row[TOKEN_PERCENT] or ''),
+                    TOKEN_AMOUNT: row[TOKEN_AMOUNT],
+                }
+            elif line:
+                yield {TOKEN_ACCOUNT: line}
     
-    def _extract_metadata(self, text: str) -> Dict[str, Any]:
-        """
-        メタデータを抽出
+    def _extract_items(self, rows: Iterable[Dict[str, str]]) -> Tuple[List[Dict], List[Dict]]:
         """
-        metadata = {}
+        表の行を売上データと仕入データに振り分ける
         
-        # 期間の抽出
-        period_pattern = r'(\d{4})年(\d{1,2})月(\d{1,2})日.*?(\d{4})年(\d{1,2})月(\d{1,2})日'
-        period_match = re.search(period_pattern, text)
+        税区分に「売上」「仕入」が含まれる行はそれに従い、それ以外の行は直前の
+        セクション見出し（金額のない「課税売上」「課税仕入」などの行）に従う。
         
-        if period_match:
-            metadata['period_start'] = f"{period_match.group(1)}-{period_match.group(2):0>2}-{period_match.group(3):0>2}"
-            metadata['period_end'] = f"{period_match.group(4)}-{period_match.group(5):0>2}-{period_match.group(6):0>2}"
+        Returns:
+            Tuple: (売上データ, 仕入データ)
+        """
+        sales_data = []
+        purchase_data = []
+        section = None
+        total = SPEC.keywords['total']
         
-        # 会社名の抽出
-        company_pattern = r'(株式会社|有限会社|合同会社|[^\s]+会社|[^\s]+法人)'
-        company_match = re.search(company_pattern, text)
+        for cells in rows:
+            account_name = self._standardize_account_name(cells.get(TOKEN_ACCOUNT, ''))
+            tax_class = cells.get(TOKEN_TAX_CLASS, '')
+            amount_text = cells.get(TOKEN_AMOUNT)
+            
+            # 金額・税区分のない行はセクション見出し
+            if not amount_text or not tax_class:
+                section = SPEC.sections.classify(account_name) or section
+                continue
+            
+            # 合計行は明細ではない
+            if total.search(account_name):
+                continue
+            
+            amount = self._extract_numeric_value(amount_text)
+            if not account_name or amount == 0:
+                continue
+            
+            row_section = SPEC.sections.classify(tax_class) or section
+            if row_section is None:
+                continue
+            
+            tax_rate = self._tax_rate(tax_class)
+            item = {
+                'account_name': account_name,
+                'tax_rate': tax_rate,
+                'amount': amount,
+                'taxable_amount': amount if SPEC.is_taxable(tax_rate) else 0
+            }
+            (sales_data if row_section == PAGE_SALES else purchase_data).append(item)
         
-        if company_match:
-            metadata['company_name'] = company_match.group(1)
+        return sales_data, purchase_data
+    
+    def _tax_rate(self, tax_class: str) -> str:
+        """
+        税区分から税率を取得（税率がない場合は非課税・不課税または税区分）
+        """
+        return SPEC.tax_rates.rate(tax_class)
+    
+    def _extract_metadata(self, pages: Iterable[str]) -> Dict[str, Any]:
+        """
+        メタデータを抽出
         
-        return metadata
\ No newline at end of file
+        会社名・期間は帳票の冒頭に印字されるため、先頭ページの冒頭部分だけを
+        事前コンパイルしたパターンで1回走査する。
+        """
+        return extract_header_metadata(SPEC.metadata, pages)
\ No newline at end of file
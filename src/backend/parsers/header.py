@@ -0,0 +1,105 @@
+import re
+from itertools import islice
+from typing import Dict, Iterable, Sequence, Tuple
+
+# ヘッダー領域として走査するページ数と、1ページあたりの文字数
+HEADER_PAGE_LIMIT = 2
+HEADER_CHAR_LIMIT = 2000
+
+# 法人格を含む会社名のパターン（ベンダーによらない、優先順）
+COMPANY_NAME_PATTERNS = [
+    r'((?:株式会社|有限会社|合同会社)[^\s]+)',
+    r'([^\s]+(?:株式会社|有限会社|合同会社))',
+]
+
+def header_region(pages: Iterable[str], page_limit: int = HEADER_PAGE_LIMIT,
+                  char_limit: int = HEADER_CHAR_LIMIT) -> str:
+    """
+    先頭ページの冒頭部分だけを取り出す
+    
+    会社名・期間は帳票の冒頭に印字されるため、メタデータの検索はこの範囲に限定する。
+    ページは必要な分だけ読み進める。
+    
+    Args:
+        pages: ヘッダーを含むページのテキスト（ページ順）
+        page_limit: 対象とするページ数
+        char_limit: 1ページあたりの文字数
+    
+    Returns:
+        str: ページごとの冒頭部分を改行で連結したテキスト
+    """
+    return '\n'.join(text[:char_limit] for text in islice(pages, page_limit))
+
+class HeaderScanner:
+    """
+    ヘッダー領域のメタデータを1回の走査で検索するスキャナー
+    
+    項目ごとに優先順のパターンを受け取り、すべてを1つの正規表現に事前コンパイルする。
+    走査で見つかった一致のうち、項目ごとに優先度の最も高いパターン（同じ優先度なら
+    先に現れたもの）を採用する。
+    """
+    
+    def __init__(self, fields: Dict[str, Sequence[str]]):
+        """
+        Args:
+            fields: 項目名と、優先順に並べたパターン（各パターンのグループが結果になる）
+        """
+        alternatives = []
+        # 外側のグループ番号 → (項目名, 優先度, 内側のグループ数)
+        self._alternatives: Dict[int, Tuple[str, int, int]] = {}
+        group_index = 1
+        
+        for field, patterns in fields.items():
+            for priority, pattern in enumerate(patterns):
+                inner_groups = re.compile(pattern).groups
+                self._alternatives[group_index] = (field, priority, inner_groups)
+                alternatives.append(f'({pattern})')
+                group_index += inner_groups + 1
+        
+        self._regex = re.compile('|'.join(alternatives))
+    
+    def scan(self, text: str) -> Dict[str, Tuple[str, ...]]:
+        """
+        テキストを走査して項目ごとの一致を取得
+        
+        Args:
+            text: ヘッダー領域のテキスト
+        
+        Returns:
+            Dict: 項目名とパターンのグループ（見つからない項目は含まない）
+        """
+        found: Dict[str, Tuple[int, Tuple[str, ...]]] = {}
+        
+        for match in self._regex.finditer(text):
+            # 最後に閉じるのは一致したパターンを囲む外側のグループ
+            outer = match.lastindex
+            field, priority, inner_groups = self._alternatives[outer]
+            
+            if field not in found or priority < found[field][0]:
+                found[field] = (priority, match.groups()[outer:outer + inner_groups])
+        
+        return {field: groups for field, (_, groups) in found.items()}
+
+def extract_header_metadata(scanner: HeaderScanner, pages: Iterable[str]) -> Dict[str, str]:
+    """
+    ヘッダー領域から期間・会社名のメタデータを抽出する
+    
+    Args:
+        scanner: 'period'（開始年・月・日・終了年・月・日）と 'company_name' のパターンを持つスキャナー
+        pages: ヘッダーを含むページのテキスト（ページ順）
+    
+    Returns:
+        Dict: period_start / period_end / company_name（見つかった項目のみ）
+    """
+    found = scanner.scan(header_region(pages))
+    metadata = {}
+    
+    if 'period' in found:
+        start_year, start_month, start_day, end_year, end_month, end_day = found['period']
+        metadata['period_start'] = f"{start_year}-{start_month:0>2}-{start_day:0>2}"
+        metadata['period_end'] = f"{end_year}-{end_month:0>2}-{end_day:0>2}"
+    
+    if 'company_name' in found:
+        metadata['company_name'] = found['company_name'][0]
+    
+    return metadata
@@ -0,0 +1,91 @@
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Sequence
+from .pdf_backends import TextFragment
+
+# 同じ行とみなすy座標の差（ポイント）
+ROW_TOLERANCE = 3.0
+
+def group_rows(fragments: Iterable[TextFragment], tolerance: float = ROW_TOLERANCE) -> List[List[TextFragment]]:
+    """
+    テキスト断片をy座標で行にまとめる
+    
+    Args:
+        fragments: ページのテキスト断片
+        tolerance: 同じ行とみなすy座標の差
+    
+    Returns:
+        List: 上の行から順に、x座標順に並べた断片のリスト
+    """
+    rows: List[List[TextFragment]] = []
+    row_y = None
+    
+    for fragment in sorted(fragments, key=lambda fragment: (-fragment.y, fragment.x)):
+        if row_y is None or row_y - fragment.y > tolerance:
+            rows.append([])
+            row_y = fragment.y
+        rows[-1].append(fragment)
+    
+    for row in rows:
+        row.sort(key=lambda fragment: fragment.x)
+    return rows
+
+class ColumnMap:
+    """
+    表の列の位置
+    
+    見出し行の各列の開始x座標から列の境界（隣り合う列の中間）を事前に計算し、
+    断片のx座標から二分探索で列を決める。
+    """
+    
+    def __init__(self, positions: Dict[str, float]):
+        """
+        Args:
+            positions: 列名と見出しの開始x座標
+        """
+        ordered = sorted(positions.items(), key=lambda item: item[1])
+        self.columns = [name for name, _ in ordered]
+        self._boundaries = [(left + right) / 2 for (_, left), (_, right) in zip(ordered, ordered[1:])]
+    
+    @classmethod
+    def from_header(cls, row: Sequence[TextFragment], labels: Dict[str, Sequence[str]]) -> Optional['ColumnMap']:
+        """
+        見出し行から列の位置を作成
+        
+        Args:
+            row: 見出し候補の行
+            labels: 列名と、その列の見出しとして扱う語（すべての列が見つかった行を見出しとする）
+        
+        Returns:
+            ColumnMap: 列の位置（見出し行でない場合はNone）
+        """
+        positions: Dict[str, float] = {}
+        for fragment in row:
+            name = next((name for name, words in labels.items()
+                         if any(word in fragment.text for word in words)), fragment.text)
+            positions.setdefault(name, fragment.x)
+        
+        if not all(name in positions for name in labels):
+            return None
+        return cls(positions)
+    
+    def column_of(self, x: float) -> str:
+        """
+        x座標が属する列名
+        """
+        return self.columns[bisect_right(self._boundaries, x)]
+    
+    def cells(self, row: Sequence[TextFragment]) -> Dict[str, str]:
+        """
+        行の断片を列ごとのセルにまとめる
+        
+        Args:
+            row: x座標順の断片
+        
+        Returns:
+            Dict: 列名とセルのテキスト（同じ列の断片は連結する。空の列は含まない）
+        """
+        cells: Dict[str, str] = {}
+        for fragment in row:
+            column = self.column_of(fragment.x)
+            cells[column] = cells[column] + fragment.text if column in cells else fragment.text
+        return cells
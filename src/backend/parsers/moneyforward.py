@@ -1,7 +1,47 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
-import openpyxl
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
+from .amount import parse_amount_series
 from .base import BaseParser
+from .document import DocumentContext
+from .page_index import PAGE_PURCHASE, PAGE_SALES
+from .profiles import LayoutProfile
+from .spec import load_spec
+from .text import normalize_frame
+from .workbook import WorkbookContext
+
+# マネーフォワード形式のレイアウト定義（specs/moneyforward.json、読み込み時に一度だけコンパイル）
+SPEC = load_spec('moneyforward')
+
+# Excelの形式判定で読むシート左上の範囲（行数・列数）と、判定に使うキーワード
+DETECTION_ROWS = 9
+DETECTION_COLUMNS = 9
+WORKBOOK_KEYWORDS = SPEC.keywords['workbook']
+
+# セルに含まれる日付（期間）
+PERIOD_PATTERN = re.compile(r'(\d{4})[年/-](\d{1,2})[月/-](\d{1,2})')
+
+# CSVで見出し行を探す冒頭の行数と、プロファイルに記録するシート名
+CSV_HEADER_SCAN_ROWS = 50
+CSV_SHEET_NAME = 'csv'
+
+# シートを並列に解析するファイルサイズの下限（小さいブックはプロセス起動の方が高くつく）
+PARALLEL_MIN_FILE_SIZE = 2 * 1024 * 1024
+
+def _parse_sheet(file_path: str, engine: str, sheet_name: str,
+                 cached_layout: Optional[Dict[str, Any]]) -> tuple:
+    """
+    1シート分の見出し行の探索と明細の抽出（ワーカープロセスでも実行する）
+    
+    Returns:
+        tuple: (対応, 売上データ, 仕入データ)。見出し行がない場合の対応はNone
+    """
+    with WorkbookContext(file_path, engine) as workbook:
+        sheet_df = workbook.frame(sheet_name)
+    return MoneyforwardParser()._parse_sheet_frame(sheet_df, cached_layout)
 
 class MoneyforwardParser(BaseParser):
     """
@@ -10,101 +50,93 @@ class MoneyforwardParser(BaseParser):
     
     def __init__(self):
         super().__init__()
-        self.supported_extensions = ['.xlsx', '.xls', '.pdf']
+        self.supported_extensions = ['.xlsx', '.xls', '.csv', '.pdf']
         self.parser_name = "moneyforward"
     
-    def detect_format(self, file_path: str) -> bool:
+    def detect_format(self, file_path: str, context: Optional[DocumentContext] = None) -> bool:
         """
         マネーフォワード形式のExcel/PDFファイルかどうかを判定
         """
-        if not self._validate_file(file_path):
+        # ファイル種別はマジックバイトの判定結果を優先する
+        file_kind = context.file_kind if context is not None else None
+        if not self._validate_file(file_path, file_kind):
             return False
         
-        file_extension = os.path.splitext(file_path)[1].lower()
+        file_kind = file_kind or os.path.splitext(file_path)[1].lower()
         
         try:
-            if file_extension == '.pdf':
+            if file_kind == '.pdf':
                 # PDFファイルの場合
-                import PyPDF2
-                with open(file_path, 'rb') as file:
-                    pdf_reader = PyPDF2.PdfReader(file)
-                    
-                    # 最初の数ページからマネーフォワードの特徴的なテキストを検索
-                    for page_num in range(min(3, len(pdf_reader.pages))):
-                        page = pdf_reader.pages[page_num]
-                        text = page.extract_text()
-                        
-                        # マネーフォワードの特徴的なキーワードをチェック
-                        if 'マネーフォワード' in text or 'MoneyForward' in text:
-                            return True
-                        
-                        # 勘定科目別税区分集計表（マネーフォワード形式）
-                        if '勘定科目別税区分集計表' in text and 'Cognite' in text:
-                            return True
-                        
-                        # インボイス列があるのもマネーフォワードの特徴
-                        if 'インボイス' in text and '税区分' in text:
+                with self._open_document(file_path, context) as document:
+                    # 最初の数ページからマネーフォワードの特徴的なテキスト（ブランド名・
+                    # Cogniteの勘定科目別税区分集計表・インボイス列）を検索
+                    for text in document.iter_page_texts(max_pages=3):
+                        if SPEC.detection.matches(text):
                             return True
                 
                 return False
+            
+            elif file_kind == '.csv':
+                # CSVファイルの場合（冒頭の行だけを読む）
+                with self._open_document(file_path, context) as document:
+                    for row in document.csv.head(DETECTION_ROWS):
+                        if WORKBOOK_KEYWORDS.search('\n'.join(value for value in row[:DETECTION_COLUMNS] if value)):
+                            return True
                 
+                return False
+            
             else:
-                # Excelファイルの場合
-                workbook = openpyxl.load_workbook(file_path, read_only=True)
-                
-                # シート名やセル内容からマネーフォワードの特徴を検出
-                for sheet_name in workbook.sheetnames:
-                    sheet = workbook[sheet_name]
+                # Excelファイルの場合（ブックは解析と共有するコンテキストで一度だけ開く）
+                with self._open_document(file_path, context) as document:
+                    workbook = document.workbook
                     
-                    # 最初の数行を確認
-                    for row in range(1, min(10, sheet.max_row + 1)):
-                        for col in range(1, min(10, sheet.max_column + 1)):
-                            cell_value = sheet.cell(row, col).value
-                            if cell_value:
-                                cell_text = str(cell_value)
-                                
-                                # マネーフォワードの特徴的なキーワード
-                                mf_keywords = [
-                                    'マネーフォワード',
-                                    'MoneyForward',
-                                    '勘定科目別税区分集計表',
-                                    '税区分集計'
-                                ]
-                                
-                                for keyword in mf_keywords:
-                                    if keyword in cell_text:
-                                        workbook.close()
-                                        return True
+                    # 各シートの左上の範囲だけを読み、最初に見つかった時点で判定を終える
+                    for sheet_name in workbook.sheet_names:
+                        for row in workbook.probe(sheet_name, DETECTION_ROWS, DETECTION_COLUMNS):
+                            # マネーフォワードの特徴的なキーワード（行のセルをまとめて1回で検索）
+                            if WORKBOOK_KEYWORDS.search('\n'.join(str(value) for value in row if value)):
+                                return True
                 
-                workbook.close()
                 return False
-            
+        
         except Exception:
             return False
     
-    def parse(self, file_path: str) -> Dict[str, Any]:
+    def parse(self, file_path: str, context: Optional[DocumentContext] = None) -> Dict[str, Any]:
         """
-        マネーフォワード形式のExcelを解析
+        マネーフォワード形式のExcel/CSVを解析
         """
         try:
-            # Excelファイルを読み込み
-            df = pd.read_excel(file_path, sheet_name=None)  # 全シートを読み込み
-            
             sales_data = []
             purchase_data = []
             
-            # 各シートを確認
-            for sheet_name, sheet_df in df.items():
-                # 売上データと仕入データを抽出
-                sheet_sales, sheet_purchases = self._extract_data_from_sheet(sheet_df)
-                sales_data.extend(sheet_sales)
-                purchase_data.extend(sheet_purchases)
-            
-            # メタデータ抽出
-            metadata = self._extract_metadata_from_excel(file_path)
-            
-            return self._create_standard_output(sales_data, purchase_data, metadata)
+            with self._open_document(file_path, context) as document:
+                # 同じ会社の前回の解析で記録したシートごとの見出し行・列の対応
+                profile = document.profile
+                if profile is None or profile.parser != self.parser_name:
+                    profile = None
+                header_rows = {}
+                columns = {}
+                
+                # シートごとに見出し行の探索と明細の抽出を行い、シート順に結合する
+                for sheet_name, (layout, sheet_sales, sheet_purchases) in self._parse_sheets(document, profile):
+                    if layout is None:
+                        continue
+                    header_rows[sheet_name] = layout['header_row']
+                    columns[sheet_name] = {'header': layout['header'], 'amounts': layout['amounts']}
+                    sales_data.extend(sheet_sales)
+                    purchase_data.extend(sheet_purchases)
+                
+                # メタデータ抽出
+                metadata = self._extract_metadata_from_excel(document)
+                
+                result = self._create_standard_output(sales_data, purchase_data, metadata)
+                
+                # 次回の同じ会社のファイルのために見出し行・列の対応を記録
+                self._remember_profile(document, result, header_rows=header_rows, columns=columns)
             
+            return result
+        
         except Exception as e:
             return {
                 'sales_items': [],
@@ -116,57 +148,225 @@ class MoneyforwardParser(BaseParser):
                 'errors': [f"Parse error: {str(e)}"]
             }
     
-    def _extract_data_from_sheet(self, df: pd.DataFrame) -> tuple[List[Dict], List[Dict]]:
+    def _parse_sheets(self, document: DocumentContext, profile: Optional[LayoutProfile]) -> List[tuple]:
         """
-        シートからデータを抽出
+        全シートを解析し、シート順に (シート名, (対応, 売上データ, 仕入データ)) を返す
+        
+        複数シートの大きなブックは、シートごとにProcessPoolExecutorで並列に解析する
+        （各ワーカーはブックを開き直して担当のシートだけを読む）。ワーカー数は
+        ドキュメントコンテキストの max_workers（Noneの場合はCPUコア数、1以下で並列解析
+        しない）に従い、プロセスを起動できない環境では直列解析に切り替える。
+        """
+        def cached_layout(sheet_name: str) -> Optional[Dict[str, Any]]:
+            # 同じ会社の前回の解析で記録した見出し行・列の対応
+            if profile is None or sheet_name not in (profile.header_rows or {}):
+                return None
+            return {'header_row': profile.header_rows[sheet_name],
+                    **(profile.columns or {}).get(sheet_name, {})}
+        
+        file_kind = document.file_kind
+        if file_kind == '.csv':
+            return [(CSV_SHEET_NAME, self._parse_csv(document, cached_layout(CSV_SHEET_NAME)))]
+        
+        if file_kind in ('.xlsx', '.xls') and os.path.getsize(document.file_path) >= PARALLEL_MIN_FILE_SIZE:
+            workbook = document.workbook
+            sheet_names = workbook.sheet_names
+            
+            workers = min(document.max_workers or os.cpu_count() or 1, len(sheet_names))
+            if workers > 1:
+                arguments = [(document.file_path, workbook.engine, sheet_name, cached_layout(sheet_name))
+                             for sheet_name in sheet_names]
+                try:
+                    with ProcessPoolExecutor(max_workers=workers) as executor:
+                        return list(zip(sheet_names, executor.map(_parse_sheet, *zip(*arguments))))
+                except Exception:
+                    # プロセスを起動できない環境では直列解析に切り替える
+                    pass
+        
+        # 全シートを読み込み（.xlsxは判定で読み込んだ行を再利用する）
+        return [(sheet_name, self._parse_sheet_frame(sheet_df, cached_layout(sheet_name)))
+                for sheet_name, sheet_df in self._read_sheets(document).items()]
+    
+    def _parse_csv(self, document: DocumentContext, cached_layout: Optional[Dict[str, Any]] = None) -> tuple:
         """
+        CSVの見出し行の探索と明細の抽出
+        
+        冒頭の行から見出し行と金額列の対応を求め、見出し行以降は一定行数ずつ読み込んで
+        Excelと同じ列単位の抽出を行う（ファイル全体を一度に読み込まない）。
+        
+        Args:
+            document: ドキュメントコンテキスト
+            cached_layout: 前回記録した見出し行・列の対応
+        
+        Returns:
+            tuple: (対応, 売上データ, 仕入データ)。見出し行がない場合の対応はNone
+        """
+        csv_file = document.csv
+        head = csv_file.head(CSV_HEADER_SCAN_ROWS)
+        if not head:
+            return None, [], []
+        
+        # Excelのシートと同じく先頭行を列名とし、見出し行は2行目以降から探す
+        width = max(len(row) for row in head)
+        padded = [row + [''] * (width - len(row)) for row in head]
+        head_df = normalize_frame(pd.DataFrame(padded[1:], columns=padded[0]))
+        
+        layout = self._sheet_layout(head_df, cached_layout)
+        if layout is None:
+            return None, [], []
+        
+        header = list(head_df.iloc[layout['header_row']].values)
         sales_data = []
         purchase_data = []
+        for chunk in csv_file.chunks(layout['header_row'] + 2, width):
+            chunk_sales, chunk_purchases = self._extract_body_items(normalize_frame(chunk), header, layout['amounts'])
+            sales_data.extend(chunk_sales)
+            purchase_data.extend(chunk_purchases)
+        
+        return layout, sales_data, purchase_data
+    
+    def _parse_sheet_frame(self, sheet_df: pd.DataFrame, cached_layout: Optional[Dict[str, Any]] = None) -> tuple:
+        """
+        1シート分の見出し行の探索と明細の抽出
+        
+        Args:
+            sheet_df: シートのDataFrame
+            cached_layout: 前回記録した見出し行・列の対応
         
-        # データフレームが空の場合は空リストを返す
+        Returns:
+            tuple: (対応, 売上データ, 仕入データ)。見出し行がない場合の対応はNone
+        """
+        # 全角・半角を列単位でまとめて正規化してから抽出
+        sheet_df = normalize_frame(sheet_df)
+        
+        # 見出し行と金額列の対応を求める（記録があれば検証して再利用）
+        layout = self._sheet_layout(sheet_df, cached_layout)
+        if layout is None:
+            return None, [], []
+        
+        # 売上データと仕入データを抽出
+        sheet_sales, sheet_purchases = self._extract_sheet_items(sheet_df, layout)
+        return layout, sheet_sales, sheet_purchases
+    
+    def _read_sheets(self, document: DocumentContext) -> Dict[str, pd.DataFrame]:
+        """
+        全シートをDataFrameとして読み込む
+        
+        共有のブックコンテキストから読み込む（.xlsは .xls を読めるエンジンで開く）。
+        """
+        return document.workbook.frames()
+    
+    def _extract_data_from_sheet(self, df: pd.DataFrame) -> tuple[List[Dict], List[Dict]]:
+        """
+        シートからデータを抽出
+        """
+        layout = self._sheet_layout(df)
+        if layout is None:
+            return [], []
+        return self._extract_sheet_items(df, layout)
+    
+    def _sheet_layout(self, df: pd.DataFrame, cached: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        シートの見出し行と金額列の対応を求める
+        
+        前回記録した対応は、同じ位置の行の見出しが一致する場合にそのまま使い、
+        見出し行の探索と列の判定を省略する。
+        
+        Args:
+            df: 正規化したシート
+            cached: 前回記録した対応
+        
+        Returns:
+            Dict: header_row（見出し行の位置）・header（見出し）・amounts（金額列の列名・セクション・税率）。
+            見出し行がない場合はNone
+        """
+        # データフレームが空の場合は対象外
         if df.empty:
-            return sales_data, purchase_data
+            return None
+        
+        if cached is not None and 0 <= cached['header_row'] < len(df):
+            header = self._header_values(df.iloc[cached['header_row']].values)
+            if header == cached.get('header'):
+                return {'header_row': cached['header_row'], 'header': header, 'amounts': cached['amounts']}
         
         # ヘッダー行を特定
         header_row = self._find_header_row(df)
         if header_row == -1:
-            return sales_data, purchase_data
+            return None
+        
+        # 列ごとのセクション（売上・仕入）と税率は行ごとに判定せず、一度だけ求める
+        amounts = []
+        for col_name in df.iloc[header_row].values:
+            column_section = SPEC.sections.classify(col_name) if isinstance(col_name, str) else None
+            if column_section is not None:
+                amounts.append([col_name, column_section, self._extract_tax_rate_from_column(col_name)])
+        
+        return {'header_row': int(header_row), 'header': self._header_values(df.iloc[header_row].values),
+                'amounts': amounts}
+    
+    def _header_values(self, values) -> List[Optional[str]]:
+        """
+        見出し行の値（文字列以外はNone、記録・比較用）
+        """
+        return [value if isinstance(value, str) else None for value in values]
+    
+    def _extract_sheet_items(self, df: pd.DataFrame, layout: Dict[str, Any]) -> tuple[List[Dict], List[Dict]]:
+        """
+        見出し行以降の行から売上データと仕入データを抽出
+        
+        行ごとの反復はせず、勘定科目列と金額列をそれぞれ列単位で変換し、
+        （行, 金額列）の金額の表から0以外のセルを行順・列順に取り出す。
+        """
+        header_row = layout['header_row']
         
         # ヘッダー行以降のデータを処理
-        data_df = df.iloc[header_row + 1:].copy()
+        return self._extract_body_items(df.iloc[header_row + 1:], list(df.iloc[header_row].values), layout['amounts'])
+    
+    def _extract_body_items(self, body: pd.DataFrame, header: List[Any],
+                            amounts: List[List[Any]]) -> tuple[List[Dict], List[Dict]]:
+        """
+        見出し行より後の行（またはその一部）から売上データと仕入データを抽出
         
-        # 列名を設定
-        data_df.columns = df.iloc[header_row].values
+        Args:
+            body: 見出し行より後の行（列の並びは header と同じ）
+            header: 見出し行の値
+            amounts: 金額列の列名・セクション・税率
         
-        for index, row in data_df.iterrows():
-            account_name = self._standardize_account_name(row.get('勘定科目', ''))
-            
-            if not account_name:
-                continue
-            
-            # 税区分別の金額を処理
-            for col_name in data_df.columns:
-                if '売上' in col_name and account_name:
-                    amount = self._extract_numeric_value(row.get(col_name, 0))
-                    if amount > 0:
-                        tax_rate = self._extract_tax_rate_from_column(col_name)
-                        sales_data.append({
-                            'account_name': account_name,
-                            'tax_rate': tax_rate,
-                            'amount': amount,
-                            'taxable_amount': amount if self._is_taxable(tax_rate) else 0
-                        })
-                
-                elif '仕入' in col_name and account_name:
-                    amount = self._extract_numeric_value(row.get(col_name, 0))
-                    if amount > 0:
-                        tax_rate = self._extract_tax_rate_from_column(col_name)
-                        purchase_data.append({
-                            'account_name': account_name,
-                            'tax_rate': tax_rate,
-                            'amount': amount,
-                            'taxable_amount': amount if self._is_taxable(tax_rate) else 0
-                        })
+        Returns:
+            tuple: (売上データ, 仕入データ)
+        """
+        # 勘定科目列（同じ見出しが複数ある場合は最初の列）
+        account_column = SPEC.columns['account'][0]
+        if account_column not in header or not amounts or body.empty:
+            return [], []
+        
+        accounts = body.iloc[:, header.index(account_column)]
+        account_names = accounts.where(accounts.notna(), '').astype(str).str.strip().to_numpy()
+        
+        # 金額列ごとに金額を一括変換（行 × 金額列の表）
+        amount_table = np.column_stack([
+            parse_amount_series(body.iloc[:, header.index(col_name)]).to_numpy()
+            for col_name, _, _ in amounts
+        ])
+        
+        # 勘定科目があり金額が0でないセル（np.nonzero は行優先の順に返す）
+        mask = (amount_table != 0) & (account_names != '')[:, np.newaxis]
+        row_positions, amount_positions = np.nonzero(mask)
+        
+        sections = [column_section for _, column_section, _ in amounts]
+        tax_rates = [tax_rate for _, _, tax_rate in amounts]
+        taxable = [self._is_taxable(tax_rate) for tax_rate in tax_rates]
+        
+        sales_data = []
+        purchase_data = []
+        for row_position, amount_position, amount in zip(row_positions.tolist(), amount_positions.tolist(),
+                                                         amount_table[row_positions, amount_positions].tolist()):
+            (sales_data if sections[amount_position] == PAGE_SALES else purchase_data).append({
+                'account_name': account_names[row_position],
+                'tax_rate': tax_rates[amount_position],
+                'amount': amount,
+                'taxable_amount': amount if taxable[amount_position] else 0
+            })
         
         return sales_data, purchase_data
     
@@ -174,14 +374,14 @@ class MoneyforwardParser(BaseParser):
         """
         ヘッダー行を特定
         """
+        header_keywords = SPEC.keywords['header']
+        min_keywords = SPEC.options['header_min_keywords']
+        
         for i, row in df.iterrows():
             row_text = ' '.join(str(cell) for cell in row.values if pd.notna(cell))
             
-            # ヘッダーの特徴的なキーワード
-            header_keywords = ['勘定科目', '税区分', '金額', '合計']
-            
-            keyword_count = sum(1 for keyword in header_keywords if keyword in row_text)
-            if keyword_count >= 2:
+            # ヘッダーの特徴的なキーワードを一定数以上含む行
+            if len(header_keywords.find_all(row_text)) >= min_keywords:
                 return i
         
         return -1
@@ -190,65 +390,43 @@ class MoneyforwardParser(BaseParser):
         """
         列名から税率を抽出
         """
-        import re
-        
-        # 税率パターンを検索
-        tax_patterns = [
-            r'(\d+)%',
-            r'軽減(\d+)%',
-            r'標準(\d+)%',
-            r'非課税',
-            r'不課税',
-            r'輸出'
-        ]
-        
-        for pattern in tax_patterns:
-            match = re.search(pattern, column_name)
-            if match:
-                return match.group(0)
-        
-        return '不明'
+        return SPEC.tax_rates.rate(column_name)
     
     def _is_taxable(self, tax_rate: str) -> bool:
         """
         課税対象かどうかを判定
         """
-        taxable_patterns = ['10%', '8%', '軽減8%', '標準10%']
-        return any(pattern in tax_rate for pattern in taxable_patterns)
+        return SPEC.is_taxable(tax_rate)
     
-    def _extract_metadata_from_excel(self, file_path: str) -> Dict[str, Any]:
+    def _extract_metadata_from_excel(self, document: DocumentContext) -> Dict[str, Any]:
         """
-        Excelファイルからメタデータを抽出
+        Excel/CSVファイルからメタデータを抽出（先頭シート・CSVの冒頭の読み込み済みの行を使う）
         """
         metadata = {}
         
         try:
-            workbook = openpyxl.load_workbook(file_path, read_only=True)
-            
-            # 最初のシートからメタデータを抽出
-            first_sheet = workbook[workbook.sheetnames[0]]
+            if document.file_kind == '.csv':
+                rows = document.csv.head(19)
+            else:
+                workbook = document.workbook
+                rows = workbook.iter_rows(workbook.sheet_names[0], max_row=19)
             
             # 期間や会社名の抽出
-            for row in range(1, min(20, first_sheet.max_row + 1)):
-                for col in range(1, min(10, first_sheet.max_column + 1)):
-                    cell_value = first_sheet.cell(row, col).value
+            for row in rows:
+                for cell_value in row[:9]:
                     if cell_value:
                         cell_text = str(cell_value)
                         
                         # 期間の抽出
-                        import re
-                        period_pattern = r'(\d{4})[年/-](\d{1,2})[月/-](\d{1,2})'
-                        period_match = re.search(period_pattern, cell_text)
+                        period_match = PERIOD_PATTERN.search(cell_text)
                         
                         if period_match and 'period_start' not in metadata:
                             metadata['period_extracted'] = cell_text
                         
                         # 会社名の抽出
-                        if any(keyword in cell_text for keyword in ['株式会社', '有限会社', '合同会社']) and 'company_name' not in metadata:
+                        if 'company_name' not in metadata and SPEC.keywords['company'].search(cell_text):
                             metadata['company_name'] = cell_text
-            
-            workbook.close()
-            
+        
         except Exception:
             pass
         
@@ -0,0 +1,142 @@
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set
+
+# ページ分類
+PAGE_HEADER = 'header'
+PAGE_SALES = 'sales'
+PAGE_PURCHASE = 'purchase'
+
+# 税区分の明細行に含まれる語（これを含まないページには明細行がない）
+ROW_MARKERS = ('課税', '非課税', '不課税', '課対', '非課')
+
+# 会社名・期間のメタデータパターンは必ずこれらの語を含む
+HEADER_MARKERS = ('会社', '法人', '日')
+
+class PageIndex:
+    """
+    ページ分類インデックス
+    
+    抽出前の軽い走査で、各ページが課税売上・課税仕入のセクション、
+    ヘッダー（会社名・期間）のどれを含むかを記録する。どれにも該当しない
+    表紙・注記などのページは抽出処理で読み飛ばす。
+    """
+    
+    def __init__(self, kinds: List[Set[str]]):
+        self._kinds = kinds
+        self.page_count = len(kinds)
+    
+    @classmethod
+    def build(cls, page_texts: Iterable[str], sales_markers: Sequence[str],
+              purchase_markers: Sequence[str], row_markers: Sequence[str] = ROW_MARKERS,
+              header_markers: Sequence[str] = HEADER_MARKERS) -> 'PageIndex':
+        """
+        ページテキストを走査してインデックスを作成
+        
+        セクション見出しを含むページはそのセクションに分類する。見出しがなく
+        明細行だけを含むページは、直前のセクションの続きとして分類する。
+        
+        Args:
+            page_texts: ページ順のテキスト
+            sales_markers: 課税売上セクションを示す語
+            purchase_markers: 課税仕入セクションを示す語
+            row_markers: 明細行を示す語
+            header_markers: ヘッダー情報を示す語
+        
+        Returns:
+            PageIndex: 作成したインデックス
+        """
+        classified: List[Set[str]] = []
+        current_section = None
+        
+        for text in page_texts:
+            kinds = set()
+            if any(marker in text for marker in header_markers):
+                kinds.add(PAGE_HEADER)
+            
+            has_sales = any(marker in text for marker in sales_markers)
+            has_purchase = any(marker in text for marker in purchase_markers)
+            
+            if has_sales:
+                kinds.add(PAGE_SALES)
+                current_section = PAGE_SALES
+            if has_purchase:
+                kinds.add(PAGE_PURCHASE)
+                current_section = PAGE_PURCHASE
+            
+            # 見出しのない明細ページは直前のセクションの続き
+            if not has_sales and not has_purchase and current_section:
+                if any(marker in text for marker in row_markers):
+                    kinds.add(current_section)
+            
+            classified.append(kinds)
+        
+        return cls(classified)
+    
+    def kinds(self, page_number: int) -> Set[str]:
+        """
+        指定ページの分類を取得
+        """
+        return self._kinds[page_number]
+    
+    def pages(self, *kinds: str) -> List[int]:
+        """
+        指定した分類のいずれかに該当するページ番号を取得
+        """
+        wanted = set(kinds)
+        return [page_number for page_number, page_kinds in enumerate(self._kinds)
+                if page_kinds & wanted]
+    
+    def page_ranges(self) -> Dict[str, List[List[int]]]:
+        """
+        分類ごとの連続したページ範囲（[開始, 終了) の0始まりのページ番号）
+        
+        LayoutProfile に記録し、次回の解析で from_ranges() により復元する。
+        """
+        ranges: Dict[str, List[List[int]]] = {}
+        for page_number, page_kinds in enumerate(self._kinds):
+            for kind in page_kinds:
+                kind_ranges = ranges.setdefault(kind, [])
+                if kind_ranges and kind_ranges[-1][1] == page_number:
+                    kind_ranges[-1][1] = page_number + 1
+                else:
+                    kind_ranges.append([page_number, page_number + 1])
+        return ranges
+    
+    @classmethod
+    def from_ranges(cls, page_count: int, ranges: Dict[str, List[List[int]]]) -> Optional['PageIndex']:
+        """
+        記録したページ範囲からインデックスを復元
+        
+        Args:
+            page_count: 文書のページ数
+            ranges: page_ranges() の結果
+        
+        Returns:
+            PageIndex: 復元したインデックス（範囲がページ数を超える場合はNone）
+        """
+        classified: List[Set[str]] = [set() for _ in range(page_count)]
+        for kind, kind_ranges in ranges.items():
+            for start, stop in kind_ranges:
+                if not 0 <= start < stop <= page_count:
+                    return None
+                for page_number in range(start, stop):
+                    classified[page_number].add(kind)
+        return cls(classified)
+    
+    def validate(self, page_text: Callable[[int], str], markers: Dict[str, Sequence[str]]) -> bool:
+        """
+        各範囲の先頭ページに、その分類の目印が含まれているかを確認
+        
+        Args:
+            page_text: ページ番号からテキストを取得する関数
+            markers: 分類と、その分類の先頭ページに含まれる語
+        
+        Returns:
+            bool: すべての範囲の先頭ページに目印がある場合True
+        """
+        for kind, kind_ranges in self.page_ranges().items():
+            kind_markers = markers.get(kind, ())
+            for start, _ in kind_ranges:
+                text = page_text(start)
+                if not any(marker in text for marker in kind_markers):
+                    return False
+        return True
\ No newline at end of file
@@ -0,0 +1,281 @@
+import importlib.util
+import os
+from abc import ABC, abstractmethod
+from typing import Dict, List, NamedTuple, Optional, Tuple, Type
+
+# 使用するバックエンドは環境変数で切り替えられる
+PDF_BACKEND_ENV = 'TAX_CONVERTER_PDF_BACKEND'
+DEFAULT_PDF_BACKEND = 'pypdf2'
+
+class TextFragment(NamedTuple):
+    """
+    ページ上の位置付きテキスト断片（座標はPDFのユーザー空間、yは上に向かって増加）
+    """
+    x: float
+    y: float
+    text: str
+
+class PdfTextBackend(ABC):
+    """
+    PDFテキスト抽出バックエンドの基底クラス
+    
+    1つのPDFファイルにつき1インスタンスを生成し、ページ単位でテキストを返す。
+    抽出結果のキャッシュは DocumentContext が持つ。cache_pages=False の場合、バックエンドも
+    解析済みのページを保持しない（読み込み中の1ページを除く）。
+    """
+    
+    # バックエンド名と、利用に必要なモジュール
+    name = ""
+    required_module = ""
+    # extract_page_layout で位置付きの断片を返す場合True
+    supports_layout = False
+    
+    def __init__(self, file_path: str, cache_pages: bool = True):
+        """
+        Args:
+            file_path: PDFファイルのパス
+            cache_pages: 解析の都合でページを保持するバックエンドが、解析済みのページを保持してよい場合True
+        """
+        self.file_path = file_path
+        self.cache_pages = cache_pages
+    
+    @classmethod
+    def is_available(cls) -> bool:
+        """
+        必要なライブラリがインストールされているか判定
+        """
+        return importlib.util.find_spec(cls.required_module) is not None
+    
+    @property
+    @abstractmethod
+    def page_count(self) -> int:
+        """
+        PDFのページ数
+        """
+        pass
+    
+    @abstractmethod
+    def extract_page(self, page_number: int) -> str:
+        """
+        指定ページのテキストを抽出する
+        
+        Args:
+            page_number: 0始まりのページ番号
+        
+        Returns:
+            str: ページのテキスト（改行は '\\n'）
+        """
+        pass
+    
+    def extract_page_layout(self, page_number: int) -> Tuple[str, List[TextFragment]]:
+        """
+        指定ページのテキストと、位置付きのテキスト断片を1回の走査で抽出する
+        
+        位置情報に対応しないバックエンドはテキストだけを抽出し、断片は空のリストを返す
+        （呼び出し側は断片のないページを行テキストで解析する）。
+        
+        Args:
+            page_number: 0始まりのページ番号
+        
+        Returns:
+            Tuple: (ページのテキスト, テキスト断片のリスト)
+        """
+        return self.extract_page(page_number), []
+    
+    def close(self) -> None:
+        """
+        開いているリソースを解放する
+        """
+        pass
+
+class PyPDF2Backend(PdfTextBackend):
+    """
+    PyPDF2によるテキスト抽出（標準）
+    """
+    
+    name = 'pypdf2'
+    required_module = 'PyPDF2'
+    supports_layout = True
+    
+    def __init__(self, file_path: str, cache_pages: bool = True):
+        super().__init__(file_path, cache_pages)
+        import PyPDF2
+        self._file = open(file_path, 'rb')
+        try:
+            self._reader = PyPDF2.PdfReader(self._file)
+        except Exception:
+            self._file.close()
+            raise
+    
+    @property
+    def page_count(self) -> int:
+        return len(self._reader.pages)
+    
+    def extract_page(self, page_number: int) -> str:
+        return self._reader.pages[page_number].extract_text() or ""
+    
+    def extract_page_layout(self, page_number: int) -> Tuple[str, List[TextFragment]]:
+        fragments: List[TextFragment] = []
+        
+        def visit_text(text, cm, tm, font_dict, font_size):
+            # テキスト行列を現在の変換行列でユーザー空間の座標に変換する
+            x = tm[4] * cm[0] + tm[5] * cm[2] + cm[4]
+            y = tm[4] * cm[1] + tm[5] * cm[3] + cm[5]
+            for part in text.split('\n'):
+                part = part.strip()
+                if part:
+                    fragments.append(TextFragment(x, y, part))
+        
+        text = self._reader.pages[page_number].extract_text(visitor_text=visit_text) or ""
+        return text, fragments
+    
+    def close(self) -> None:
+        self._file.close()
+
+class PdfiumBackend(PdfTextBackend):
+    """
+    pypdfium2（PDFium）によるテキスト抽出
+    """
+    
+    name = 'pdfium'
+    required_module = 'pypdfium2'
+    supports_layout = True
+    
+    def __init__(self, file_path: str, cache_pages: bool = True):
+        super().__init__(file_path, cache_pages)
+        import pypdfium2
+        self._document = pypdfium2.PdfDocument(file_path)
+    
+    @property
+    def page_count(self) -> int:
+        return len(self._document)
+    
+    def extract_page(self, page_number: int) -> str:
+        return self.extract_page_layout(page_number, with_fragments=False)[0]
+    
+    def extract_page_layout(self, page_number: int,
+                            with_fragments: bool = True) -> Tuple[str, List[TextFragment]]:
+        page = self._document[page_number]
+        text_page = page.get_textpage()
+        fragments: List[TextFragment] = []
+        try:
+            text = text_page.get_text_range()
+            if with_fragments:
+                # 連続したテキストの矩形ごとに左下の座標を断片の位置とする
+                for index in range(text_page.count_rects()):
+                    left, bottom, right, top = text_page.get_rect(index)
+                    part = text_page.get_text_bounded(left, bottom, right, top).strip()
+                    if part:
+                        fragments.append(TextFragment(left, bottom, part))
+        finally:
+            text_page.close()
+            page.close()
+        return text.replace('\r\n', '\n').replace('\r', '\n'), fragments
+    
+    def close(self) -> None:
+        self._document.close()
+
+class PdfminerBackend(PdfTextBackend):
+    """
+    pdfminer.six によるテキスト抽出
+    
+    pdfminerはページを先頭から順に解析するため、解析済みページのテキストと断片を保持する。
+    cache_pages=False の場合は直近の1ページだけを保持し、要求されたページだけを解析する。
+    """
+    
+    name = 'pdfminer'
+    required_module = 'pdfminer'
+    supports_layout = True
+    
+    def __init__(self, file_path: str, cache_pages: bool = True):
+        super().__init__(file_path, cache_pages)
+        from pdfminer.high_level import extract_pages
+        self._pages = extract_pages(file_path) if cache_pages else None
+        self._texts: List[str] = []
+        self._fragments: List[List[TextFragment]] = []
+        # キャッシュしない場合の直近のページ（ページ番号, テキスト, 断片）
+        self._last_page: Optional[Tuple[int, str, List[TextFragment]]] = None
+        self._page_count = None
+    
+    @property
+    def page_count(self) -> int:
+        if self._page_count is None:
+            from pdfminer.pdfpage import PDFPage
+            with open(self.file_path, 'rb') as file:
+                self._page_count = sum(1 for _ in PDFPage.get_pages(file))
+        return self._page_count
+    
+    @staticmethod
+    def _read_layout(layout) -> Tuple[str, List[TextFragment]]:
+        """
+        解析したページのテキストと断片を取り出す
+        """
+        from pdfminer.layout import LTTextContainer, LTTextLine
+        containers = [element for element in layout if isinstance(element, LTTextContainer)]
+        text = ''.join(element.get_text() for element in containers)
+        
+        # テキストボックス内の各行の左下の座標を断片の位置とする
+        fragments = []
+        for container in containers:
+            lines = container if not isinstance(container, LTTextLine) else [container]
+            for line in lines:
+                if isinstance(line, LTTextLine) and line.get_text().strip():
+                    fragments.append(TextFragment(line.x0, line.y0, line.get_text().strip()))
+        return text, fragments
+    
+    def _page(self, page_number: int) -> Tuple[str, List[TextFragment]]:
+        """
+        指定ページのテキストと断片（キャッシュする場合は指定ページまで順に解析を進める）
+        """
+        if not self.cache_pages:
+            if self._last_page is None or self._last_page[0] != page_number:
+                from pdfminer.high_level import extract_pages
+                layout = next(iter(extract_pages(self.file_path, page_numbers=[page_number])))
+                self._last_page = (page_number, *self._read_layout(layout))
+            return self._last_page[1], self._last_page[2]
+        
+        while len(self._texts) <= page_number:
+            text, fragments = self._read_layout(next(self._pages))
+            self._texts.append(text)
+            self._fragments.append(fragments)
+        return self._texts[page_number], self._fragments[page_number]
+    
+    def extract_page(self, page_number: int) -> str:
+        return self._page(page_number)[0]
+    
+    def extract_page_layout(self, page_number: int) -> Tuple[str, List[TextFragment]]:
+        return self._page(page_number)
+    
+    def close(self) -> None:
+        if self._pages is not None:
+            self._pages.close()
+
+PDF_BACKENDS: Dict[str, Type[PdfTextBackend]] = {
+    backend.name: backend for backend in (PyPDF2Backend, PdfiumBackend, PdfminerBackend)
+}
+
+def available_backends() -> List[str]:
+    """
+    この環境で利用可能なバックエンド名の一覧
+    """
+    return [name for name, backend in PDF_BACKENDS.items() if backend.is_available()]
+
+def get_backend_class(name: str = None) -> Type[PdfTextBackend]:
+    """
+    バックエンドクラスを取得
+    
+    Args:
+        name: バックエンド名（省略時は環境変数、未設定なら標準のPyPDF2）
+    
+    Returns:
+        Type[PdfTextBackend]: バックエンドクラス
+    """
+    name = (name or os.environ.get(PDF_BACKEND_ENV) or DEFAULT_PDF_BACKEND).lower()
+    
+    backend = PDF_BACKENDS.get(name)
+    if backend is None:
+        raise ValueError(f"Unknown PDF backend: {name} (available: {', '.join(PDF_BACKENDS)})")
+    if not backend.is_available():
+        raise ValueError(f"PDF backend '{name}' requires '{backend.required_module}' to be installed")
+    
+    return backend
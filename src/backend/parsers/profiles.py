@@ -0,0 +1,123 @@
+import json
+import os
+import tempfile
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+from .header import COMPANY_NAME_PATTERNS, HeaderScanner, header_region
+
+# プロファイルキャッシュの保存先を指定する環境変数
+# （顧客の会社名を記録するため、保存先を指定した場合だけキャッシュを有効にする）
+PROFILE_CACHE_ENV = 'TAX_CONVERTER_PROFILE_CACHE'
+
+# プロファイルのキーに使う会社名のパターン
+COMPANY_SCANNER = HeaderScanner({'company_name': COMPANY_NAME_PATTERNS})
+
+def find_company_name(texts: Iterable[str]) -> Optional[str]:
+    """
+    ヘッダー領域から会社名を検索する（ベンダーによらない共通のパターン）
+    
+    Args:
+        texts: ヘッダーを含むページのテキスト、またはセルのテキスト（先頭から順）
+    
+    Returns:
+        str: 会社名（見つからない場合はNone）
+    """
+    found = COMPANY_SCANNER.scan(header_region(texts))
+    return found['company_name'][0] if 'company_name' in found else None
+
+def profile_key(company_name: str, vendors: Iterable[str], file_kind: Optional[str]) -> str:
+    """
+    会社名・ベンダー指紋・ファイル種別からプロファイルのキーを作成
+    """
+    return '|'.join([company_name, '+'.join(sorted(vendors)), file_kind or ''])
+
+class LayoutProfile(NamedTuple):
+    """
+    会社ごとに記録した帳票レイアウト
+    
+    前回の解析で判定したパーサーと、解析で見つけたページ分類・見出し行・列の対応を持つ。
+    次回以降の同じ会社の帳票は、記録した内容を検証したうえで再利用し、
+    判定・探索を省略する。
+    """
+    # 判定したパーサー名
+    parser: str
+    # PDFのページ数と、分類ごとのページ範囲（PageIndex.page_ranges()）
+    page_count: int = 0
+    page_ranges: Optional[Dict[str, List[List[int]]]] = None
+    # Excelのシート名と見出し行の位置
+    header_rows: Optional[Dict[str, int]] = None
+    # Excelのシート名と列の対応（見出し・金額列のセクションと税率）
+    columns: Optional[Dict[str, Dict[str, Any]]] = None
+
+class ProfileStore:
+    """
+    帳票レイアウトのプロファイルを保存するJSONファイル
+    
+    読み込みは初回アクセス時に一度だけ行い、更新時は一時ファイルに書き出してから
+    置き換える。キャッシュのため、読み書きに失敗しても解析は続行する。
+    """
+    
+    def __init__(self, path: str):
+        """
+        Args:
+            path: プロファイルを保存するJSONファイルのパス
+        """
+        self.path = path
+        self._profiles: Optional[Dict[str, Dict[str, Any]]] = None
+    
+    @classmethod
+    def from_environment(cls) -> Optional['ProfileStore']:
+        """
+        環境変数 TAX_CONVERTER_PROFILE_CACHE で指定した保存先を使う
+        
+        Returns:
+            ProfileStore: プロファイルの保存先（環境変数が未設定・空文字列の場合はNone）
+        """
+        path = os.environ.get(PROFILE_CACHE_ENV)
+        return cls(os.path.expanduser(path)) if path else None
+    
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._profiles is None:
+            try:
+                with open(self.path, encoding='utf-8') as profile_file:
+                    self._profiles = json.load(profile_file)
+            except (OSError, ValueError):
+                self._profiles = {}
+        return self._profiles
+    
+    def get(self, key: str) -> Optional[LayoutProfile]:
+        """
+        キーに対応するプロファイルを取得（記録がない・形式が合わない場合はNone）
+        """
+        fields = self._load().get(key)
+        if not isinstance(fields, dict):
+            return None
+        try:
+            return LayoutProfile(**fields)
+        except TypeError:
+            return None
+    
+    def put(self, key: str, profile: LayoutProfile) -> None:
+        """
+        プロファイルを記録してファイルに保存する
+        """
+        profiles = self._load()
+        profiles[key] = profile._asdict()
+        
+        try:
+            directory = os.path.dirname(self.path) or '.'
+            os.makedirs(directory, exist_ok=True)
+            descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        except OSError:
+            # 保存できなくても次回は通常の判定に戻るだけ
+            return
+        
+        try:
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as profile_file:
+                json.dump(profiles, profile_file, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+        except (OSError, TypeError, ValueError):
+            # 書きかけの一時ファイルを残さない
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
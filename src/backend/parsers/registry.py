@@ -0,0 +1,107 @@
+import importlib
+from typing import Dict, List, Optional
+from .base import BaseParser
+from .signature import FileSignature, Fingerprint, FingerprintScanner, sniff_file
+
+class ParserEntry:
+    """
+    レジストリに登録されたパーサーの情報
+    
+    パーサーモジュールは初めて候補に選ばれた時点でインポートし、
+    生成したインスタンスは状態を持たないため使い回す。
+    """
+    
+    def __init__(self, name: str, module: str, class_name: str, extensions: List[str],
+                 fingerprints: Optional[List[Fingerprint]] = None):
+        self.name = name
+        self.module = module
+        self.class_name = class_name
+        self.extensions = extensions
+        self.fingerprints = fingerprints or []
+        self._instance: Optional[BaseParser] = None
+    
+    def get_instance(self) -> BaseParser:
+        """
+        パーサーインスタンスを取得（初回のみモジュールをインポートして生成）
+        """
+        if self._instance is None:
+            module = importlib.import_module(self.module, package=__package__)
+            self._instance = getattr(module, self.class_name)()
+        return self._instance
+
+class ParserRegistry:
+    """
+    拡張子とファイルシグネチャでパーサーを索引するレジストリ
+    """
+    
+    def __init__(self):
+        self._entries: List[ParserEntry] = []
+        self._by_extension: Dict[str, List[ParserEntry]] = {}
+        self._scanner: Optional[FingerprintScanner] = None
+    
+    def register(self, name: str, module: str, class_name: str, extensions: List[str],
+                 fingerprints: Optional[List[Fingerprint]] = None) -> None:
+        """
+        パーサーを登録する（登録順が判定の優先順になる）
+        
+        Args:
+            name: パーサー名
+            module: パーサーモジュール（パッケージ相対指定可）
+            class_name: パーサークラス名
+            extensions: 対応するファイル種別（拡張子）のリスト
+            fingerprints: ファイルのバイト列に現れるベンダー固有の文字列（組の場合はすべてが現れること）
+        """
+        entry = ParserEntry(name, module, class_name, extensions, fingerprints)
+        self._entries.append(entry)
+        for extension in extensions:
+            self._by_extension.setdefault(extension, []).append(entry)
+        self._scanner = None
+    
+    def sniff(self, file_path: str) -> FileSignature:
+        """
+        テキスト抽出を行わずに、バイト列からファイル種別とベンダー候補を判定
+        """
+        if self._scanner is None:
+            self._scanner = FingerprintScanner(
+                {entry.name: entry.fingerprints for entry in self._entries if entry.fingerprints}
+            )
+        return sniff_file(file_path, self._scanner)
+    
+    def get(self, name: str) -> Optional[BaseParser]:
+        """
+        パーサー名からインスタンスを取得
+        """
+        for entry in self._entries:
+            if entry.name == name:
+                return entry.get_instance()
+        return None
+    
+    def candidates(self, signature: FileSignature) -> List[BaseParser]:
+        """
+        ファイルを処理できる可能性のあるパーサーを優先順に取得
+        
+        拡張子ではなく、マジックバイトで判定したファイル種別で候補を絞り込む。
+        
+        Args:
+            signature: sniff()の判定結果
+            
+        Returns:
+            List[BaseParser]: 候補パーサーのリスト
+        """
+        entries = self._by_extension.get(signature.kind, [])
+        return [entry.get_instance() for entry in entries]
+    
+    def supported_formats(self) -> Dict[str, List[str]]:
+        """
+        パーサー名と対応拡張子のマッピング
+        """
+        return {entry.name: list(entry.extensions) for entry in self._entries}
+
+# 標準のパーサーレジストリ
+default_registry = ParserRegistry()
+default_registry.register('freee', '.freee', 'FreeeParser', ['.pdf'],
+                          fingerprints=['freee'])
+default_registry.register('moneyforward', '.moneyforward', 'MoneyforwardParser', ['.xlsx', '.xls', '.csv', '.pdf'],
+                          fingerprints=['マネーフォワード', 'MoneyForward', ('勘定科目別税区分集計表', 'Cognite')])
+default_registry.register('yayoi', '.yayoi', 'YayoiParser', ['.pdf'],
+                          fingerprints=['勘定科目別税区分表', '弥生会計', 'YAYOI'])
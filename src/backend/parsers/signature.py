@@ -0,0 +1,149 @@
+import mmap
+import os
+import re
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple, Union
+
+# ファイル種別ごとのマジックバイト（種別は代表拡張子で表す）
+MAGIC_SIGNATURES = [
+    ('.pdf', b'%PDF-'),
+    ('.xlsx', b'PK\x03\x04'),
+    ('.xls', b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'),
+]
+
+# マジックバイトで判定する拡張子（これ以外の拡張子はそのまま種別とする）
+SIGNATURE_EXTENSIONS = {extension for extension, _ in MAGIC_SIGNATURES}
+
+# PDFはヘッダー前に不要なバイトが入ることがあるため、先頭1KB以内を検索する
+PDF_HEADER_SCAN_BYTES = 1024
+
+# ベンダー指紋を検索する範囲（先頭と末尾）
+# XMPメタデータは先頭付近、/Producer・/Creator を含むInfo辞書は末尾付近にあることが多い
+FINGERPRINT_WINDOW_BYTES = 256 * 1024
+
+# ベンダー指紋（文字列、またはすべてが現れる必要がある文字列の組）
+Fingerprint = Union[str, Tuple[str, ...]]
+
+def detect_kind(head: bytes, extension: str) -> Optional[str]:
+    """
+    ファイル先頭のバイト列からファイル種別を判定する
+
+    Args:
+        head: ファイル先頭のバイト列
+        extension: ファイルの拡張子
+
+    Returns:
+        str: 種別（'.pdf' / '.xlsx' / '.xls' など）。判定できない場合はNone
+    """
+    for kind, magic in MAGIC_SIGNATURES:
+        if kind == '.pdf':
+            if magic in head[:PDF_HEADER_SCAN_BYTES]:
+                return kind
+        elif head.startswith(magic):
+            return kind
+
+    # マジックバイトを持たない形式は拡張子を信頼する
+    if extension and extension not in SIGNATURE_EXTENSIONS:
+        return extension
+
+    return None
+
+class FingerprintScanner:
+    """
+    ベンダー固有の文字列をバイト列のまま検索するスキャナー
+
+    PDF内の文字列はメタデータではUTF-16BE（リテラル・16進文字列）、
+    XMPではUTF-8で格納されるため、キーワードごとに各表現を1つの正規表現にまとめる。
+    帳票名のように他社の帳票にも現れうる文字列は、ベンダー名などとの組で指紋にする
+    （組のキーワードがすべて見つかった場合だけベンダーを検出する）。
+    """
+
+    def __init__(self, fingerprints: Dict[str, List[Fingerprint]]):
+        # ベンダーごとの指紋（必要なキーワードの集合）と、バイト表現からキーワードへの対応
+        self._groups: List[Tuple[str, FrozenSet[str]]] = []
+        self._keyword_by_pattern: Dict[bytes, str] = {}
+        for vendor, vendor_fingerprints in fingerprints.items():
+            for fingerprint in vendor_fingerprints:
+                keywords = (fingerprint,) if isinstance(fingerprint, str) else tuple(fingerprint)
+                self._groups.append((vendor, frozenset(keywords)))
+                for keyword in keywords:
+                    for pattern in self._encodings(keyword):
+                        self._keyword_by_pattern.setdefault(pattern, keyword)
+
+        # 長いパターンを優先してマッチさせる
+        patterns = sorted(self._keyword_by_pattern, key=len, reverse=True)
+        self._regex = re.compile(b'|'.join(re.escape(pattern) for pattern in patterns)) if patterns else None
+
+    @staticmethod
+    def _encodings(keyword: str) -> List[bytes]:
+        """
+        キーワードのバイト表現を列挙
+        """
+        utf16 = keyword.encode('utf-16-be')
+        encodings = [keyword.encode('utf-8'), utf16, utf16.hex().upper().encode('ascii'),
+                     utf16.hex().encode('ascii')]
+        return list(dict.fromkeys(encodings))
+
+    def scan(self, buffer) -> Set[str]:
+        """
+        バッファの先頭・末尾の範囲からベンダーを検出する
+
+        Args:
+            buffer: bytes または mmap
+
+        Returns:
+            Set[str]: 検出されたベンダー名
+        """
+        if self._regex is None:
+            return set()
+
+        size = len(buffer)
+        if size <= FINGERPRINT_WINDOW_BYTES * 2:
+            windows = [(0, size)]
+        else:
+            windows = [(0, FINGERPRINT_WINDOW_BYTES), (size - FINGERPRINT_WINDOW_BYTES, size)]
+
+        keywords: Set[str] = set()
+        for start, end in windows:
+            for match in self._regex.finditer(buffer, start, end):
+                keywords.add(self._keyword_by_pattern[match.group(0)])
+
+        return {vendor for vendor, group in self._groups if group <= keywords}
+
+class FileSignature:
+    """
+    バイト列から判定したファイル種別とベンダー候補
+    """
+
+    def __init__(self, kind: Optional[str], vendors: Optional[Set[str]] = None):
+        self.kind = kind
+        self.vendors = vendors or set()
+
+def sniff_file(file_path: str, scanner: Optional[FingerprintScanner] = None) -> FileSignature:
+    """
+    ファイルをメモリマップしてテキスト抽出なしで種別とベンダーを判定する
+
+    Args:
+        file_path: 解析対象ファイルのパス
+        scanner: ベンダー指紋スキャナー（省略時は種別のみ判定）
+
+    Returns:
+        FileSignature: 判定結果
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+
+    try:
+        with open(file_path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return FileSignature(detect_kind(b'', extension))
+
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                kind = detect_kind(buffer[:PDF_HEADER_SCAN_BYTES], extension)
+
+                # ZIP/OLE内の文字列は圧縮されているため、指紋検索はPDFのみ行う
+                vendors = set()
+                if scanner is not None and kind == '.pdf':
+                    vendors = scanner.scan(buffer)
+
+                return FileSignature(kind, vendors)
+    except (OSError, ValueError):
+        return FileSignature(None)
@@ -0,0 +1,175 @@
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional, Sequence
+from keyword_matcher import KeywordAutomaton
+from .base import line_lexer, TokenSequence
+from .header import HeaderScanner
+
+# ベンダー別レイアウト定義（<パーサー名>.json）の配置先
+SPEC_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'specs')
+
+class SectionMatcher:
+    """
+    セクション（売上・仕入）ごとの目印をまとめたマッチャー
+    
+    定義順がセクションの優先順になる。
+    """
+    
+    def __init__(self, sections: Dict[str, Sequence[str]]):
+        """
+        Args:
+            sections: セクション名と、そのセクションを示すキーワード（優先順）
+        """
+        self.sections = {name: frozenset(keywords) for name, keywords in sections.items()}
+        self._matcher = KeywordAutomaton([keyword for keywords in sections.values() for keyword in keywords])
+    
+    def sections_in(self, text: str) -> List[str]:
+        """
+        テキストが示すセクション（優先順）
+        """
+        found = self._matcher.find_all(text)
+        if not found:
+            return []
+        return [name for name, keywords in self.sections.items() if keywords & found]
+    
+    def classify(self, text: str) -> Optional[str]:
+        """
+        テキストが示す最も優先度の高いセクション（該当なしはNone）
+        """
+        sections = self.sections_in(text)
+        return sections[0] if sections else None
+
+class DetectionRules:
+    """
+    形式判定の条件
+    
+    各条件は all（すべて含む）と none（いずれも含まない）のキーワードで表し、
+    いずれかの条件を満たせばその形式と判定する。すべての条件のキーワードを
+    1つのマッチャーにまとめ、テキストは1回だけ走査する。
+    """
+    
+    def __init__(self, rules: Sequence[Dict[str, Sequence[str]]]):
+        """
+        Args:
+            rules: {'all': [...], 'none': [...]} の条件のリスト
+        """
+        self.rules = [(frozenset(rule.get('all', ())), frozenset(rule.get('none', ()))) for rule in rules]
+        self._matcher = KeywordAutomaton([keyword for required, excluded in self.rules
+                                        for keyword in (*required, *excluded)])
+    
+    def matches(self, text: str) -> bool:
+        """
+        いずれかの条件を満たすか
+        """
+        found = self._matcher.find_all(text)
+        return any(required <= found and not excluded & found for required, excluded in self.rules)
+
+class TaxRateRules:
+    """
+    税区分・列名から税率への対応表
+    
+    優先順のパターンを名前付きグループの1つの選択正規表現にまとめ、先読みで
+    すべての位置を1回走査して、最も優先度の高いパターンの税率を返す。
+    """
+    
+    def __init__(self, rules: Sequence[Dict[str, Any]], default: Optional[str] = None):
+        """
+        Args:
+            rules: {'pattern': 正規表現, 'rate': 税率} のリスト（rate省略時は一致した文字列）
+            default: どのパターンにも一致しない場合の税率（Noneの場合は入力の文字列）
+        """
+        self.rates = [rule.get('rate') for rule in rules]
+        self.default = default
+        alternatives = [f'(?P<r{index}>{rule["pattern"]})' for index, rule in enumerate(rules)]
+        self._regex = re.compile('(?=' + '|'.join(alternatives) + ')') if alternatives else None
+    
+    def rate(self, text: str) -> str:
+        """
+        テキストの税率
+        
+        Args:
+            text: 税区分または列名
+        
+        Returns:
+            str: 税率
+        """
+        best = None
+        if self._regex is not None:
+            for match in self._regex.finditer(text):
+                # 同じ位置では選択の順に照合されるため、一致したグループがその位置の最優先
+                index = int(match.lastgroup[1:])
+                if best is None or index < best[0]:
+                    best = (index, match.group(match.lastgroup))
+                    if index == 0:
+                        break
+        
+        if best is None:
+            return text if self.default is None else self.default
+        
+        index, matched = best
+        return self.rates[index] if self.rates[index] is not None else matched
+
+class LayoutSpec:
+    """
+    ベンダー別の帳票レイアウト定義
+    
+    JSONで宣言した形式判定の条件・ページ分類とセクションの目印・明細行のトークン列・
+    表の見出し・税率の対応表・課税判定・メタデータのパターンを、読み込み時に一度だけ
+    マッチャーにコンパイルする。
+    """
+    
+    def __init__(self, definition: Dict[str, Any]):
+        """
+        Args:
+            definition: レイアウト定義（specs/*.json の内容）
+        """
+        self.name: str = definition['name']
+        self.detection = DetectionRules(definition.get('detect', []))
+        self.page_markers: Dict[str, tuple] = {section: tuple(markers) for section, markers
+                                               in definition.get('page_markers', {}).items()}
+        self.sections = SectionMatcher(definition.get('sections', {}))
+        # ベンダー固有の名前付きキーワード群
+        self.keywords: Dict[str, KeywordAutomaton] = {name: KeywordAutomaton(keywords) for name, keywords
+                                                    in definition.get('keywords', {}).items()}
+        self.row: Optional[TokenSequence] = line_lexer.sequence(*definition['row']) if 'row' in definition else None
+        self.columns: Dict[str, tuple] = {column: tuple(labels) for column, labels
+                                          in definition.get('columns', {}).items()}
+        
+        tax_rates = definition.get('tax_rates', {})
+        self.tax_rates = TaxRateRules(tax_rates.get('rules', []), tax_rates.get('default'))
+        
+        taxable = definition.get('taxable', {})
+        self._taxable_include = KeywordAutomaton(taxable.get('include', []))
+        self._taxable_exclude = KeywordAutomaton(taxable.get('exclude', []))
+        
+        self.metadata = HeaderScanner(definition['metadata']) if 'metadata' in definition else None
+        # 数値などのその他の設定
+        self.options: Dict[str, Any] = definition.get('options', {})
+    
+    def is_taxable(self, text: str) -> bool:
+        """
+        税区分・税率が課税対象か（除外キーワードを含まず、対象キーワードを含む）
+        """
+        return not self._taxable_exclude.search(text) and self._taxable_include.search(text)
+
+_loaded_specs: Dict[str, LayoutSpec] = {}
+
+def load_spec(name: str, directory: str = SPEC_DIRECTORY) -> LayoutSpec:
+    """
+    レイアウト定義を読み込んでコンパイルする（同じ定義は一度だけ読み込む）
+    
+    Args:
+        name: パーサー名（<name>.json を読み込む）
+        directory: 定義ファイルのディレクトリ
+    
+    Returns:
+        LayoutSpec: コンパイル済みのレイアウト定義
+    """
+    path = os.path.join(directory, f'{name}.json')
+    spec = _loaded_specs.get(path)
+    if spec is None:
+        with open(path, encoding='utf-8') as spec_file:
+            spec = LayoutSpec(json.load(spec_file))
+        _loaded_specs[path] = spec
+    return spec
@@ -0,0 +1,147 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from .document import DEFAULT_PARALLEL_THRESHOLD, DocumentContext
+from .factory import ParserFactory
+from .header import COMPANY_NAME_PATTERNS, HeaderScanner, header_region
+from .registry import default_registry
+
+# 事業者の切り替わりを判定するヘッダーのパターン（各ページの冒頭だけを走査する）
+ENTITY_SCANNER = HeaderScanner({
+    'period': [
+        r'(\d{4})[年/-](\d{1,2})[月/-](\d{1,2})日.*?(\d{4})[年/-](\d{1,2})[月/-](\d{1,2})日',
+    ],
+    'company_name': COMPANY_NAME_PATTERNS,
+})
+
+class EntitySegment(NamedTuple):
+    """
+    1事業者分の連続したページ範囲
+    """
+    company_name: Optional[str]
+    # (開始年, 月, 日, 終了年, 月, 日)
+    period: Optional[Tuple[str, ...]]
+    start: int
+    stop: int
+
+def find_entity_segments(page_texts: Iterable[str]) -> List[EntitySegment]:
+    """
+    ページごとのヘッダーから事業者の境界を検出する
+    
+    各ページの冒頭で会社名・期間を検索し、どちらかが直前の事業者と異なるページから
+    新しい事業者とする。ヘッダーのないページ（明細の続き・注記など）と、会社名・期間の
+    どちらかだけが見つかったページは直前の事業者に含める。
+    
+    Args:
+        page_texts: ページ順のテキスト
+    
+    Returns:
+        List[EntitySegment]: ページ順の事業者ごとの範囲（stopは含まない）
+    """
+    segments: List[EntitySegment] = []
+    
+    for page_number, text in enumerate(page_texts):
+        found = ENTITY_SCANNER.scan(header_region([text], page_limit=1))
+        company_name = found['company_name'][0] if 'company_name' in found else None
+        period = found.get('period')
+        
+        if segments:
+            current = segments[-1]
+            changed = (company_name and current.company_name and company_name != current.company_name) or \
+                      (period and current.period and period != current.period)
+            if not changed:
+                # 未確定の会社名・期間は後続ページのヘッダーで補う
+                segments[-1] = current._replace(company_name=current.company_name or company_name,
+                                                period=current.period or period, stop=page_number + 1)
+                continue
+        
+        segments.append(EntitySegment(company_name, period, page_number, page_number + 1))
+    
+    return segments
+
+def _parse_segment(file_path: str, parser_name: str, page_numbers: List[int],
+                   page_texts: List[str], backend_name: Optional[str]) -> Dict[str, Any]:
+    """
+    1事業者分のページだけを1つの文書として解析する（ワーカープロセスでも実行する）
+    
+    Args:
+        file_path: PDFファイルのパス
+        parser_name: 使用するパーサー名
+        page_numbers: 事業者のページ番号（0始まり）
+        page_texts: page_numbersと同じ順序の抽出済みテキスト（正規化済み）
+        backend_name: テキスト抽出バックエンド名
+    
+    Returns:
+        Dict: パーサーの解析結果
+    """
+    parser = default_registry.get(parser_name)
+    with DocumentContext(file_path, max_workers=1, pdf_backend=backend_name,
+                         page_numbers=page_numbers) as document:
+        # 抽出済みのテキストを引き継ぎ、同じページを抽出し直さない
+        document.add_page_texts(dict(enumerate(page_texts)))
+        return parser.parse(file_path, document)
+
+def parse_entities(file_path: str, context: Optional[DocumentContext] = None,
+                   max_workers: Optional[int] = None,
+                   parallel_threshold: int = DEFAULT_PARALLEL_THRESHOLD) -> List[Dict[str, Any]]:
+    """
+    複数の事業者をまとめたPDFを事業者ごとに解析する
+    
+    全ページのテキストを抽出して事業者の境界を検出し、事業者ごとのページ範囲を
+    ProcessPoolExecutorで並列に解析する。結果は事業者の並び順で返す。
+    PDF以外のファイルと事業者が1つだけのPDFは、ファイル全体を通常どおり解析する。
+    
+    Args:
+        file_path: 解析対象ファイルのパス
+        context: 共有ドキュメントコンテキスト
+        max_workers: 並列解析のワーカー数（Noneの場合はCPUコア数、1以下で並列解析しない）
+        parallel_threshold: 並列解析に切り替える総ページ数の下限
+    
+    Returns:
+        List[Dict]: 事業者ごとの解析結果（page_range に1始まりの先頭・末尾ページを持つ）。
+        形式を判定できない場合は空のリスト
+    """
+    if context is None:
+        with DocumentContext(file_path, max_workers=max_workers) as owned_context:
+            return parse_entities(file_path, owned_context, max_workers, parallel_threshold)
+    
+    parser = ParserFactory.get_parser(file_path, context)
+    if parser is None:
+        return []
+    
+    if context.file_kind != '.pdf':
+        return [parser.parse(file_path, context)]
+    
+    # 境界の検出には全ページのテキストが必要（ページ数が多い場合は並列に抽出）
+    context.prefetch_pages()
+    page_texts = list(context.iter_page_texts())
+    segments = find_entity_segments(page_texts)
+    
+    if len(segments) <= 1:
+        result = parser.parse(file_path, context)
+        result['page_range'] = [1, context.page_count]
+        return [result]
+    
+    arguments = [
+        (file_path, parser.parser_name,
+         [context.source_page(page_number) for page_number in range(segment.start, segment.stop)],
+         page_texts[segment.start:segment.stop], context.backend.name)
+        for segment in segments
+    ]
+    
+    results = None
+    workers = min(max_workers or context.max_workers or os.cpu_count() or 1, len(segments))
+    if workers > 1 and len(page_texts) >= parallel_threshold:
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_parse_segment, *zip(*arguments)))
+        except Exception:
+            # プロセスを起動できない環境では直列解析に切り替える
+            results = None
+    
+    if results is None:
+        results = [_parse_segment(*segment_arguments) for segment_arguments in arguments]
+    
+    for segment, result in zip(segments, results):
+        result['page_range'] = [segment.start + 1, segment.stop]
+    return results
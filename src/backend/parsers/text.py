@@ -0,0 +1,64 @@
+import re
+import unicodedata
+
+import pandas as pd
+
+# 改行以外の連続した空白（全角空白はNFKCで半角になる）
+WHITESPACE_RUN = re.compile(r'[^\S\n]+')
+
+def normalize_text(text: str) -> str:
+    """
+    抽出したテキストを正規形にする
+    
+    NFKCで全角英数字・記号・全角空白を半角に、半角カナを全角に揃え、改行以外の
+    連続した空白を1つの半角空白にまとめる。以降の判定・抽出処理は正規形を前提とし、
+    全角・半角の両方を比較しない。
+    
+    Args:
+        text: ページや行のテキスト
+    
+    Returns:
+        str: 正規化したテキスト
+    """
+    if not unicodedata.is_normalized('NFKC', text):
+        text = unicodedata.normalize('NFKC', text)
+    return WHITESPACE_RUN.sub(' ', text)
+
+def normalize_series(values: pd.Series) -> pd.Series:
+    """
+    normalize_text のpandas Series版（文字列以外の要素はそのまま）
+    
+    Args:
+        values: Excelの1列分の値
+    
+    Returns:
+        pd.Series: 文字列を正規化した列
+    """
+    if not (values.dtype == object or isinstance(values.dtype, pd.StringDtype)):
+        return values
+    
+    try:
+        normalized = values.str.normalize('NFKC').str.replace(WHITESPACE_RUN, ' ', regex=True)
+    except AttributeError:
+        # 文字列を含まない列
+        return values
+    return normalized.where(normalized.notna(), values)
+
+def normalize_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    シート全体を列単位で正規化する（列名も正規化する）
+    
+    Args:
+        frame: 読み込んだシート
+    
+    Returns:
+        pd.DataFrame: 正規化したシート
+    """
+    if frame.empty:
+        return frame
+    
+    normalized = pd.concat([normalize_series(frame.iloc[:, index]) for index in range(frame.shape[1])],
+                           axis=1)
+    normalized.columns = [normalize_text(column) if isinstance(column, str) else column
+                          for column in frame.columns]
+    return normalized
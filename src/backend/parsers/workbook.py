@@ -0,0 +1,233 @@
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+from .excel_engines import DEFAULT_EXCEL_ENGINE
+
+class WorkbookContext:
+    """
+    Excelブック1件分の共有コンテキスト
+    
+    openpyxlの場合、ブックは読み取り専用（ストリーミング）モードで一度だけ開き、各シートの
+    行は必要になった分だけ1つの行イテレーターから読み進め、pandasのExcel読み込みと
+    同じ規則で変換した値をキャッシュする。それ以外のエンジン（calamine・xlrd）は
+    シート単位でまとめて読み込んで同じキャッシュに格納する。形式判定・メタデータ抽出・
+    見出し行の探索・明細の抽出は同じキャッシュを共有し、同じ行を二度読み込まない。
+    """
+    
+    def __init__(self, file_path: str, engine: str = DEFAULT_EXCEL_ENGINE):
+        """
+        Args:
+            file_path: Excelファイルのパス
+            engine: 読み込みエンジン名（excel_engines.get_engine で選んだもの）
+        """
+        self.file_path = file_path
+        self.engine = engine
+        self._workbook = None
+        self._excel_file: Optional[pd.ExcelFile] = None
+        # シート名 → 読み込み済みの行・行イテレーター
+        self._rows: Dict[str, List[List[Any]]] = {}
+        self._streams: Dict[str, Iterator] = {}
+        self._complete: Set[str] = set()
+    
+    def __enter__(self) -> 'WorkbookContext':
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+    
+    @property
+    def workbook(self):
+        """
+        openpyxlのブック（初回アクセス時に読み取り専用モードで一度だけ開く）
+        """
+        if self._workbook is None:
+            import openpyxl
+            self._workbook = openpyxl.load_workbook(self.file_path, read_only=True, data_only=True,
+                                                    keep_links=False)
+        return self._workbook
+    
+    @property
+    def excel_file(self) -> pd.ExcelFile:
+        """
+        openpyxl以外のエンジンで開いたブック（初回アクセス時に一度だけ開く）
+        """
+        if self._excel_file is None:
+            self._excel_file = pd.ExcelFile(self.file_path, engine=self.engine)
+        return self._excel_file
+    
+    @property
+    def sheet_names(self) -> List[str]:
+        """
+        シート名（ブックの順序）
+        """
+        if self.engine != 'openpyxl':
+            return [str(sheet_name) for sheet_name in self.excel_file.sheet_names]
+        return [sheet.title for sheet in self.workbook.worksheets]
+    
+    @staticmethod
+    def _convert_row(cells) -> List[Any]:
+        """
+        セルの値をpandasのExcel読み込みと同じ規則で変換する
+        
+        空欄は空文字列、エラーはNaN、整数値の数値はintにし、行末の空欄は削除する。
+        """
+        values = []
+        for cell in cells:
+            value = cell.value
+            if value is None:
+                value = ''
+            elif cell.data_type == 'e':
+                value = np.nan
+            elif cell.data_type == 'n':
+                integer = int(value)
+                value = integer if integer == value else float(value)
+            values.append(value)
+        
+        while values and values[-1] == '':
+            values.pop()
+        return values
+    
+    def _load_sheet(self, sheet_name: str) -> None:
+        """
+        openpyxl以外のエンジンでシート全体を読み込んでキャッシュする
+        
+        値は変換せずに読み込み（空欄は空文字列）、openpyxlと同じく行末の空欄は削除する。
+        """
+        frame = self.excel_file.parse(sheet_name, header=None, dtype=object, keep_default_na=False, na_filter=False)
+        rows = []
+        for values in frame.itertuples(index=False, name=None):
+            row = list(values)
+            while row and row[-1] == '':
+                row.pop()
+            rows.append(row)
+        
+        self._rows[sheet_name] = rows
+        self._complete.add(sheet_name)
+    
+    def _stream(self, sheet_name: str) -> Iterator:
+        """
+        シートの行イテレーター（読み込み済みの行の続きから）
+        """
+        stream = self._streams.get(sheet_name)
+        if stream is None:
+            sheet = self.workbook[sheet_name]
+            # 読み取り専用モードではファイルに記録された範囲が正しくない場合がある
+            sheet.reset_dimensions()
+            stream = islice(sheet.iter_rows(), len(self._rows.get(sheet_name, ())), None)
+            self._streams[sheet_name] = stream
+        return stream
+    
+    def iter_rows(self, sheet_name: str, max_row: Optional[int] = None) -> Iterator[List[Any]]:
+        """
+        シートの行を先頭から順に返す
+        
+        キャッシュ済みの行を返したあと、共有の行イテレーターから必要な分だけ読み進めて
+        キャッシュに追加する。途中で止めた場合、残りの行は読み込まない。
+        
+        Args:
+            sheet_name: シート名
+            max_row: 返す最大行数（Noneの場合は全行）
+        
+        Returns:
+            Iterator: 変換済みのセルの値のリスト（行末の空欄は含まない）
+        """
+        if self.engine != 'openpyxl' and sheet_name not in self._complete:
+            self._load_sheet(sheet_name)
+        
+        rows = self._rows.setdefault(sheet_name, [])
+        index = 0
+        
+        while max_row is None or index < max_row:
+            if index < len(rows):
+                yield rows[index]
+                index += 1
+                continue
+            
+            if sheet_name in self._complete:
+                return
+            
+            cells = next(self._stream(sheet_name), None)
+            if cells is None:
+                self._complete.add(sheet_name)
+                self._streams.pop(sheet_name, None)
+                return
+            rows.append(self._convert_row(cells))
+    
+    def probe(self, sheet_name: str, max_row: int, max_col: int) -> Iterator[List[Any]]:
+        """
+        シート左上の範囲だけを読む（形式判定用）
+        
+        キャッシュ済みの行で足りる場合はそれを使う。足りない場合はopenpyxlの
+        iter_rows(max_row, max_col) で範囲内のセルだけを読み、範囲を超える行・列の
+        XMLは解析しない（列を切り詰めた行はキャッシュしない）。openpyxl以外のエンジンは
+        シート全体を読み込んでキャッシュする。
+        
+        Args:
+            sheet_name: シート名
+            max_row: 読む行数
+            max_col: 読む列数
+        
+        Returns:
+            Iterator: 変換済みのセルの値のリスト
+        """
+        if self.engine != 'openpyxl':
+            for row in self.iter_rows(sheet_name, max_row):
+                yield row[:max_col]
+            return
+        
+        rows = self._rows.get(sheet_name, [])
+        if len(rows) >= max_row or sheet_name in self._complete:
+            for row in rows[:max_row]:
+                yield row[:max_col]
+            return
+        
+        sheet = self.workbook[sheet_name]
+        sheet.reset_dimensions()
+        for cells in sheet.iter_rows(max_row=max_row, max_col=max_col):
+            yield self._convert_row(cells)
+    
+    def rows(self, sheet_name: str) -> List[List[Any]]:
+        """
+        シートの全行（末尾の空行を除き、各行を最大の列数まで空欄で埋める）
+        """
+        data = list(self.iter_rows(sheet_name))
+        
+        last_row_with_data = max((index for index, row in enumerate(data) if row), default=-1)
+        data = data[:last_row_with_data + 1]
+        
+        if data:
+            width = max(len(row) for row in data)
+            data = [row + [''] * (width - len(row)) if len(row) < width else row for row in data]
+        return data
+    
+    def frame(self, sheet_name: str) -> pd.DataFrame:
+        """
+        シートをDataFrameとして取得（pd.read_excel と同じく先頭行を列名とする）
+        """
+        from pandas.errors import EmptyDataError
+        from pandas.io.parsers import TextParser
+        
+        try:
+            return TextParser(self.rows(sheet_name), header=0, skip_blank_lines=False).read()
+        except EmptyDataError:
+            return pd.DataFrame()
+    
+    def frames(self) -> Dict[str, pd.DataFrame]:
+        """
+        全シートのDataFrame（pd.read_excel(sheet_name=None) に相当）
+        """
+        return {sheet_name: self.frame(sheet_name) for sheet_name in self.sheet_names}
+    
+    def close(self) -> None:
+        """
+        ブックを閉じる（読み込み済みの行のキャッシュは保持する）
+        """
+        if self._workbook is not None:
+            self._workbook.close()
+            self._workbook = None
+        if self._excel_file is not None:
+            self._excel_file.close()
+            self._excel_file = None
+        self._streams.clear()
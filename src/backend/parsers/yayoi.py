@@ -1,74 +1,82 @@
-import PyPDF2
 import pandas as pd
-import re
-from typing import Dict, List, Any
-from .base import BaseParser
+from typing import Dict, Iterable, List, Any, Optional, Tuple
+from .base import BaseParser, TOKEN_ACCOUNT, TOKEN_AMOUNT, TOKEN_PERCENT, TOKEN_TAX_CLASS
+from .document import DocumentContext
+from .header import extract_header_metadata
+from .page_index import PAGE_HEADER, PAGE_PURCHASE, PAGE_SALES
+from .spec import load_spec
+
+# 弥生形式のレイアウト定義（specs/yayoi.json、読み込み時に一度だけコンパイル）
+SPEC = load_spec('yayoi')
 
 class YayoiParser(BaseParser):
     """
     弥生会計の勘定科目別税区分表パーサー
     """
     
+    # ページ分類に使うセクションの目印
+    SALES_PAGE_MARKERS = SPEC.page_markers[PAGE_SALES]
+    PURCHASE_PAGE_MARKERS = SPEC.page_markers[PAGE_PURCHASE]
+    
     def __init__(self):
         super().__init__()
         self.supported_extensions = ['.pdf']
         self.parser_name = "yayoi"
     
-    def detect_format(self, file_path: str) -> bool:
+    def detect_format(self, file_path: str, context: Optional[DocumentContext] = None) -> bool:
         """
         弥生形式のPDFファイルかどうかを判定
         """
-        if not self._validate_file(file_path):
+        # ファイル種別はマジックバイトの判定結果を優先する
+        file_kind = context.file_kind if context is not None else None
+        if not self._validate_file(file_path, file_kind):
             return False
         
         try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                
-                # 最初の数ページから弥生の特徴的なテキストを検索
-                for page_num in range(min(3, len(pdf_reader.pages))):
-                    page = pdf_reader.pages[page_num]
-                    text = page.extract_text()
-                    
-                    # 弥生の特徴的なキーワードをチェック（勘定科目別税区分表がキー）
-                    if '勘定科目別税区分表' in text:
-                        return True
-                    
-                    # 弥生ブランドの確認
-                    if '弥生' in text or 'YAYOI' in text:
-                        return True
-                    
-                    # 請求書区分別も弥生の特徴
-                    if '請求書区分別' in text:
+            with self._open_document(file_path, context) as document:
+                # 最初の数ページから弥生の特徴的なテキスト（勘定科目別税区分表・弥生ブランド・
+                # 請求書区分別）を検索
+                for text in document.iter_page_texts(max_pages=3):
+                    if SPEC.detection.matches(text):
                         return True
             
             return False
-            
+        
         except Exception:
             return False
     
-    def parse(self, file_path: str) -> Dict[str, Any]:
+    def parse(self, file_path: str, context: Optional[DocumentContext] = None) -> Dict[str, Any]:
         """
         弥生形式のPDFを解析
         """
         try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                full_text = ""
+            with self._open_document(file_path, context) as document:
+                # 未抽出のページをまとめて抽出（ページ数が多い場合は並列）
+                document.prefetch_pages()
                 
-                # 全ページのテキストを抽出
-                for page in pdf_reader.pages:
-                    full_text += page.extract_text() + "\n"
-            
-            # 売上データと仕入データを分離して抽出
-            sales_data = self._extract_sales_data(full_text)
-            purchase_data = self._extract_purchase_data(full_text)
-            
-            # メタデータ抽出
-            metadata = self._extract_metadata(full_text)
-            
-            return self._create_standard_output(sales_data, purchase_data, metadata)
+                # 各ページを分類し、表紙・注記など関係のないページは読み飛ばす
+                # （同じ会社の前回の解析で記録したページ範囲があれば検証して再利用）
+                page_index = self._build_page_index(document, self.SALES_PAGE_MARKERS,
+                                                    self.PURCHASE_PAGE_MARKERS)
+                
+                # 売上データと仕入データを1回の走査で振り分けて抽出（ページ単位の行ストリームを消費）
+                sales_data, purchase_data = self._extract_sections(
+                    document.iter_lines(page_index.pages(PAGE_SALES, PAGE_PURCHASE))
+                )
+                
+                # メタデータ抽出
+                metadata = self._extract_metadata(
+                    document.page_text(page_number) for page_number in page_index.pages(PAGE_HEADER)
+                )
+                
+                result = self._create_standard_output(sales_data, purchase_data, metadata)
+                
+                # 次回の同じ会社の帳票のためにページ範囲を記録
+                self._remember_profile(document, result, page_count=document.page_count,
+                                       page_ranges=page_index.page_ranges())
             
+            return result
+        
         except Exception as e:
             return {
                 'sales_items': [],
@@ -80,161 +88,102 @@ class YayoiParser(BaseParser):
                 'errors': [f"Parse error: {str(e)}"]
             }
     
-    def _extract_sales_data(self, text: str) -> List[Dict]:
+    def _extract_sections(self, lines: Iterable[str]) -> Tuple[List[Dict], List[Dict]]:
         """
-        売上データを抽出（弥生形式）
+        売上データと仕入データを1回の走査で抽出（弥生形式）
+        
+        現在のセクションを状態として持ち、セクション内の行を明細行のトークン列と
+        1回だけ照合して、一致した行を売上・仕入のどちらかに振り分ける。売上セクションは仕入・費用の
+        見出しまたは「合計計」で終了し、再開しない。
+        
+        Args:
+            lines: 前後の空白を除いた行のストリーム
+        
+        Returns:
+            Tuple: (売上データ, 仕入データ)
         """
         sales_data = []
+        purchase_data = []
         
-        # 弥生特有のレイアウトパターンを考慮
-        lines = text.split('\n')
-        
-        # 売上関連の行を特定
-        in_sales_section = False
+        section = None
+        sales_closed = False
+        section_header = SPEC.keywords['section_header']
+        sales_end = SPEC.keywords['sales_end']
         
         for line in lines:
-            line = line.strip()
+            if not line:
+                continue
             
-            # セクション開始の判定
-            if any(keyword in line for keyword in ['売上', '収入', '課税売上']):
-                if any(keyword in line for keyword in ['科目', '区分', '合計']):
-                    in_sales_section = True
+            # セクション見出しの判定
+            if section_header.search(line):
+                line_sections = SPEC.sections.sections_in(line)
+                # 売上セクション内の見出し・小計行（例: 売上合計）は明細ではない
+                if section == PAGE_SALES and line_sections == [PAGE_SALES]:
+                    continue
+                if section != PAGE_SALES and not sales_closed and PAGE_SALES in line_sections:
+                    section = PAGE_SALES
+                    continue
+                if PAGE_PURCHASE in line_sections:
+                    if section == PAGE_SALES:
+                        sales_closed = True
+                    section = PAGE_PURCHASE
                     continue
             
-            # セクション終了の判定
-            if in_sales_section and any(keyword in line for keyword in ['仕入', '費用', '合計計']):
-                break
+            # 売上セクション終了の判定
+            if section == PAGE_SALES and sales_end.search(line):
+                sales_closed = True
+                section = None
+                continue
             
-            if in_sales_section and line:
-                # 弥生特有のパターンマッチング
-                # 例: "売上高　　　　　課税売上10%　　　54,404,148"
-                pattern = r'([^\d\s]+)\s*([^0-9]*(?:課税|非課税|不課税)[^0-9]*(?:\d+%)?)\s*([\d,]+)'
-                match = re.search(pattern, line)
-                
-                if match:
-                    account_name = self._standardize_account_name(match.group(1))
-                    tax_classification = match.group(2).strip()
-                    amount = self._extract_numeric_value(match.group(3))
-                    
-                    if account_name and amount > 0:
-                        tax_rate = self._extract_tax_rate_from_classification(tax_classification)
-                        sales_data.append({
-                            'account_name': account_name,
-                            'tax_rate': tax_rate,
-                            'amount': amount,
-                            'taxable_amount': amount if self._is_taxable_yayoi(tax_classification) else 0
-                        })
-        
-        return sales_data
+            if section is None:
+                continue
+            
+            # 弥生特有のパターンマッチング
+            # 例: "売上高　　　　　課税売上10%　　　54,404,148"
+            row = SPEC.row.find(line)
+            if row:
+                item = self._create_item(row)
+                if item:
+                    (sales_data if section == PAGE_SALES else purchase_data).append(item)
+        
+        return sales_data, purchase_data
     
-    def _extract_purchase_data(self, text: str) -> List[Dict]:
+    def _create_item(self, row: Dict[str, Optional[str]]) -> Optional[Dict]:
         """
-        仕入データを抽出（弥生形式）
+        明細行のトークンからデータを作成（勘定科目なし・金額0の場合はNone）
         """
-        purchase_data = []
-        
-        lines = text.split('\n')
-        in_purchase_section = False
-        
-        for line in lines:
-            line = line.strip()
-            
-            # セクション開始の判定
-            if any(keyword in line for keyword in ['仕入', '費用', '課税仕入']):
-                if any(keyword in line for keyword in ['科目', '区分', '合計']):
-                    in_purchase_section = True
-                    continue
-            
-            if in_purchase_section and line:
-                # 弥生特有のパターンマッチング
-                pattern = r'([^\d\s]+)\s*([^0-9]*(?:課税|非課税|不課税)[^0-9]*(?:\d+%)?)\s*([\d,]+)'
-                match = re.search(pattern, line)
-                
-                if match:
-                    account_name = self._standardize_account_name(match.group(1))
-                    tax_classification = match.group(2).strip()
-                    amount = self._extract_numeric_value(match.group(3))
-                    
-                    if account_name and amount > 0:
-                        tax_rate = self._extract_tax_rate_from_classification(tax_classification)
-                        purchase_data.append({
-                            'account_name': account_name,
-                            'tax_rate': tax_rate,
-                            'amount': amount,
-                            'taxable_amount': amount if self._is_taxable_yayoi(tax_classification) else 0
-                        })
-        
-        return purchase_data
+        account_name = self._standardize_account_name(row[TOKEN_ACCOUNT])
+        # 税率が税区分と分かれている場合は連結して判定する
+        tax_classification = row[TOKEN_TAX_CLASS] + (row[TOKEN_PERCENT] or '')
+        amount = self._extract_numeric_value(row[TOKEN_AMOUNT])
+        
+        if not account_name or amount == 0:
+            return None
+        
+        return {
+            'account_name': account_name,
+            'tax_rate': self._extract_tax_rate_from_classification(tax_classification),
+            'amount': amount,
+            'taxable_amount': amount if self._is_taxable_yayoi(tax_classification) else 0
+        }
     
     def _extract_tax_rate_from_classification(self, classification: str) -> str:
         """
         税区分から税率を抽出
         """
-        if '10%' in classification or '10％' in classification:
-            return '10%'
-        elif '8%' in classification or '8％' in classification:
-            if '軽減' in classification:
-                return '軽減8%'
-            else:
-                return '8%'
-        elif '非課税' in classification:
-            return '非課税'
-        elif '不課税' in classification:
-            return '不課税'
-        elif '輸出' in classification:
-            return '輸出'
-        else:
-            return '課税'
+        return SPEC.tax_rates.rate(classification)
     
     def _is_taxable_yayoi(self, classification: str) -> bool:
         """
-        課税対象かどうかを判定（弥生形式）
+        課税対象かどうかを判定（弥生形式、非課税・不課税が明示されていれば対象外）
         """
-        taxable_keywords = ['課税', '10%', '8%', '軽減']
-        non_taxable_keywords = ['非課税', '不課税']
-        
-        # 非課税・不課税が明示されている場合
-        if any(keyword in classification for keyword in non_taxable_keywords):
-            return False
-        
-        # 課税が明示されている場合
-        if any(keyword in classification for keyword in taxable_keywords):
-            return True
-        
-        return False
+        return SPEC.is_taxable(classification)
     
-    def _extract_metadata(self, text: str) -> Dict[str, Any]:
+    def _extract_metadata(self, pages: Iterable[str]) -> Dict[str, Any]:
         """
         メタデータを抽出
-        """
-        metadata = {}
         
-        # 期間の抽出（弥生形式）
-        period_patterns = [
-            r'期間[：:]\s*(\d{4})[年/-](\d{1,2})[月/-](\d{1,2})日.*?(\d{4})[年/-](\d{1,2})[月/-](\d{1,2})日',
-            r'(\d{4})[年/-](\d{1,2})[月/-](\d{1,2})日.*?(\d{4})[年/-](\d{1,2})[月/-](\d{1,2})日'
-        ]
-        
-        for pattern in period_patterns:
-            period_match = re.search(pattern, text)
-            if period_match:
-                metadata['period_start'] = f"{period_match.group(1)}-{period_match.group(2):0>2}-{period_match.group(3):0>2}"
-                metadata['period_end'] = f"{period_match.group(4)}-{period_match.group(5):0>2}-{period_match.group(6):0>2}"
-                break
-        
-        # 会社名の抽出
-        company_patterns = [
-            r'(株式会社[^\s]+)',
-            r'(有限会社[^\s]+)',
-            r'(合同会社[^\s]+)',
-            r'([^\s]+株式会社)',
-            r'([^\s]+有限会社)'
-        ]
-        
-        for pattern in company_patterns:
-            company_match = re.search(pattern, text)
-            if company_match:
-                metadata['company_name'] = company_match.group(1)
-                break
-        
-        return metadata
\ No newline at end of file
+        会社名・期間は帳票の冒頭に印字されるため、先頭ページの冒頭部分だけを
+        事前コンパイルしたパターンで1回走査する。
+        """
+        return extract_header_metadata(SPEC.metadata, pages)
\ No newline at end of file
@@ -87,7 +87,7 @@ function App() {
         </div>
 
         <footer className="text-center mt-12 text-gray-500 text-sm">
-          <p>対応形式: freee (PDF), マネーフォワード (Excel), 弥生 (PDF)</p>
+          <p>対応形式: freee (PDF), マネーフォワード (Excel/CSV), 弥生 (PDF)</p>
         </footer>
       </div>
     </div>
@@ -77,7 +77,8 @@ const FileUpload: FC<FileUploadProps> = ({ onFileProcessed, onStepUpdate }) => {
     accept: {
       'application/pdf': ['.pdf'],
       'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': ['.xlsx'],
-      'application/vnd.ms-excel': ['.xls']
+      'application/vnd.ms-excel': ['.xls'],
+      'text/csv': ['.csv']
     },
     maxSize: 50 * 1024 * 1024, // 50MB
     multiple: false,
@@ -91,7 +92,7 @@ const FileUpload: FC<FileUploadProps> = ({ onFileProcessed, onStepUpdate }) => {
         return 'ファイルサイズが50MBを超えています'
       }
       if (rejection.errors.some(e => e.code === 'file-invalid-type')) {
-        return 'サポートされていないファイル形式です（PDF, Excel のみ）'
+        return 'サポートされていないファイル形式です（PDF, Excel, CSV のみ）'
       }
       return 'ファイルが無効です'
     }
@@ -161,7 +162,7 @@ const FileUpload: FC<FileUploadProps> = ({ onFileProcessed, onStepUpdate }) => {
             
             {!uploading && uploadStatus === 'idle' && (
               <p className="text-xs text-gray-400 mt-2">
-                PDF, Excel (xlsx, xls) - 最大50MB
+                PDF, Excel (xlsx, xls), CSV - 最大50MB
               </p>
             )}
           </div>
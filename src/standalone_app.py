@@ -15,6 +15,8 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent / "backend"))
 
 from backend.parsers.factory import ParserFactory
+from backend.parsers.document import DocumentContext
+from backend.parsers.profiles import ProfileStore
 from backend.normalizer import TaxDataNormalizer
 from backend.csv_generator import CSVGenerator
 
@@ -84,9 +86,10 @@ class TaxConverterApp:
         file_path = filedialog.askopenfilename(
             title="税区分表ファイルを選択",
             filetypes=[
-                ("サポートファイル", "*.pdf *.xlsx *.xls"),
+                ("サポートファイル", "*.pdf *.xlsx *.xls *.csv"),
                 ("PDFファイル", "*.pdf"),
                 ("Excelファイル", "*.xlsx *.xls"),
+                ("CSVファイル", "*.csv"),
                 ("全てのファイル", "*.*")
             ]
         )
@@ -113,19 +116,21 @@ class TaxConverterApp:
             # UI更新（メインスレッドから）
             self.root.after(0, lambda: self.result_text.insert(tk.END, "解析を開始しています...\n"))
             
-            # パーサー選択
-            parser = ParserFactory.get_parser(file_path)
-            if not parser:
-                self.root.after(0, lambda: messagebox.showerror("エラー", 
-                    "サポートされていないファイル形式です。freee、マネーフォワード、弥生の税区分表を選択してください。"))
-                return
-            
-            self.root.after(0, lambda: self.result_text.insert(tk.END, 
-                f"検出システム: {parser.__class__.__name__.replace('Parser', '')}\n"))
-            
-            # データ解析
-            self.root.after(0, lambda: self.result_text.insert(tk.END, "データを解析中...\n"))
-            raw_data = parser.parse(file_path)
+            # 同じ会社の前回のレイアウトを再利用するためのプロファイルキャッシュ
+            with DocumentContext(file_path, profile_store=ProfileStore.from_environment()) as context:
+                # パーサー選択
+                parser = ParserFactory.get_parser(file_path, context)
+                if not parser:
+                    self.root.after(0, lambda: messagebox.showerror("エラー", 
+                        "サポートされていないファイル形式です。freee、マネーフォワード、弥生の税区分表を選択してください。"))
+                    return
+                
+                self.root.after(0, lambda: self.result_text.insert(tk.END, 
+                    f"検出システム: {parser.__class__.__name__.replace('Parser', '')}\n"))
+                
+                # データ解析（判定時に抽出したページテキストを再利用）
+                self.root.after(0, lambda: self.result_text.insert(tk.END, "データを解析中...\n"))
+                raw_data = parser.parse(file_path, context)
             
             # データ正規化
             normalizer = TaxDataNormalizer()
@@ -51,22 +51,26 @@ def process_file_cli(file_path):
     """コマンドライン版のファイル処理"""
     try:
         from backend.parsers.factory import ParserFactory
+        from backend.parsers.document import DocumentContext
+        from backend.parsers.profiles import ProfileStore
         from backend.normalizer import TaxDataNormalizer
         from backend.csv_generator import CSVGenerator
         
         print(f"Processing file: {file_path}")
         
-        # パーサー選択
-        parser = ParserFactory.get_parser(file_path)
-        if not parser:
-            print("Error: Unsupported file format")
-            print("Supported: freee (PDF), MoneyForward (PDF/Excel), Yayoi (PDF)")
-            return
-        
-        print(f"Detected system: {parser.__class__.__name__.replace('Parser', '')}")
-        
-        # データ解析
-        raw_data = parser.parse(file_path)
+        # 同じ会社の前回のレイアウトを再利用するためのプロファイルキャッシュ
+        with DocumentContext(file_path, profile_store=ProfileStore.from_environment()) as context:
+            # パーサー選択
+            parser = ParserFactory.get_parser(file_path, context)
+            if not parser:
+                print("Error: Unsupported file format")
+                print("Supported: freee (PDF), MoneyForward (PDF/Excel/CSV), Yayoi (PDF)")
+                return
+            
+            print(f"Detected system: {parser.__class__.__name__.replace('Parser', '')}")
+            
+            # データ解析（判定時に抽出したページテキストを再利用）
+            raw_data = parser.parse(file_path, context)
         
         # データ正規化
         normalizer = TaxDataNormalizer()
@@ -89,7 +93,7 @@ def process_file_cli(file_path):
             print(f"\nTaxable sales total: ¥{taxable_total:,}")
         
         # CSV出力
-        output_path = file_path.replace('.pdf', '_converted.zip').replace('.xlsx', '_converted.zip')
+        output_path = os.path.splitext(file_path)[0] + '_converted.zip'
         
         csv_generator = CSVGenerator()
         zip_content = csv_generator.generate_zip(processed_data)
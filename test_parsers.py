@@ -0,0 +1,890 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+税区分表変換ツール - パーサーテスト
+scripts/sample_reports.py で生成したサンプルPDFを使って判定・解析を確認する
+"""
+
+import sys
+from pathlib import Path
+
+import PyPDF2
+import pytest
+
+# プロジェクトパスを設定
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root / 'src' / 'backend'))
+sys.path.insert(0, str(project_root / 'scripts'))
+
+from parsers.document import DocumentContext
+from parsers.factory import ParserFactory
+from parsers.freee import FreeeParser
+from sample_reports import build_pdf, freee_pages, yayoi_pages
+
+def _write_pdf(tmp_path, name, pages, **options):
+    """サンプルPDFを一時ディレクトリに書き出す"""
+    file_path = tmp_path / name
+    file_path.write_bytes(build_pdf(pages, **options))
+    return str(file_path)
+
+def _count_extractions(monkeypatch):
+    """PyPDF2のページテキスト抽出回数を数える"""
+    calls = []
+    original = PyPDF2.PageObject.extract_text
+    
+    def counting_extract_text(page, *args, **kwargs):
+        calls.append(page)
+        return original(page, *args, **kwargs)
+    
+    monkeypatch.setattr(PyPDF2.PageObject, 'extract_text', counting_extract_text)
+    return calls
+
+def test_yayoi_shared_context_extracts_each_page_once(tmp_path, monkeypatch):
+    """判定と解析でページテキストを共有する"""
+    file_path = _write_pdf(tmp_path, 'yayoi.pdf', yayoi_pages(page_count=6, rows_per_page=5))
+    calls = _count_extractions(monkeypatch)
+    
+    with DocumentContext(file_path) as context:
+        parser = ParserFactory.get_parser(file_path, context)
+        assert parser.parser_name == 'yayoi'
+        result = parser.parse(file_path, context)
+    
+    assert len(calls) == 6
+    assert len(result['sales_items']) == 15
+    assert len(result['purchase_items']) == 15
+    assert result['company_name'] == '株式会社サンプル商事'
+    assert result['period_start'] == '2024-04-01'
+    assert result['errors'] == []
+
+def test_uncached_document_streams_one_page_at_a_time(tmp_path, monkeypatch):
+    """cache_pages=False の文書はページのテキストを保持せず、行は読み進めたページだけを抽出する"""
+    file_path = _write_pdf(tmp_path, 'yayoi.pdf', yayoi_pages(page_count=6, rows_per_page=5))
+    with DocumentContext(file_path) as context:
+        expected = ParserFactory.get_parser(file_path, context).parse(file_path, context)
+    
+    calls = _count_extractions(monkeypatch)
+    with DocumentContext(file_path, cache_pages=False) as document:
+        lines = document.iter_lines()
+        next(lines)
+        assert len(calls) == 1
+        assert sum(1 for _ in lines) > 0 and len(calls) == 6
+        
+        parser = ParserFactory.get_parser(file_path, document)
+        assert parser.parse(file_path, document) == expected
+        # 判定・ページ分類・明細の抽出で読み直すが、テキストは1ページも保持しない
+        assert len(calls) > 12
+        assert not document._page_texts and not document._page_fragments
+
+@pytest.mark.parametrize('pdf_backend', ['pypdf2', 'pdfminer'])
+def test_uncached_freee_parse_extracts_layout_on_demand(tmp_path, monkeypatch, pdf_backend):
+    """cache_pages=False のfreeeの解析は全ページの位置付きテキストを先に抽出せず、バックエンドも保持しない"""
+    from parsers.pdf_backends import get_backend_class
+    if not get_backend_class(pdf_backend).is_available():
+        pytest.skip(f'{pdf_backend} is not installed')
+    
+    file_path = _write_pdf(tmp_path, 'freee.pdf', freee_pages())
+    with DocumentContext(file_path, pdf_backend=pdf_backend) as context:
+        expected = FreeeParser().parse(file_path, context)
+    
+    requested = []
+    page_fragments = DocumentContext.page_fragments
+    def count_fragments(self, page_number):
+        requested.append(page_number)
+        return page_fragments(self, page_number)
+    monkeypatch.setattr(DocumentContext, 'page_fragments', count_fragments)
+    
+    with DocumentContext(file_path, pdf_backend=pdf_backend, cache_pages=False) as document:
+        assert FreeeParser().parse(file_path, document) == expected
+        # 表のページを解析する時点で1回ずつだけ抽出する
+        assert requested == [0]
+        assert not document._page_texts and not document._page_fragments
+        if pdf_backend == 'pdfminer':
+            assert not document.backend._texts and not document.backend._fragments
+
+def test_parser_without_context_still_works(tmp_path):
+    """コンテキストを渡さない従来の呼び出し方"""
+    file_path = _write_pdf(tmp_path, 'freee.pdf', freee_pages())
+    
+    parser = ParserFactory.get_parser(file_path)
+    assert parser.parser_name == 'freee'
+    
+    result = parser.parse(file_path)
+    assert result['errors'] == []
+    assert any(item['account_name'] == '売上高' for item in result['sales_items'])
+
+def test_unknown_file_returns_none(tmp_path):
+    """PDFとして読めないファイルはどのパーサーにも該当しない"""
+    file_path = tmp_path / 'broken.pdf'
+    file_path.write_bytes(b'not a pdf')
+    
+    assert ParserFactory.get_parser(str(file_path)) is None
+
+def test_registry_candidates_by_magic_bytes(tmp_path):
+    """拡張子ではなくマジックバイトで候補パーサーを絞り込む"""
+    from parsers.registry import default_registry
+    
+    xlsx_path = tmp_path / 'book.xlsx'
+    xlsx_path.write_bytes(b'PK\x03\x04' + b'\x00' * 64)
+    signature = default_registry.sniff(str(xlsx_path))
+    assert [parser.parser_name for parser in default_registry.candidates(signature)] == ['moneyforward']
+    
+    # 拡張子がxlsxでも中身がPDFならPDFとして扱う
+    renamed_path = tmp_path / 'renamed.xlsx'
+    renamed_path.write_bytes(build_pdf(yayoi_pages(page_count=1, rows_per_page=1)))
+    signature = default_registry.sniff(str(renamed_path))
+    assert signature.kind == '.pdf'
+    assert [parser.parser_name for parser in default_registry.candidates(signature)] == ['freee', 'moneyforward', 'yayoi']
+    
+    # 候補のインスタンスは使い回される
+    assert default_registry.get('yayoi') is default_registry.get('yayoi')
+
+def test_fingerprint_detection_skips_text_extraction(tmp_path, monkeypatch):
+    """メタデータや非圧縮ストリームのベンダー指紋で判定できればページを抽出しない"""
+    yayoi_path = _write_pdf(tmp_path, 'yayoi.pdf', yayoi_pages(page_count=2, rows_per_page=2), compress=False)
+    freee_path = _write_pdf(tmp_path, 'report.pdf', [['集計表']], producer='freee accounting')
+    calls = _count_extractions(monkeypatch)
+    
+    assert ParserFactory.get_parser(yayoi_path).parser_name == 'yayoi'
+    assert ParserFactory.get_parser(freee_path).parser_name == 'freee'
+    assert calls == []
+
+def test_report_title_alone_is_not_a_vendor_fingerprint(tmp_path):
+    """他社の帳票にも現れうる帳票名は、ベンダー名と組で現れた場合だけ指紋とみなす"""
+    from parsers.registry import default_registry
+    
+    title_only = _write_pdf(tmp_path, 'title.pdf', [['勘定科目別税区分集計表', '株式会社テスト']], compress=False)
+    with_vendor = _write_pdf(tmp_path, 'mf.pdf', [['勘定科目別税区分集計表', 'Cognite']], compress=False)
+    
+    assert default_registry.sniff(title_only).vendors == set()
+    assert ParserFactory.get_parser(title_only) is None
+    assert default_registry.sniff(with_vendor).vendors == {'moneyforward'}
+
+def test_compressed_pdf_falls_back_to_text_detection(tmp_path, monkeypatch):
+    """圧縮ストリームで指紋が見つからない場合はテキストで判定する"""
+    file_path = _write_pdf(tmp_path, 'yayoi.pdf', yayoi_pages(page_count=2, rows_per_page=2))
+    calls = _count_extractions(monkeypatch)
+    
+    assert ParserFactory.get_parser(file_path).parser_name == 'yayoi'
+    assert len(calls) > 0
+
+def test_supported_formats_come_from_registry():
+    """サポート形式はレジストリの登録内容から作られる"""
+    formats = ParserFactory.get_supported_formats()
+    assert formats['moneyforward'] == ['.xlsx', '.xls', '.csv', '.pdf']
+    assert formats['yayoi'] == ['.pdf']
+
+def test_parallel_prefetch_matches_serial_extraction(tmp_path):
+    """並列抽出はページ順を保ったまま直列抽出と同じテキストを返す"""
+    file_path = _write_pdf(tmp_path, 'yayoi.pdf', yayoi_pages(page_count=8, rows_per_page=3))
+    
+    with DocumentContext(file_path, max_workers=1) as context:
+        context.prefetch_pages()
+        serial_texts = list(context.iter_page_texts())
+    
+    with DocumentContext(file_path, max_workers=3, parallel_threshold=2) as context:
+        context.page_text(0)
+        context.prefetch_pages()
+        parallel_texts = list(context.iter_page_texts())
+    
+    assert parallel_texts == serial_texts
+    assert '仕入高' in parallel_texts[-1]
+
+def test_page_index_skips_irrelevant_pages(tmp_path):
+    """表紙・注記ページは分類されず、解析結果にも影響しない"""
+    from parsers.page_index import PageIndex, PAGE_PURCHASE, PAGE_SALES
+    from parsers.yayoi import YayoiParser
+    
+    report_pages = yayoi_pages(page_count=4, rows_per_page=3)
+    noisy_pages = [['表紙', '決算資料']] + report_pages[:2] + [['注記事項', '特記事項なし']] + report_pages[2:]
+    
+    plain_path = _write_pdf(tmp_path, 'plain.pdf', report_pages)
+    noisy_path = _write_pdf(tmp_path, 'noisy.pdf', noisy_pages)
+    
+    with DocumentContext(noisy_path) as context:
+        page_index = PageIndex.build(context.iter_page_texts(),
+                                     YayoiParser.SALES_PAGE_MARKERS, YayoiParser.PURCHASE_PAGE_MARKERS)
+        assert page_index.kinds(0) == set()
+        assert page_index.kinds(3) == set()
+        assert page_index.pages(PAGE_SALES) == [1, 2]
+        assert page_index.pages(PAGE_PURCHASE) == [4, 5]
+    
+    parser = YayoiParser()
+    plain = parser.parse(plain_path)
+    noisy = parser.parse(noisy_path)
+    assert noisy['sales_items'] == plain['sales_items']
+    assert noisy['purchase_items'] == plain['purchase_items']
+
+def test_pdf_backend_selection(tmp_path, monkeypatch):
+    """テキスト抽出バックエンドは引数・環境変数で切り替えられる"""
+    import pytest
+    from parsers.pdf_backends import PDF_BACKEND_ENV, PyPDF2Backend, available_backends, get_backend_class
+    
+    assert 'pypdf2' in available_backends()
+    assert get_backend_class() is PyPDF2Backend
+    
+    monkeypatch.setenv(PDF_BACKEND_ENV, 'no-such-backend')
+    with pytest.raises(ValueError):
+        get_backend_class()
+    
+    # 不明なバックエンドではどのパーサーにも判定されない
+    file_path = _write_pdf(tmp_path, 'yayoi.pdf', yayoi_pages(page_count=1, rows_per_page=1))
+    assert ParserFactory.get_parser(file_path) is None
+    
+    # 引数の指定は環境変数より優先される
+    with DocumentContext(file_path, pdf_backend='pypdf2') as context:
+        assert ParserFactory.get_parser(file_path, context).parser_name == 'yayoi'
+
+def test_yayoi_single_pass_routes_rows_by_section():
+    """1回の走査で明細行を売上・仕入に振り分け、セクション内の小計行は明細にしない"""
+    from parsers.yayoi import YayoiParser
+    
+    lines = iter([
+        '勘定科目別税区分表',
+        '売上 勘定科目 税区分 金額',
+        '売上高 課税売上10% 1,000',
+        '雑収入 課税売上8% 2,000',
+        '売上合計 課税売上10% 1,500',
+        '仕入 勘定科目 税区分 金額',
+        '仕入高 課税仕入10% 500',
+        '仕入合計 課税仕入10% 500',
+        '受取家賃 非課税売上 300',
+        '売上 勘定科目 税区分 金額',
+        '通信費 課税仕入10% 700',
+    ])
+    sales, purchases = YayoiParser()._extract_sections(lines)
+    
+    assert [item['account_name'] for item in sales] == ['売上高', '雑収入']
+    assert [item['tax_rate'] for item in sales] == ['10%', '8%']
+    # 売上セクションは終了後に再開しない
+    assert [item['account_name'] for item in purchases] == ['仕入高', '受取家賃', '通信費']
+    assert purchases[1]['taxable_amount'] == 0
+
+def test_line_lexer_tokens_and_sequences():
+    """明細行を型付きトークンに分割し、トークン列で照合する"""
+    from parsers.base import (TOKEN_ACCOUNT, TOKEN_AMOUNT, TOKEN_PERCENT, TOKEN_TAX_CLASS,
+                              TOKEN_TOTAL, Token, line_lexer)
+    
+    assert line_lexer.tokenize('消耗品費 課対仕入8% 150,000') == [
+        Token(TOKEN_ACCOUNT, '消耗品費'),
+        Token(TOKEN_TAX_CLASS, '課対仕入8%'),
+        Token(TOKEN_AMOUNT, '150,000'),
+    ]
+    assert [token.kind for token in line_lexer.tokenize('合計 20,150,000')] == [TOKEN_TOTAL, TOKEN_AMOUNT]
+    
+    row = line_lexer.sequence(TOKEN_ACCOUNT, TOKEN_TAX_CLASS, TOKEN_PERCENT + '?', TOKEN_AMOUNT)
+    assert row.find('売上高 課税売上 10% 1,000') == {
+        TOKEN_ACCOUNT: '売上高', TOKEN_TAX_CLASS: '課税売上', TOKEN_PERCENT: '10%', TOKEN_AMOUNT: '1,000'
+    }
+    # 空白のない行も区切れる
+    assert row.find('受取家賃非課売上1,675,500')[TOKEN_ACCOUNT] == '受取家賃'
+    # freeeの略記の税区分（課対・非課）も明細行とする（従来の「課税・非課税・不課税」のパターンは認識しない）
+    assert row.find('仕入高 課対仕入10% 20,000,000')[TOKEN_TAX_CLASS] == '課対仕入10%'
+    assert row.find('受取家賃 非課売上 1,675,500')[TOKEN_TAX_CLASS] == '非課売上'
+    assert row.find('雑費 対象外 1,000') is None
+    assert row.find('勘定科目 税区分 金額') is None
+
+def test_freee_purchase_rows_keep_rate_and_amount(tmp_path):
+    """freeeの仕入明細は税率と金額をトークンから取り出す"""
+    file_path = _write_pdf(tmp_path, 'freee.pdf', freee_pages())
+    result = ParserFactory.get_parser(file_path).parse(file_path)
+    
+    assert [(item['account_name'], item['tax_rate'], item['amount']) for item in result['purchase_items']] == [
+        ('仕入高', '10%', 20000000.0),
+        ('消耗品費', '8%', 150000.0),
+    ]
+
+def test_amount_parser_accounting_conventions():
+    """会計帳票の金額表記を円単位の整数に変換する"""
+    import pandas as pd
+    from parsers.amount import parse_amount, parse_amount_series
+    
+    assert parse_amount('54,404,148') == 54404148
+    assert parse_amount('￥1,234円') == 1234
+    assert parse_amount('１，２３４') == 1234
+    assert parse_amount('△1,234') == -1234
+    assert parse_amount('▲1,234') == -1234
+    assert parse_amount('(1,234)') == -1234
+    assert parse_amount('（１，２３４）') == -1234
+    assert parse_amount(1500.0) == 1500
+    assert parse_amount('1234.5') == 1235
+    assert parse_amount(None) == 0
+    assert parse_amount(float('nan')) == 0
+    assert parse_amount('金額') == 0
+    
+    values = pd.Series(['1,234', '△500', None, 1000.0, '(10)', '１，０００', 'x', 2.5,
+                        True, False, '1e5', '1.5e3', 'inf', ' 12 ', 7, float('nan')], dtype=object)
+    parsed = parse_amount_series(values)
+    assert str(parsed.dtype) == 'int64'
+    assert parsed.tolist() == [parse_amount(value) for value in values]
+    assert parsed.tolist()[8:12] == [0, 0, 15, 2]
+    
+    # 型の揃った列も要素ごとの変換と一致する
+    for typed in (pd.Series([True, False]), pd.Series([1, -2, 3]), pd.Series([1.5, float('nan'), -2.5]),
+                  pd.Series(['1e5', '2,000'])):
+        assert parse_amount_series(typed).tolist() == [parse_amount(value) for value in typed]
+
+def test_yayoi_negative_amount_rows_are_kept():
+    """△付きの金額は負の明細として残す"""
+    from parsers.yayoi import YayoiParser
+    
+    sales, _ = YayoiParser()._extract_sections([
+        '売上 勘定科目 税区分 金額',
+        '売上高 課税売上10% 10,000',
+        '売上値引 課税売上10% △1,000',
+    ])
+    assert [(item['account_name'], item['amount'], item['taxable_amount']) for item in sales] == [
+        ('売上高', 10000, 10000),
+        ('売上値引', -1000, -1000),
+    ]
+
+def test_header_metadata_is_bounded_to_header_region():
+    """メタデータは先頭ページの冒頭部分だけから1回の走査で抽出する"""
+    from parsers.header import HEADER_CHAR_LIMIT, HeaderScanner, extract_header_metadata
+    
+    scanner = HeaderScanner({
+        'period': [
+            r'期間[：:]\s*(\d{4})年(\d{1,2})月(\d{1,2})日.*?(\d{4})年(\d{1,2})月(\d{1,2})日',
+            r'(\d{4})年(\d{1,2})月(\d{1,2})日.*?(\d{4})年(\d{1,2})月(\d{1,2})日',
+        ],
+        'company_name': [r'(株式会社[^\s]+)', r'([^\s]+株式会社)'],
+    })
+    
+    # 優先度の高いパターンが後に現れても優先する
+    first_page = 'サンプル株式会社\n作成 2025年5月1日 ～ 2025年5月2日\n期間: 2024年4月1日 ～ 2025年3月31日\n株式会社テスト'
+    assert extract_header_metadata(scanner, [first_page]) == {
+        'period_start': '2024-04-01',
+        'period_end': '2025-03-31',
+        'company_name': '株式会社テスト',
+    }
+    
+    # 冒頭部分より後ろや、対象外のページは走査しない
+    late_page = 'x' * HEADER_CHAR_LIMIT + '期間: 2024年4月1日 ～ 2025年3月31日'
+    pages = iter(['表紙', late_page, '株式会社テスト'])
+    assert extract_header_metadata(scanner, pages) == {}
+    assert next(pages) == '株式会社テスト'
+
+def test_freee_layout_rows_follow_column_positions(tmp_path, monkeypatch):
+    """freeeの表は見出し行の列位置で行・列に振り分け、列位置が使えなければ行テキストで解析する"""
+    from parsers.pdf_backends import PdfTextBackend, PyPDF2Backend
+    
+    # 2ページ目は見出しのない続きのページ
+    header = [(40, '勘定科目'), (200, '税区分'), (400, '金額')]
+    pages = [
+        ['消費税区分別表', '株式会社テスト', header,
+         [(40, '売上高'), (200, '課税売上10%'), (400, '1,000,000')],
+         [(40, '売上値引'), (200, '課税売上10%'), (400, '△20,000')]],
+        ['課税仕入',
+         [(40, '仕入高'), (200, '課対仕入8%'), (400, '300,000')],
+         [(40, '合計'), (400, '300,000')]],
+    ]
+    file_path = _write_pdf(tmp_path, 'freee.pdf', pages)
+    expected_sales = [('売上高', '10%', 1000000), ('売上値引', '10%', -20000)]
+    expected_purchases = [('仕入高', '8%', 300000)]
+    
+    def summarize(items):
+        return [(item['account_name'], item['tax_rate'], item['amount']) for item in items]
+    
+    result = FreeeParser().parse(file_path)
+    assert summarize(result['sales_items']) == expected_sales
+    assert summarize(result['purchase_items']) == expected_purchases
+    
+    # 行を1つのテキストブロックで描画したPDFは1行が1つの断片になるため、行テキストで解析する
+    result = FreeeParser().parse(_write_pdf(tmp_path, 'freee_rows.pdf', pages, block_per_row=True))
+    assert summarize(result['sales_items']) == expected_sales
+    assert summarize(result['purchase_items']) == expected_purchases
+    
+    monkeypatch.setattr(PyPDF2Backend, 'supports_layout', False)
+    result = FreeeParser().parse(file_path)
+    assert summarize(result['sales_items']) == expected_sales
+    assert summarize(result['purchase_items']) == expected_purchases
+    
+    # 位置情報に対応しないバックエンドの既定の実装は断片を返さず、フラグによらず行テキストで解析する
+    monkeypatch.setattr(PyPDF2Backend, 'supports_layout', True)
+    monkeypatch.setattr(PyPDF2Backend, 'extract_page_layout', PdfTextBackend.extract_page_layout)
+    with DocumentContext(file_path) as document:
+        assert document.page_fragments(0) == []
+        result = FreeeParser().parse(file_path, document)
+    assert summarize(result['sales_items']) == expected_sales
+    assert summarize(result['purchase_items']) == expected_purchases
+
+def test_text_normalized_once_at_extraction(tmp_path):
+    """全角英数字・全角空白は抽出時に正規化され、以降は半角だけを照合する"""
+    import pandas as pd
+    from parsers.text import normalize_frame
+    from parsers.yayoi import YayoiParser
+    
+    pages = [['勘定科目別税区分表', '株式会社サンプル商事', '期間：２０２４年４月１日　～　２０２５年３月３１日',
+              '売上　勘定科目　税区分　金額', '売上高　　課税売上１０％　　１，０００',
+              '仕入　勘定科目　税区分　金額', '通信費（本社）　課税仕入８％　５００']]
+    file_path = _write_pdf(tmp_path, 'yayoi.pdf', pages)
+    
+    with DocumentContext(file_path) as context:
+        assert '売上高 課税売上10% 1,000' in context.page_text(0)
+        result = YayoiParser().parse(file_path, context)
+    
+    assert result['period_start'] == '2024-04-01'
+    assert [(item['account_name'], item['tax_rate'], item['amount']) for item in result['sales_items']] == [
+        ('売上高', '10%', 1000)
+    ]
+    assert [(item['account_name'], item['tax_rate']) for item in result['purchase_items']] == [('通信費(本社)', '8%')]
+    
+    frame = pd.DataFrame({'勘定科目': ['売上高（店舗）', None], '１０％': ['１，０００', 2000]})
+    normalized = normalize_frame(frame)
+    assert list(normalized.columns) == ['勘定科目', '10%']
+    assert normalized['勘定科目'].tolist()[0] == '売上高(店舗)'
+    assert normalized['10%'].tolist() == ['1,000', 2000]
+
+def test_multi_entity_pdf_is_split_per_company(tmp_path):
+    """複数事業者をまとめたPDFは事業者ごとに分割して解析し、並列でも直列と同じ結果になる"""
+    from parsers.splitter import find_entity_segments, parse_entities
+    
+    pages = (yayoi_pages(page_count=2, rows_per_page=5, company_name='株式会社サンプル商事')
+             + [['注記']]
+             + yayoi_pages(page_count=4, rows_per_page=3, company_name='テスト物産株式会社'))
+    file_path = _write_pdf(tmp_path, 'bundle.pdf', pages)
+    
+    with DocumentContext(file_path) as context:
+        segments = find_entity_segments(context.iter_page_texts())
+    assert [(segment.company_name, segment.start, segment.stop) for segment in segments] == [
+        ('株式会社サンプル商事', 0, 3), ('テスト物産株式会社', 3, 7)
+    ]
+    
+    serial = parse_entities(file_path, max_workers=1)
+    parallel = parse_entities(file_path, max_workers=2, parallel_threshold=1)
+    assert parallel == serial
+    
+    assert [result['company_name'] for result in serial] == ['株式会社サンプル商事', 'テスト物産株式会社']
+    assert [result['page_range'] for result in serial] == [[1, 3], [4, 7]]
+    assert [(len(result['sales_items']), len(result['purchase_items'])) for result in serial] == [(5, 5), (6, 6)]
+
+def test_freee_segment_reuses_handed_over_page_texts(tmp_path, monkeypatch):
+    """別のコンテキストから引き継いだページテキストがあれば、freeeの表も位置付きで抽出し直さない"""
+    from parsers.splitter import _parse_segment
+    
+    file_path = _write_pdf(tmp_path, 'freee.pdf', freee_pages())
+    with DocumentContext(file_path) as context:
+        expected = FreeeParser().parse(file_path, context)
+        page_texts = list(context.iter_page_texts())
+    
+    calls = _count_extractions(monkeypatch)
+    result = _parse_segment(file_path, 'freee', list(range(len(page_texts))), page_texts, 'pypdf2')
+    assert calls == []
+    assert result['sales_items'] == expected['sales_items']
+    assert result['purchase_items'] == expected['purchase_items']
+
+def test_layout_specs_compile_to_single_pass_matchers(tmp_path):
+    """レイアウト定義はJSONから読み込み、キーワード・税率の対応表を1回の走査で判定する"""
+    import json
+    from keyword_matcher import KeywordAutomaton
+    from parsers.spec import load_spec
+    
+    matcher = KeywordAutomaton(['税区分', '勘定科目別税区分集計表', 'インボイス'])
+    assert matcher.find_all('勘定科目別税区分集計表 インボイス') == {'税区分', '勘定科目別税区分集計表', 'インボイス'}
+    assert not matcher.search('売上高')
+    
+    yayoi = load_spec('yayoi')
+    assert [yayoi.tax_rates.rate(text) for text in ['課税売上10%', '課税仕入8%(軽減)', '課税仕入8%', '非課税売上', '輸出売上']] == [
+        '10%', '軽減8%', '8%', '非課税', '輸出'
+    ]
+    assert yayoi.is_taxable('課税売上10%') and not yayoi.is_taxable('非課税売上')
+    assert load_spec('freee').tax_rates.rate('課対仕入8%(軽)') == '8%'
+    assert not load_spec('freee').detection.matches('消費税区分別表 勘定科目別税区分表')
+    assert load_spec('moneyforward').sections.classify('課税売上10%') == 'sales'
+    
+    # 新しい帳票の変種はコードを変えずに定義ファイルだけで追加できる
+    (tmp_path / 'variant.json').write_text(json.dumps({
+        'name': 'variant',
+        'detect': [{'all': ['税区分別集計'], 'none': ['弥生']}],
+        'sections': {'sales': ['売上'], 'purchase': ['仕入']},
+        'row': ['account', 'tax_class', 'amount'],
+        'tax_rates': {'rules': [{'pattern': r'\d+%'}], 'default': '不明'},
+    }), encoding='utf-8')
+    variant = load_spec('variant', str(tmp_path))
+    assert variant.detection.matches('税区分別集計表') and not variant.detection.matches('弥生 税区分別集計表')
+    assert variant.row.find('通信費 課税仕入10% 500')['amount'] == '500'
+    assert variant.tax_rates.rate('対象外') == '不明'
+
+def test_layout_profile_fast_path_for_repeat_company(tmp_path, monkeypatch):
+    """同じ会社の2回目以降のファイルは、記録したレイアウトを検証して判定・探索を省略する"""
+    import json
+    import openpyxl
+    from parsers.moneyforward import MoneyforwardParser
+    from parsers.page_index import PageIndex
+    from parsers.profiles import ProfileStore
+    from parsers.yayoi import YayoiParser
+    
+    profile_path = tmp_path / 'profiles.json'
+    
+    def parse(file_path):
+        with DocumentContext(file_path, profile_store=ProfileStore(str(profile_path))) as context:
+            parser = ParserFactory.get_parser(file_path, context)
+            return parser.parser_name, parser.parse(file_path, context)
+    
+    def summarize(result):
+        return [(item['account_name'], item['tax_rate'], item['amount'])
+                for item in result['sales_items'] + result['purchase_items']]
+    
+    pdf_path = _write_pdf(tmp_path, 'yayoi.pdf', yayoi_pages(page_count=4, rows_per_page=3))
+    workbook_path = tmp_path / 'mf.xlsx'
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = '集計'
+    for row in [['勘定科目別税区分集計表'], ['株式会社サンプル商事'], [],
+                ['勘定科目', '課税売上10%', '課税仕入10%', '合計'],
+                ['売上高', 1000, None, 1000], ['通信費', None, 500, 500]]:
+        sheet.append(row)
+    workbook.save(workbook_path)
+    
+    first = {path: parse(path) for path in [pdf_path, str(workbook_path)]}
+    profiles = json.loads(profile_path.read_text(encoding='utf-8'))
+    assert profiles['株式会社サンプル商事||.pdf']['page_ranges']['purchase'] == [[2, 4]]
+    assert profiles['株式会社サンプル商事||.xlsx']['header_rows'] == {'集計': 2}
+    
+    # 2回目は記録したパーサーの判定だけを行い、ページ分類・見出し行の探索は行わない
+    def fail(*args, **kwargs):
+        raise AssertionError('layout search should be skipped')
+    
+    detected = []
+    original_detect = YayoiParser.detect_format
+    monkeypatch.setattr(YayoiParser, 'detect_format',
+                        lambda self, *args: detected.append(self.parser_name) or original_detect(self, *args))
+    monkeypatch.setattr(FreeeParser, 'detect_format', fail)
+    monkeypatch.setattr(PageIndex, 'build', fail)
+    monkeypatch.setattr(MoneyforwardParser, '_find_header_row', fail)
+    for path, (parser_name, result) in first.items():
+        name, repeated = parse(path)
+        assert name == parser_name and not repeated['errors']
+        assert summarize(repeated) == summarize(result)
+    assert detected == ['yayoi']
+    
+    # レイアウトが変わったファイルは記録を使わずに探索し直す
+    monkeypatch.undo()
+    pdf_path = _write_pdf(tmp_path, 'yayoi.pdf', yayoi_pages(page_count=6, rows_per_page=3))
+    name, result = parse(pdf_path)
+    assert name == 'yayoi' and (len(result['sales_items']), len(result['purchase_items'])) == (9, 9)
+    profiles = json.loads(profile_path.read_text(encoding='utf-8'))
+    assert profiles['株式会社サンプル商事||.pdf']['page_count'] == 6
+    
+    # 同じ会社でもベンダーが違うファイルは、記録したパーサーの判定で外れるため判定し直す
+    name, result = parse(_write_pdf(tmp_path, 'freee.pdf', freee_pages()))
+    assert name == 'freee' and result['sales_items'] and result['purchase_items']
+    profiles = json.loads(profile_path.read_text(encoding='utf-8'))
+    assert profiles['株式会社サンプル商事||.pdf']['parser'] == 'freee'
+
+def test_profile_store_is_opt_in_and_leaves_no_temp_files(tmp_path, monkeypatch):
+    """プロファイルは保存先を指定した場合だけ記録し、書き込みに失敗しても一時ファイルを残さない"""
+    import json
+    from parsers.profiles import PROFILE_CACHE_ENV, LayoutProfile, ProfileStore
+    
+    monkeypatch.delenv(PROFILE_CACHE_ENV, raising=False)
+    assert ProfileStore.from_environment() is None
+    monkeypatch.setenv(PROFILE_CACHE_ENV, '')
+    assert ProfileStore.from_environment() is None
+    monkeypatch.setenv(PROFILE_CACHE_ENV, str(tmp_path / 'profiles.json'))
+    store = ProfileStore.from_environment()
+    store.put('key', LayoutProfile('yayoi'))
+    assert store.get('key') == LayoutProfile('yayoi')
+    
+    def fail(*args, **kwargs):
+        raise OSError('disk full')
+    
+    monkeypatch.setattr(json, 'dump', fail)
+    store.put('other', LayoutProfile('freee'))
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['profiles.json']
+    assert ProfileStore(store.path).get('other') is None
+
+def test_workbook_is_loaded_once_for_detection_and_parse(tmp_path, monkeypatch):
+    """Excelブックは判定・解析・メタデータ抽出で一度だけ開き、pd.read_excel と同じ表を返す"""
+    import datetime
+    import openpyxl
+    import pandas as pd
+    from parsers.workbook import WorkbookContext
+    
+    file_path = str(tmp_path / 'mf.xlsx')
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    for row in [['勘定科目別税区分集計表'], ['株式会社サンプル商事', None, datetime.date(2024, 4, 1)], [],
+                ['勘定科目', '課税売上10%', '課税仕入10%', '合計'],
+                ['売上高', 1000.0, None, 'x'], ['通信費', None, 500.5, None], [None, None, None]]:
+        sheet.append(row)
+    workbook.create_sheet('空')
+    workbook.save(file_path)
+    
+    expected = pd.read_excel(file_path, sheet_name=None)
+    with WorkbookContext(file_path) as shared:
+        frames = shared.frames()
+    assert list(frames) == list(expected)
+    for sheet_name, frame in frames.items():
+        pd.testing.assert_frame_equal(frame, expected[sheet_name])
+    
+    loads = []
+    original = openpyxl.load_workbook
+    monkeypatch.setattr(openpyxl, 'load_workbook', lambda *args, **kwargs: loads.append(args) or original(*args, **kwargs))
+    monkeypatch.setattr(pd, 'read_excel', None)
+    
+    with DocumentContext(file_path) as context:
+        parser = ParserFactory.get_parser(file_path, context)
+        result = parser.parse(file_path, context)
+    
+    assert parser.parser_name == 'moneyforward' and len(loads) == 1
+    assert result['company_name'] == '株式会社サンプル商事'
+    assert [(item['account_name'], item['amount']) for item in result['sales_items'] + result['purchase_items']] == [
+        ('売上高', 1000), ('通信費', 501)
+    ]
+
+def test_moneyforward_sheet_extraction_is_columnar():
+    """シートの明細は列単位で変換し、行順・列順の明細と会計表記の金額を保つ"""
+    import numpy as np
+    import pandas as pd
+    from parsers.moneyforward import MoneyforwardParser
+    
+    parser = MoneyforwardParser()
+    df = pd.DataFrame([
+        ['勘定科目', '課税売上10%', '課税仕入8%', '非課税売上', '合計'],
+        ['売上高', 1000, None, '1,234', 2234],
+        [' 通信費 ', '△500', '(200)', 0, -700],
+        # 数値のマイナス金額（値引・返品）も0以外の金額として残す
+        ['売上値引', -300, -120, None, -420],
+        [None, 300, 300, None, 600],
+        ['消耗品費', np.nan, 2.5, 'abc', 2.5],
+    ])
+    
+    sales, purchases = parser._extract_data_from_sheet(df)
+    assert [(item['account_name'], item['tax_rate'], item['amount'], item['taxable_amount']) for item in sales] == [
+        ('売上高', '10%', 1000, 1000), ('売上高', '非課税', 1234, 0), ('通信費', '10%', -500, -500),
+        ('売上値引', '10%', -300, -300)
+    ]
+    assert [(item['account_name'], item['amount']) for item in purchases] == [
+        ('通信費', -200), ('売上値引', -120), ('消耗品費', 3)
+    ]
+    assert all(type(item['amount']) is int for item in sales + purchases)
+
+def test_moneyforward_sheets_are_parsed_in_parallel_in_sheet_order(tmp_path, monkeypatch):
+    """複数シートのブックはシートごとに並列に解析し、シート順に結合する"""
+    import openpyxl
+    import parsers.moneyforward as moneyforward
+    
+    file_path = str(tmp_path / 'mf.xlsx')
+    workbook = openpyxl.Workbook()
+    workbook.active.append(['勘定科目別税区分集計表'])
+    for department in ['営業部', '管理部', '開発部']:
+        sheet = workbook.create_sheet(department)
+        sheet.append([department])
+        sheet.append(['勘定科目', '課税売上10%', '課税仕入10%', '合計'])
+        sheet.append([f'売上高{department}', 1000, None, 1000])
+        sheet.append([f'通信費{department}', None, 300, 300])
+    workbook.save(file_path)
+    
+    def parse(max_workers):
+        with DocumentContext(file_path, max_workers=max_workers) as context:
+            return ParserFactory.get_parser(file_path, context).parse(file_path, context)
+    
+    serial = parse(1)
+    monkeypatch.setattr(moneyforward, 'PARALLEL_MIN_FILE_SIZE', 0)
+    parallel = parse(2)
+    
+    assert [item['account_name'] for item in parallel['sales_items']] == ['売上高営業部', '売上高管理部', '売上高開発部']
+    assert [item['account_name'] for item in parallel['purchase_items']] == ['通信費営業部', '通信費管理部', '通信費開発部']
+    assert parallel == serial
+
+def test_moneyforward_csv_is_read_in_chunks_with_detected_encoding(tmp_path, monkeypatch):
+    """CSV出力は文字コードを判定して一定行数ずつ読み込み、Excelと同じ明細を抽出する"""
+    import csv
+    import openpyxl
+    import parsers.delimited as delimited
+    
+    rows = [['勘定科目別税区分集計表'], ['株式会社サンプル商事', '', '2024/04/01'],
+            ['勘定科目', '課税売上10%', '課税仕入8%(軽)', '合計']]
+    rows += [[f'売上高{index}', f'{index * 1000:,}', '△100' if index % 2 else '', ''] for index in range(1, 8)]
+    
+    workbook_path = str(tmp_path / 'mf.xlsx')
+    workbook = openpyxl.Workbook()
+    for row in rows:
+        workbook.active.append(row)
+    workbook.save(workbook_path)
+    
+    def parse(file_path):
+        with DocumentContext(file_path) as context:
+            parser = ParserFactory.get_parser(file_path, context)
+            return parser.parser_name, parser.parse(file_path, context)
+    
+    _, expected = parse(workbook_path)
+    assert len(expected['sales_items']) == 7 and len(expected['purchase_items']) == 4
+    
+    # 見出し行以降を3行ずつ読み込んでも結果は同じ
+    monkeypatch.setattr(delimited, 'CSV_CHUNK_ROWS', 3)
+    for encoding, expected_encoding in [('cp932', 'cp932'), ('utf-8-sig', 'utf-8-sig'), ('utf-8', 'utf-8')]:
+        csv_path = str(tmp_path / f'mf_{encoding}.csv')
+        with open(csv_path, 'w', encoding=encoding, newline='') as csv_file:
+            csv.writer(csv_file).writerows(rows)
+        
+        assert delimited.detect_encoding(csv_path) == expected_encoding
+        name, result = parse(csv_path)
+        assert name == 'moneyforward' and result['company_name'] == '株式会社サンプル商事'
+        assert result['sales_items'] == expected['sales_items']
+        assert result['purchase_items'] == expected['purchase_items']
+
+def test_excel_engine_selection(tmp_path, monkeypatch):
+    """Excel読み込みエンジンは引数・環境変数で切り替えられ、どのエンジンでも同じ明細を返す"""
+    import datetime
+    import pytest
+    import openpyxl
+    from parsers.excel_engines import EXCEL_ENGINE_ENV, available_engines, get_engine
+    
+    assert 'openpyxl' in available_engines('.xlsx')
+    assert get_engine() == 'openpyxl'
+    # 種別を読めないエンジンは、その種別を読める利用可能なエンジンに切り替える
+    if available_engines('.xls'):
+        assert get_engine('openpyxl', '.xls') == available_engines('.xls')[0]
+    
+    monkeypatch.setenv(EXCEL_ENGINE_ENV, 'no-such-engine')
+    with pytest.raises(ValueError):
+        get_engine()
+    
+    file_path = str(tmp_path / 'mf.xlsx')
+    workbook = openpyxl.Workbook()
+    for row in [['勘定科目別税区分集計表'], ['株式会社サンプル商事', None, datetime.date(2024, 4, 1)],
+                ['勘定科目', '課税売上10%', '課税仕入10%', '合計'],
+                ['売上高', 1000, None, 1000], ['通信費', None, '1,500', 1500]]:
+        workbook.active.append(row)
+    workbook.save(file_path)
+    
+    # 引数の指定は環境変数より優先される
+    results = []
+    for engine in available_engines('.xlsx'):
+        with DocumentContext(file_path, excel_engine=engine) as context:
+            assert context.workbook.engine == engine
+            results.append(ParserFactory.get_parser(file_path, context).parse(file_path, context))
+    
+    assert [(item['account_name'], item['amount']) for item in results[0]['sales_items'] + results[0]['purchase_items']] == [
+        ('売上高', 1000), ('通信費', 1500)
+    ]
+    assert all(result == results[0] for result in results)
+
+def test_account_names_use_longest_alias_with_memo():
+    """勘定科目名は登録順によらず最長の別名で正規化し、同じ科目名は一度だけ照合する"""
+    import random
+    from keyword_matcher import KeywordAutomaton
+    from normalizer import TaxDataNormalizer
+    
+    # オートマトンの最長一致・全件検索は素朴な部分文字列検索と一致する
+    keywords = ['he', 'she', 'his', 'hers', 'ers', 'e', 'abcd', 'bc']
+    automaton = KeywordAutomaton(keywords)
+    generator = random.Random(0)
+    for _ in range(500):
+        text = ''.join(generator.choice('abcdehirs') for _ in range(generator.randint(0, 12)))
+        found = [(len(keyword), -text.find(keyword), keyword) for keyword in keywords if keyword in text]
+        assert automaton.longest_match(text) == (max(found)[2] if found else None)
+        assert automaton.find_all(text) == {keyword for keyword in keywords if keyword in text}
+        assert automaton.search(text) == bool(found)
+    
+    normalizer = TaxDataNormalizer(account_mapping={'売上外注費': '外注費', '売上値引': '売上値引'})
+    assert normalizer._normalize_account_name(' 売上高（店舗） ') == '売上高'
+    assert normalizer._normalize_account_name('売上外注費') == '外注費'
+    assert normalizer._normalize_account_name('売上値引高') == '売上値引'
+    assert normalizer._normalize_account_name('研究開発費') == '研究開発費'
+    assert normalizer._normalize_account_name('') == ''
+    
+    normalizer._normalize_account_name('売上外注費')
+    assert normalizer._account_name_cache.cache_info().hits == 1
+
+def test_columnar_normalization_matches_item_dicts():
+    """列単位の正規化は、辞書のリスト・DataFrame・並行配列のどれを渡しても辞書版と同じ結果を返す"""
+    import copy
+    import random
+    import pandas as pd
+    from normalizer import TaxDataNormalizer
+    
+    generator = random.Random(1)
+    # 列の入力で現れる欠損値（None・NaN）の科目名・税率も含める
+    accounts = ['売上高', ' 売上 ', '商品仕入', '外注工賃', '研究開発費', '', None, float('nan')]
+    rates = ['10%', '標準', '8%', '軽減', '非課税', '免税', '', '5%', None, float('nan')]
+    
+    def items(count):
+        rows = []
+        for index in range(count):
+            row = {'account_name': generator.choice(accounts), 'tax_rate': generator.choice(rates),
+                   'amount': generator.choice([-500, 0, 1200, 2000000000, generator.randint(1, 10 ** 6)]),
+                   'taxable_amount': 0}
+            # 金額のない明細
+            if index % 7 == 3:
+                del row['amount']
+            rows.append(row)
+        return rows
+    
+    def columns(rows):
+        keys = dict.fromkeys(key for row in rows for key in row)
+        return {key: [row.get(key) for row in rows] for key in keys}
+    
+    normalizer = TaxDataNormalizer()
+    for sales_count, purchase_count in [(200, 150), (0, 30), (0, 0)]:
+        raw_data = {'sales_items': items(sales_count), 'purchase_items': items(purchase_count),
+                    'parser_type': 'test', 'warnings': ['既存の警告'], 'errors': []}
+        # normalize は入力の警告リストに追記するため、呼び出しごとに複製を渡す
+        expected = normalizer.normalize(copy.deepcopy(raw_data))
+        assert not any(error.startswith('Normalization error') for error in expected['errors'])
+        assert all(isinstance(rate, str) for rate in [*expected['sales_by_tax_rate'], *expected['purchases_by_tax_rate']])
+        assert normalizer.normalize_columns(copy.deepcopy(raw_data)) == expected
+        
+        for convert in (pd.DataFrame, columns):
+            columnar = normalizer.normalize_columns({**copy.deepcopy(raw_data),
+                                                     'sales_items': convert(raw_data['sales_items']),
+                                                     'purchase_items': convert(raw_data['purchase_items'])})
+            assert columnar == expected
+    
+    # 税率・金額のない明細は税率「不明」・金額0として集計し、警告する
+    raw_data = {'sales_items': [{'account_name': '売上高', 'tax_rate': None, 'amount': 100},
+                                {'account_name': '雑収入', 'tax_rate': float('nan')}],
+                'purchase_items': [], 'warnings': [], 'errors': []}
+    expected = normalizer.normalize(copy.deepcopy(raw_data))
+    assert expected['sales_by_tax_rate'] == {'不明': 100}
+    assert expected['warnings'] == ['税率が不明です: 売上高', '税率が不明です: 雑収入']
+    assert normalizer.normalize_columns(copy.deepcopy(raw_data)) == expected
+    assert normalizer.normalize_columns({**copy.deepcopy(raw_data),
+                                         'sales_items': pd.DataFrame(raw_data['sales_items'])}) == expected
+    
+    frames = normalizer.normalize_columns(raw_data | {'sales_items': items(5)}, as_frames=True)
+    assert isinstance(frames['sales_items'], pd.DataFrame)
+    assert frames['sales_items']['taxable_amount'].sum() == frames['taxable_sales_total']
+
+def test_item_totals_match_separate_passes():
+    """1回の走査の集計は、合計・税率別の合計・検証対象の明細を個別に求めた結果と一致する"""
+    import random
+    from normalizer import TaxDataNormalizer
+    from aggregation import LARGE_AMOUNT_THRESHOLD, ItemTotals
+    
+    generator = random.Random(2)
+    items = []
+    for index in range(300):
+        item = {'account_name': f'科目{index % 7}',
+                'amount': generator.choice([-100, 0, 3000, LARGE_AMOUNT_THRESHOLD + 1, generator.randint(1, 10 ** 6)]),
+                'taxable_amount': generator.randint(0, 1000)}
+        if index % 11:
+            item['tax_rate'] = generator.choice(['10%', '8%', '非課税', '不明'])
+        items.append(item)
+    
+    totals = ItemTotals.from_items(items)
+    assert totals.count == len(items)
+    assert totals.total == sum(item['amount'] for item in items)
+    assert totals.taxable_total == sum(item['taxable_amount'] for item in items)
+    by_tax_rate = {}
+    for item in items:
+        rate = item.get('tax_rate', '不明')
+        by_tax_rate[rate] = by_tax_rate.get(rate, 0) + item['amount']
+    assert totals.by_tax_rate == by_tax_rate
+    assert totals.amount_issues == [(item['account_name'], item['amount']) for item in items
+                                    if item['amount'] < 0 or item['amount'] > LARGE_AMOUNT_THRESHOLD]
+    assert totals.unknown_rate_accounts == [item['account_name'] for item in items if item.get('tax_rate') == '不明']
+    
+    # 警告は売上・仕入の金額の警告、売上・仕入の税率の警告の順
+    raw_data = {'sales_items': [{'account_name': '売上高', 'tax_rate': '', 'amount': -100}],
+                'purchase_items': [{'account_name': '仕入高', 'tax_rate': '10%', 'amount': LARGE_AMOUNT_THRESHOLD + 1}],
+                'warnings': [], 'errors': []}
+    result = TaxDataNormalizer().normalize(raw_data)
+    assert result['warnings'] == ['負の金額が検出されました: 売上高 -100',
+                                  f'非常に大きな金額が検出されました: 仕入高 {LARGE_AMOUNT_THRESHOLD + 1}',
+                                  '税率が不明です: 売上高']
+    assert result['sales_by_tax_rate'] == {'不明': -100}
+    assert result['total_purchases'] == LARGE_AMOUNT_THRESHOLD + 1
+    empty = TaxDataNormalizer().normalize({'sales_items': [], 'purchase_items': [], 'warnings': [], 'errors': []})
+    assert empty['errors'] == ['売上データと仕入データの両方が空です']